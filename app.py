@@ -1,234 +1,2040 @@
 import os
 import sqlite3
 import traceback
-import pickle
 import re
+import threading
+import time
+import hashlib
+import base64
+import io
+import atexit
+import csv
+import json
+import functools
+import math
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, g, has_app_context, has_request_context, jsonify
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup, escape
+
+import metrics
+import pagecache
+import ratelimit
+from model import fastscore, inference, neardup, redflags, recommender
 
 # --- config ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_DIR = os.path.join(BASE_DIR, "db")
-DB_PATH = os.path.join(DB_DIR, "companies.db")
+DB_PATH = os.environ.get("INTERNCHECK_DB", os.path.join(DB_DIR, "companies.db"))
 MODEL_DIR = os.path.join(BASE_DIR, "model")
 VECT_PATH = os.path.join(MODEL_DIR, "vectorizer.pkl")
 MODEL_PATH = os.path.join(MODEL_DIR, "internship_model.pkl")
+PREDICT_BATCH_MAX = int(os.environ.get("PREDICT_BATCH_MAX", "500"))
+# compiled templates are kept here between processes; `flask
+# precompile-templates` fills it at build time (TEMPLATE_CACHE_DIR= disables)
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(BASE_DIR, ".jinja-cache"))
+PRELOAD_TEMPLATES = os.environ.get("PRELOAD_TEMPLATES", "1") != "0"
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    # a read-only deploy still uses what was compiled at build time; templates
+    # added since are compiled in memory, as without a cache
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET", "dev-secret-key-change-me")
+if TEMPLATE_CACHE_DIR:
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=TemplateBytecodeCache(TEMPLATE_CACHE_DIR))
+    except OSError:
+        pass
+
+# --- metrics ---
+# Served at /metrics in the Prometheus text format. With METRICS_DIR set
+# (gunicorn.conf.py sets it), every worker writes its values there and
+# /metrics sums all workers; without it the numbers are this process only.
+# Endpoint labels use the Flask endpoint name, never the raw path.
+metrics_registry = metrics.Registry(os.environ.get("METRICS_DIR") or None)
+metrics_registry.counter("interncheck_http_requests_total", "HTTP requests by endpoint, method and status.")
+metrics_registry.histogram("interncheck_http_request_duration_seconds", "Request latency by endpoint and method.")
+metrics_registry.counter("interncheck_sql_queries_total", "SQL statements run through the DB helpers.")
+metrics_registry.counter("interncheck_sql_seconds_total", "Time spent in SQL statements run through the DB helpers.")
+metrics_registry.histogram("interncheck_request_sql_queries", "SQL statements per request.",
+                           (0, 1, 2, 3, 5, 10, 20, 50, 100))
+metrics_registry.histogram("interncheck_request_sql_seconds", "SQL time per request.")
+metrics_registry.counter("interncheck_predictions_total", "Descriptions scored, by path (model, heuristic, empty).")
+metrics_registry.histogram("interncheck_inference_seconds", "Scoring time per batch, by path.")
+metrics_registry.histogram("interncheck_predict_seconds", "predict_batch calls, cache lookups included.")
+metrics_registry.counter("interncheck_page_cache_total", "Page and fragment cache lookups by kind and result.")
+metrics_registry.counter("interncheck_prediction_cache_total", "Prediction cache lookups by result.")
+atexit.register(metrics_registry.flush)
+
+def _record_sql(elapsed):
+    if has_request_context():
+        endpoint = request.endpoint or "unmatched"
+        g._sql_queries = g.get("_sql_queries", 0) + 1
+        g._sql_seconds = g.get("_sql_seconds", 0.0) + elapsed
+    else:
+        endpoint = "background"
+    metrics_registry.inc("interncheck_sql_queries_total", {"endpoint": endpoint})
+    metrics_registry.inc("interncheck_sql_seconds_total", {"endpoint": endpoint}, elapsed)
+
+@app.before_request
+def _start_request_metrics():
+    g._request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.get("_request_start")
+    if start is not None:
+        endpoint = request.endpoint or "unmatched"
+        labels = {"endpoint": endpoint, "method": request.method}
+        metrics_registry.observe("interncheck_http_request_duration_seconds", time.perf_counter() - start, labels)
+        metrics_registry.inc("interncheck_http_requests_total", dict(labels, status=str(response.status_code)))
+        metrics_registry.observe("interncheck_request_sql_queries", g.get("_sql_queries", 0), {"endpoint": endpoint})
+        metrics_registry.observe("interncheck_request_sql_seconds", g.get("_sql_seconds", 0.0), {"endpoint": endpoint})
+        metrics_registry.maybe_flush()
+    return response
 
 # --- DB helpers ---
-def get_db_conn():
-    os.makedirs(DB_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+# Connections are reused instead of opened per statement: a request borrows one
+# from a small per-process pool (given back in the teardown hook) and code
+# running outside a request (startup, CLI, background threads) keeps one per
+# thread. Every connection runs in WAL mode so readers don't block the writer.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+DB_BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", "30"))
+DB_CACHE_KB = int(os.environ.get("DB_CACHE_KB", "8192"))
+
+os.makedirs(DB_DIR, exist_ok=True)
+
+_db_pool = []
+_db_pool_lock = threading.Lock()
+_db_pool_pid = os.getpid()
+_db_local = threading.local()
+
+def open_db_conn():
+    # timeout installs sqlite's busy handler, so writers wait for the lock
+    # instead of failing straight away with "database is locked"
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-%d" % DB_CACHE_KB)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def _borrow_db_conn():
+    global _db_pool_pid
+    with _db_pool_lock:
+        if _db_pool_pid != os.getpid():
+            # forked worker: never reuse the parent's connections
+            _db_pool.clear()
+            _db_pool_pid = os.getpid()
+        if _db_pool:
+            return _db_pool.pop()
+    return open_db_conn()
+
+def _release_db_conn(conn):
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        conn.close()
+        return
+    with _db_pool_lock:
+        if _db_pool_pid == os.getpid() and len(_db_pool) < DB_POOL_SIZE:
+            _db_pool.append(conn)
+            return
+    conn.close()
+
+def get_db_conn():
+    if has_app_context():
+        conn = g.get("_db_conn")
+        if conn is None:
+            conn = g._db_conn = _borrow_db_conn()
+        return conn
+    conn = getattr(_db_local, "conn", None)
+    if conn is None or getattr(_db_local, "pid", None) != os.getpid():
+        conn = _db_local.conn = open_db_conn()
+        _db_local.pid = os.getpid()
     return conn
 
+@app.teardown_appcontext
+def close_db_conn(exc):
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        _release_db_conn(conn)
+
 def execute(query, params=()):
     conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    lastrowid = cur.lastrowid
-    conn.close()
-    return lastrowid
+    t0 = time.perf_counter()
+    try:
+        cur = conn.execute(query, params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _record_sql(time.perf_counter() - t0)
+    return cur.lastrowid
+
+def execute_many(query, seq_of_params):
+    # one transaction for the whole batch
+    conn = get_db_conn()
+    t0 = time.perf_counter()
+    try:
+        conn.executemany(query, seq_of_params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _record_sql(time.perf_counter() - t0)
+
+@contextmanager
+def transaction():
+    # several statements, one commit
+    conn = get_db_conn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 def query_one(query, params=()):
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute(query, params)
-    row = cur.fetchone()
-    conn.close()
-    return row
+    t0 = time.perf_counter()
+    try:
+        return get_db_conn().execute(query, params).fetchone()
+    finally:
+        _record_sql(time.perf_counter() - t0)
 
 def query_all(query, params=()):
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    t0 = time.perf_counter()
+    try:
+        return get_db_conn().execute(query, params).fetchall()
+    finally:
+        _record_sql(time.perf_counter() - t0)
+
+# --- schema migrations ---
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied, so a current database skips all DDL. Steps are
+# SQL strings or callables taking the connection. Append new migrations at the
+# end and never edit one that has shipped.
+def _add_column(table, column, decl):
+    def step(conn):
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(%s)" % table)]
+        if column not in cols:
+            conn.execute("ALTER TABLE %s ADD COLUMN %s %s" % (table, column, decl))
+    return step
+
+# --- dashboard rollups ---
+# /reports reads these small tables instead of aggregating internships and
+# applications on every view. Company and application counts are kept by
+# triggers, so every writer updates them; skill counts need the Python split
+# below and are updated next to the insert in post_internship.
+# `flask rebuild-rollups` recomputes all of them if they ever drift.
+ROLLUP_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_rollup_ins AFTER INSERT ON internships BEGIN
+        INSERT INTO company_counts (company_id, cnt) VALUES (coalesce(NEW.company_id, 0), 1)
+            ON CONFLICT(company_id) DO UPDATE SET cnt = cnt + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_rollup_del AFTER DELETE ON internships BEGIN
+        UPDATE company_counts SET cnt = cnt - 1 WHERE company_id = coalesce(OLD.company_id, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_rollup_upd AFTER UPDATE OF company_id ON internships
+    WHEN coalesce(OLD.company_id, 0) != coalesce(NEW.company_id, 0) BEGIN
+        UPDATE company_counts SET cnt = cnt - 1 WHERE company_id = coalesce(OLD.company_id, 0);
+        INSERT INTO company_counts (company_id, cnt) VALUES (coalesce(NEW.company_id, 0), 1)
+            ON CONFLICT(company_id) DO UPDATE SET cnt = cnt + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_applications_rollup_ins AFTER INSERT ON applications BEGIN
+        INSERT INTO counters (name, value) VALUES ('applications', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_applications_rollup_del AFTER DELETE ON applications BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'applications';
+    END""",
+]
+
+def split_skills(text):
+    skills = []
+    for s in re.split(r"[,\n;]+", text or ""):
+        s = s.strip().lower()
+        if s:
+            skills.append(s)
+    return skills
+
+def bump_skill_counts(conn, skills_text, delta=1):
+    counts = {}
+    for s in split_skills(skills_text):
+        counts[s] = counts.get(s, 0) + delta
+    conn.executemany("INSERT INTO skill_counts (skill, cnt) VALUES (?, ?) "
+                     "ON CONFLICT(skill) DO UPDATE SET cnt = cnt + excluded.cnt", list(counts.items()))
+
+def rebuild_rollups(conn):
+    conn.execute("DELETE FROM company_counts")
+    conn.execute("INSERT INTO company_counts (company_id, cnt) "
+                 "SELECT coalesce(company_id, 0), COUNT(*) FROM internships GROUP BY coalesce(company_id, 0)")
+    conn.execute("DELETE FROM counters WHERE name = 'applications'")
+    conn.execute("INSERT INTO counters (name, value) SELECT 'applications', COUNT(*) FROM applications")
+    conn.execute("DELETE FROM skill_counts")
+    for r in conn.execute("SELECT skills_required FROM internships WHERE skills_required IS NOT NULL").fetchall():
+        bump_skill_counts(conn, r[0])
+
+# --- full-text search ---
+# internships_fts holds its own copy of the searchable text (company names
+# come from users, so it can't be an external-content table); the triggers
+# keep it in step with both tables.
+SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_fts_ins AFTER INSERT ON internships BEGIN
+        INSERT INTO internships_fts (rowid, title, description, skills, company)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.skills_required,
+                (SELECT full_name FROM users WHERE id = NEW.company_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_fts_upd
+    AFTER UPDATE OF title, description, skills_required, company_id ON internships BEGIN
+        DELETE FROM internships_fts WHERE rowid = OLD.id;
+        INSERT INTO internships_fts (rowid, title, description, skills, company)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.skills_required,
+                (SELECT full_name FROM users WHERE id = NEW.company_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_fts_del AFTER DELETE ON internships BEGIN
+        DELETE FROM internships_fts WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_users_fts_company AFTER UPDATE OF full_name ON users BEGIN
+        UPDATE internships_fts SET company = NEW.full_name
+        WHERE rowid IN (SELECT id FROM internships WHERE company_id = NEW.id);
+    END""",
+]
+
+# edited and deleted internships, for the recommender (sync_recommender);
+# inserts need no entry, the index's id high-water mark finds them. Only the
+# last RECOMMENDER_CHANGES_KEEP entries are kept.
+RECOMMENDER_CHANGES_KEEP = 10000
+RECOMMENDER_CHANGE_TRIGGERS = [
+    """CREATE TABLE IF NOT EXISTS internship_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        internship_id INTEGER NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_changes_upd
+    AFTER UPDATE OF title, description, skills_required, location, company_id ON internships BEGIN
+        INSERT INTO internship_changes (internship_id) VALUES (NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_changes_del AFTER DELETE ON internships BEGIN
+        INSERT INTO internship_changes (internship_id) VALUES (OLD.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_users_changes_company AFTER UPDATE OF full_name ON users BEGIN
+        INSERT INTO internship_changes (internship_id) SELECT id FROM internships WHERE company_id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_internship_changes_prune AFTER INSERT ON internship_changes
+    WHEN NEW.seq %% 1000 = 0 BEGIN
+        DELETE FROM internship_changes WHERE seq <= NEW.seq - %d;
+    END""" % RECOMMENDER_CHANGES_KEEP,
+]
+
+def create_search_index(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS internships_fts USING fts5("
+                     "title, description, skills, company, tokenize='porter unicode61')")
+    except sqlite3.OperationalError:
+        # sqlite built without FTS5: search_internships falls back to LIKE
+        traceback.print_exc()
+        return
+    # rank = bm25 with column weights title, description, skills, company;
+    # ORDER BY rank lets FTS5 sort internally instead of via a temp b-tree
+    conn.execute("INSERT INTO internships_fts (internships_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0, 3.0)')")
+    for sql in SEARCH_TRIGGERS:
+        conn.execute(sql)
+    conn.execute("DELETE FROM internships_fts")
+    conn.execute("INSERT INTO internships_fts (rowid, title, description, skills, company) "
+                 "SELECT i.id, i.title, i.description, i.skills_required, u.full_name "
+                 "FROM internships i LEFT JOIN users u ON i.company_id = u.id")
+
+# --- near-duplicate reports ---
+# Every report not marked genuine stores a MinHash signature of the reported
+# text plus its LSH band keys (model/neardup.py). The bands live in an
+# indexed table, so the index is on disk, shared by all workers, grows with
+# each /report insert and never has to be rebuilt at boot; a lookup is one
+# indexed IN query plus a signature comparison per candidate.
+NEARDUP_THRESHOLD = float(os.environ.get("NEARDUP_THRESHOLD", "0.6"))
+NEARDUP_CANDIDATES_SQL = """
+    SELECT s.report_id, s.sig FROM report_bands b
+    JOIN report_signatures s ON s.report_id = b.report_id
+    WHERE b.band_key IN ({keys})
+"""
+
+def is_scam_report(user_feedback):
+    return (user_feedback or "").strip().lower() != "genuine"
+
+def index_reported_posting(conn, report_id, text):
+    sig = neardup.signature(text)
+    if sig is None:
+        return
+    conn.execute("INSERT OR REPLACE INTO report_signatures (report_id, sig) VALUES (?, ?)",
+                 (report_id, neardup.pack(sig)))
+    conn.executemany("INSERT OR IGNORE INTO report_bands (band_key, report_id) VALUES (?, ?)",
+                     [(key, report_id) for key in neardup.band_keys(sig)])
+
+def index_reported_postings(conn):
+    # backfill: reported text, or the description of the reported internship
+    rows = conn.execute(
+        "SELECT r.id, r.user_feedback, coalesce(r.posting_text, i.description) FROM reports r "
+        "LEFT JOIN internships i ON i.id = r.posting_ref").fetchall()
+    for report_id, feedback, text in rows:
+        if is_scam_report(feedback):
+            index_reported_posting(conn, report_id, text)
+
+def similar_reported_postings(text, threshold=NEARDUP_THRESHOLD):
+    """Report ids whose text is near-identical to text, most similar first."""
+    sig = neardup.signature(text)
+    if sig is None:
+        return []
+    keys = neardup.band_keys(sig)
+    rows = query_all(NEARDUP_CANDIDATES_SQL.format(keys=",".join("?" * len(keys))), keys)
+    matches = []
+    seen = set()
+    for row in rows:
+        # a report comes back once per shared band, and the same posting
+        # reported twice has the same signature; compare each one once
+        if row["sig"] in seen:
+            continue
+        seen.add(row["sig"])
+        score = neardup.similarity(sig, neardup.unpack(row["sig"]))
+        if score >= threshold:
+            matches.append((row["report_id"], score))
+    matches.sort(key=lambda m: -m[1])
+    return matches
+
+# --- report rollups ---
+# /admin/reports reads report_rollups instead of every report. Each report
+# counts towards three rows there: its cluster (the reported internship, or
+# for pasted text the cluster of the nearest earlier near-duplicate), its day
+# and its hour. Distinct reporters and reason counts sit in two side tables
+# under the same (scope, key). The report_rollup_keys view is the single
+# definition of which rows a report belongs to; the insert trigger and
+# rebuild_report_rollups both read it. Reports are never deleted or edited
+# by the app; `flask rebuild-rollups` recomputes everything after a manual
+# cleanup. Cluster keys are assigned in write_reports, since the near-dup
+# lookup needs Python; the trigger falls back to the internship for any
+# other writer.
+REPORT_ROLLUP_TABLES = [
+    """CREATE TABLE IF NOT EXISTS report_rollups (
+        scope TEXT NOT NULL,
+        key TEXT NOT NULL,
+        posting_ref INTEGER,
+        reports INTEGER NOT NULL DEFAULT 0,
+        scam_reports INTEGER NOT NULL DEFAULT 0,
+        reporters INTEGER NOT NULL DEFAULT 0,
+        first_seen TEXT,
+        last_seen TEXT,
+        PRIMARY KEY (scope, key)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_report_rollups_rank ON report_rollups(scope, scam_reports, last_seen)",
+    """CREATE TABLE IF NOT EXISTS report_rollup_reporters (
+        scope TEXT NOT NULL,
+        key TEXT NOT NULL,
+        reporter_id INTEGER NOT NULL,
+        cnt INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, key, reporter_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS report_rollup_reasons (
+        scope TEXT NOT NULL,
+        key TEXT NOT NULL,
+        reason TEXT NOT NULL,
+        cnt INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, key, reason)
+    ) WITHOUT ROWID""",
+    """CREATE VIEW IF NOT EXISTS report_rollup_keys AS
+        SELECT id AS report_id, 'cluster' AS scope,
+               coalesce(cluster_key, 'posting:' || posting_ref, 'unknown') AS key, posting_ref,
+               CASE WHEN lower(trim(coalesce(user_feedback, ''))) = 'genuine' THEN 0 ELSE 1 END AS scam,
+               reporter_id, lower(trim(coalesce(reason, ''))) AS reason, created_at
+        FROM reports
+        UNION ALL
+        SELECT id, 'day', substr(created_at, 1, 10), NULL,
+               CASE WHEN lower(trim(coalesce(user_feedback, ''))) = 'genuine' THEN 0 ELSE 1 END,
+               reporter_id, lower(trim(coalesce(reason, ''))), created_at
+        FROM reports WHERE created_at IS NOT NULL
+        UNION ALL
+        SELECT id, 'hour', substr(created_at, 1, 13), NULL,
+               CASE WHEN lower(trim(coalesce(user_feedback, ''))) = 'genuine' THEN 0 ELSE 1 END,
+               reporter_id, lower(trim(coalesce(reason, ''))), created_at
+        FROM reports WHERE created_at IS NOT NULL""",
+    "CREATE INDEX IF NOT EXISTS idx_reports_cluster ON reports(cluster_key, created_at)",
+]
+
+REPORT_ROLLUP_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_reports_cluster AFTER INSERT ON reports
+    WHEN NEW.cluster_key IS NULL BEGIN
+        UPDATE reports SET cluster_key = coalesce('posting:' || NEW.posting_ref, 'unknown') WHERE id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_reports_rollup_ins AFTER INSERT ON reports BEGIN
+        INSERT INTO report_rollups (scope, key, posting_ref, reports, scam_reports, first_seen, last_seen)
+            SELECT scope, key, posting_ref, 1, scam, created_at, created_at
+            FROM report_rollup_keys WHERE report_id = NEW.id
+            ON CONFLICT(scope, key) DO UPDATE SET
+                reports = reports + 1,
+                scam_reports = scam_reports + excluded.scam_reports,
+                first_seen = coalesce(min(first_seen, excluded.first_seen), first_seen, excluded.first_seen),
+                last_seen = coalesce(max(last_seen, excluded.last_seen), last_seen, excluded.last_seen);
+        INSERT INTO report_rollup_reporters (scope, key, reporter_id, cnt)
+            SELECT scope, key, reporter_id, 1
+            FROM report_rollup_keys WHERE report_id = NEW.id AND reporter_id IS NOT NULL
+            ON CONFLICT(scope, key, reporter_id) DO UPDATE SET cnt = cnt + 1;
+        UPDATE report_rollups SET reporters = reporters + 1
+            WHERE NEW.reporter_id IS NOT NULL AND (scope, key) IN (
+                SELECT p.scope, p.key FROM report_rollup_reporters p
+                JOIN report_rollup_keys k ON k.scope = p.scope AND k.key = p.key
+                WHERE k.report_id = NEW.id AND p.reporter_id = NEW.reporter_id AND p.cnt = 1);
+        INSERT INTO report_rollup_reasons (scope, key, reason, cnt)
+            SELECT scope, key, reason, 1
+            FROM report_rollup_keys WHERE report_id = NEW.id AND reason != ''
+            ON CONFLICT(scope, key, reason) DO UPDATE SET cnt = cnt + 1;
+    END""",
+]
+
+NEARDUP_CLUSTER_SQL = """
+    SELECT r.cluster_key, s.sig FROM report_bands b
+    JOIN report_signatures s ON s.report_id = b.report_id
+    JOIN reports r ON r.id = s.report_id
+    WHERE b.band_key IN ({keys}) AND r.cluster_key IS NOT NULL
+"""
+
+def report_cluster_key(conn, posting_id, posting_ref, posting_text, pending=()):
+    """The cluster a new report joins.
+
+    pending holds (key, signature) of reports earlier in the same batch,
+    which are not in the near-dup index yet.
+    """
+    if posting_ref is not None:
+        return "posting:%d" % posting_ref
+    sig = neardup.signature(posting_text)
+    if sig is None:
+        posting_id = (posting_id or "").strip()
+        return "posting:" + posting_id if posting_id else "unknown"
+    keys = neardup.band_keys(sig)
+    candidates = [(key, neardup.unpack(blob)) for key, blob in
+                  conn.execute(NEARDUP_CLUSTER_SQL.format(keys=",".join("?" * len(keys))), keys)]
+    best, best_score = None, NEARDUP_THRESHOLD
+    for key, other in list(pending) + candidates:
+        score = neardup.similarity(sig, other)
+        if score >= best_score:
+            best, best_score = key, score
+    # a new cluster is named after its first text, so reposts of exactly
+    # that text land in it even where the lookup can't see them
+    return best or "text:" + hashlib.sha1(neardup.pack(sig)).hexdigest()[:16]
+
+def cluster_reports(conn):
+    # backfill, oldest first, so each report can join an earlier cluster
+    rows = conn.execute("SELECT id, posting_id, posting_ref, posting_text FROM reports "
+                        "WHERE cluster_key IS NULL ORDER BY id").fetchall()
+    for report_id, posting_id, posting_ref, posting_text in rows:
+        conn.execute("UPDATE reports SET cluster_key = ? WHERE id = ?",
+                     (report_cluster_key(conn, posting_id, posting_ref, posting_text), report_id))
+
+def rebuild_report_rollups(conn):
+    for table in ("report_rollups", "report_rollup_reporters", "report_rollup_reasons"):
+        conn.execute("DELETE FROM %s" % table)
+    conn.execute("""INSERT INTO report_rollups (scope, key, posting_ref, reports, scam_reports, reporters,
+                                                first_seen, last_seen)
+                    SELECT scope, key, max(posting_ref), COUNT(*), SUM(scam), COUNT(DISTINCT reporter_id),
+                           min(created_at), max(created_at)
+                    FROM report_rollup_keys GROUP BY scope, key""")
+    conn.execute("""INSERT INTO report_rollup_reporters (scope, key, reporter_id, cnt)
+                    SELECT scope, key, reporter_id, COUNT(*) FROM report_rollup_keys
+                    WHERE reporter_id IS NOT NULL GROUP BY scope, key, reporter_id""")
+    conn.execute("""INSERT INTO report_rollup_reasons (scope, key, reason, cnt)
+                    SELECT scope, key, reason, COUNT(*) FROM report_rollup_keys
+                    WHERE reason != '' GROUP BY scope, key, reason""")
+
+# --- page cache ---
+# Rendered fragments (the "recent internships" box) and whole anonymous pages
+# are cached under keys that include a data generation: a counter row bumped
+# by triggers whenever internships, applications or company names change, so
+# every writer (routes, the scoring worker, CLI commands) invalidates it and
+# nothing is ever purged by hand. Cached pages carry an ETag and
+# Last-Modified, and a matching conditional GET gets a 304 without a render.
+# PAGE_CACHE_BACKEND is memory (per worker), sqlite (PAGE_CACHE_PATH, shared
+# by all workers) or off; see pagecache.py.
+PAGE_CACHE_BACKEND = os.environ.get("PAGE_CACHE_BACKEND", "memory")
+PAGE_CACHE_PATH = os.environ.get("PAGE_CACHE_PATH", os.path.splitext(DB_PATH)[0] + "-pagecache.db")
+PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", "512"))
+GENERATION_SQL = "SELECT value FROM counters WHERE name = 'data_generation'"
+
+_bump_generation = """INSERT INTO counters (name, value) VALUES ('data_generation', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;"""
+GENERATION_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_internships_gen_ins AFTER INSERT ON internships BEGIN %s END" % _bump_generation,
+    "CREATE TRIGGER IF NOT EXISTS trg_internships_gen_del AFTER DELETE ON internships BEGIN %s END" % _bump_generation,
+    """CREATE TRIGGER IF NOT EXISTS trg_internships_gen_upd AFTER UPDATE OF company_id, title, description,
+    location, stipend, skills_required, category, created_at, trust_flag, trust_prob ON internships
+    BEGIN %s END""" % _bump_generation,
+    "CREATE TRIGGER IF NOT EXISTS trg_applications_gen_ins AFTER INSERT ON applications BEGIN %s END" % _bump_generation,
+    "CREATE TRIGGER IF NOT EXISTS trg_applications_gen_del AFTER DELETE ON applications BEGIN %s END" % _bump_generation,
+    "CREATE TRIGGER IF NOT EXISTS trg_users_gen_upd AFTER UPDATE OF full_name ON users BEGIN %s END" % _bump_generation,
+]
+
+# the same for the session snapshots of users (see current_identity): any
+# change to a snapshotted column, or a deleted user, expires all of them
+USERS_GENERATION_SQL = "SELECT value FROM counters WHERE name = 'users_generation'"
+_bump_users_generation = """INSERT INTO counters (name, value) VALUES ('users_generation', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;"""
+USERS_GENERATION_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_users_snapshot_upd AFTER UPDATE OF id, username, role, full_name ON users
+    BEGIN %s END""" % _bump_users_generation,
+    "CREATE TRIGGER IF NOT EXISTS trg_users_snapshot_del AFTER DELETE ON users BEGIN %s END" % _bump_users_generation,
+]
+
+page_cache = pagecache.open_cache(PAGE_CACHE_BACKEND, path=PAGE_CACHE_PATH, size=PAGE_CACHE_SIZE)
+
+def _templates_stamp():
+    # part of every key, so a deploy with new templates misses the shared cache
+    folder = os.path.join(BASE_DIR, "templates")
+    try:
+        return "%x" % max(os.stat(os.path.join(folder, f)).st_mtime_ns for f in os.listdir(folder))
+    except (OSError, ValueError):
+        return "-"
+
+_page_cache_prefix = _templates_stamp()
+
+def data_generation():
+    # read once per request; a write later in the same request redirects anyway
+    if "_data_generation" not in g:
+        row = query_one(GENERATION_SQL)
+        g._data_generation = row[0] if row else 0
+    return g._data_generation
+
+def cached_fragment(name, render):
+    """Rendered HTML for name at the current data generation."""
+    if not page_cache.enabled:
+        return Markup(render())
+    key = "frag:%s:%s:%d" % (_page_cache_prefix, name, data_generation())
+    html = page_cache.get(key)
+    metrics_registry.inc("interncheck_page_cache_total", {"kind": "fragment", "result": "miss" if html is None else "hit"})
+    if html is None:
+        html = render()
+        page_cache.set(key, html)
+    return Markup(html)
+
+def _page_cacheable():
+    # only anonymous GETs with no flashed message waiting: those pages are
+    # the same for every visitor
+    return (page_cache.enabled and request.method in ("GET", "HEAD")
+            and not session.get("user_id") and "_flashes" not in session)
+
+def cached_page(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _page_cacheable():
+            return view(*args, **kwargs)
+        key = "page:%s:%s:%d" % (_page_cache_prefix, request.full_path, data_generation())
+        entry = page_cache.get(key)
+        result = "hit"
+        if entry is None:
+            body = view(*args, **kwargs)
+            if not isinstance(body, str):
+                return body
+            result = "miss"
+            entry = {"body": body, "etag": hashlib.sha1(body.encode("utf-8")).hexdigest()[:20], "at": int(time.time())}
+            if not session.modified:  # the view flashed something; that page is not for everyone
+                page_cache.set(key, entry)
+        response = app.response_class(entry["body"], mimetype="text/html")
+        response.set_etag(entry["etag"])
+        response.last_modified = entry["at"]
+        response.cache_control.no_cache = True  # browsers may keep it, but must revalidate
+        response.vary.add("Cookie")
+        response.make_conditional(request)
+        if response.status_code == 304:
+            result = "not_modified"
+        metrics_registry.inc("interncheck_page_cache_total", {"kind": "page", "result": result})
+        return response
+    return wrapper
+
+# --- admission control ---
+# Routes that run the model or the recommender are wrapped in @admitted:
+# - Each client draws from a token bucket per endpoint, keyed by user id
+#   when signed in and by client address otherwise. Budgets are
+#   RATE_LIMITS[endpoint] ("N/SECONDS", overridable as
+#   RATE_LIMIT_<ENDPOINT>), and signed-in users get RATE_LIMIT_USER_FACTOR
+#   times as much.
+# - At most SCORING_CONCURRENCY of these requests run at once across every
+#   worker sharing SCORING_SLOTS_DIR (gunicorn.conf.py sets one per server;
+#   unset, the cap is per process), and anonymous ones may not take the
+#   last SCORING_RESERVED_FOR_USERS slots, so a scraper can't crowd out
+#   students.
+# Over budget or over the cap answers 429 with Retry-After at once; it never
+# queues. Rate limits are per process (see ratelimit.py). Behind a reverse proxy,
+# wrap app.wsgi_app in werkzeug's ProxyFix so remote_addr is the client's.
+RATE_LIMITS = {"predict": "30/60", "api_predict_batch": "300/60", "recommend": "30/60"}
+RATE_LIMITS = {endpoint: os.environ.get("RATE_LIMIT_" + endpoint.upper(), rate) for endpoint, rate in RATE_LIMITS.items()}
+RATE_LIMIT_USER_FACTOR = float(os.environ.get("RATE_LIMIT_USER_FACTOR", "4"))
+SCORING_CONCURRENCY = int(os.environ.get("SCORING_CONCURRENCY", "8"))
+SCORING_RESERVED_FOR_USERS = int(os.environ.get("SCORING_RESERVED_FOR_USERS", "2"))
+SCORING_SLOTS_DIR = os.environ.get("SCORING_SLOTS_DIR") or None
+ADMISSION_ENABLED = os.environ.get("ADMISSION_CONTROL", "1") != "0"
+
+rate_limiters = {endpoint: ratelimit.TokenBuckets(*ratelimit.parse_rate(rate)) for endpoint, rate in RATE_LIMITS.items()}
+scoring_cap = ratelimit.ConcurrencyCap(SCORING_CONCURRENCY, SCORING_SLOTS_DIR)
+
+metrics_registry.counter("interncheck_admission_total", "Scoring requests by endpoint and result "
+                                                        "(served, rate_limited, overloaded).")
+metrics_registry.gauge("interncheck_scoring_in_flight", "Scoring requests running in this process.")
+
+def _too_many(retry_after, message):
+    retry_after = max(1, int(math.ceil(retry_after)))
+    if request.path.startswith("/api/"):
+        response = jsonify(error=message, retry_after=retry_after)
+    else:
+        response = app.response_class(render_template("429.html", message=message, retry_after=retry_after),
+                                      mimetype="text/html")
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+def admitted(cost=None):
+    """Rate-limit and cap a scoring view; cost() gives the tokens a request takes (default 1)."""
+    def decorate(view):
+        endpoint = view.__name__
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+            user = current_identity()
+            labels = {"endpoint": endpoint}
+            key = "user:%s" % user["id"] if user else "ip:%s" % request.remote_addr
+            wait = rate_limiters[endpoint].take(key, cost() if cost else 1,
+                                                RATE_LIMIT_USER_FACTOR if user else 1.0)
+            if wait:
+                metrics_registry.inc("interncheck_admission_total", dict(labels, result="rate_limited"))
+                return _too_many(wait, "Too many requests; please slow down.")
+            if not scoring_cap.acquire(reserve=0 if user else SCORING_RESERVED_FOR_USERS):
+                metrics_registry.inc("interncheck_admission_total", dict(labels, result="overloaded"))
+                return _too_many(1, "The checker is busy right now; please try again in a moment.")
+            metrics_registry.set("interncheck_scoring_in_flight", scoring_cap.in_flight)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                scoring_cap.release()
+                metrics_registry.set("interncheck_scoring_in_flight", scoring_cap.in_flight)
+                metrics_registry.inc("interncheck_admission_total", dict(labels, result="served"))
+        return wrapper
+    return decorate
+
+MIGRATIONS = [
+    # 1: base tables
+    [
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT,
+            full_name TEXT,
+            email TEXT,
+            skills TEXT,
+            created_at TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS internships (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            title TEXT,
+            description TEXT,
+            location TEXT,
+            stipend TEXT,
+            skills_required TEXT,
+            category TEXT,
+            created_at TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            internship_id INTEGER,
+            student_id INTEGER,
+            resume_text TEXT,
+            status TEXT,
+            applied_at TEXT
+        )""",
+        # note: user_feedback column name used
+        """CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            posting_id TEXT,
+            user_feedback TEXT,
+            reason TEXT,
+            reporter_id INTEGER,
+            created_at TEXT
+        )""",
+        _add_column("reports", "reporter_id", "INTEGER"),
+        _add_column("reports", "created_at", "TEXT"),
+    ],
+    # 2: indexes for the route queries, integer posting reference on reports
+    [
+        "CREATE INDEX IF NOT EXISTS idx_internships_created_at ON internships(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_internships_company ON internships(company_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_applications_student ON applications(student_id, applied_at)",
+        "CREATE INDEX IF NOT EXISTS idx_applications_internship ON applications(internship_id)",
+        "CREATE INDEX IF NOT EXISTS idx_applications_applied_at ON applications(applied_at)",
+        _add_column("reports", "posting_ref", "INTEGER"),
+        """UPDATE reports SET posting_ref = CAST(trim(posting_id) AS INTEGER)
+           WHERE posting_ref IS NULL AND trim(posting_id) != ''
+             AND trim(posting_id) NOT GLOB '*[^0-9]*'""",
+        "CREATE INDEX IF NOT EXISTS idx_reports_posting_ref ON reports(posting_ref)",
+        "CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at)",
+    ],
+    # 3: shared prediction cache
+    [
+        """CREATE TABLE IF NOT EXISTS prediction_cache (
+            key TEXT PRIMARY KEY,
+            model_version TEXT,
+            flag TEXT,
+            prob REAL,
+            reason TEXT,
+            created_at TEXT
+        )""",
+    ],
+    # 4: dashboard rollups
+    [
+        "CREATE TABLE IF NOT EXISTS company_counts (company_id INTEGER PRIMARY KEY, cnt INTEGER NOT NULL DEFAULT 0)",
+        "CREATE INDEX IF NOT EXISTS idx_company_counts_cnt ON company_counts(cnt)",
+        "CREATE TABLE IF NOT EXISTS skill_counts (skill TEXT PRIMARY KEY, cnt INTEGER NOT NULL DEFAULT 0)",
+        "CREATE INDEX IF NOT EXISTS idx_skill_counts_cnt ON skill_counts(cnt)",
+        "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)",
+    ] + ROLLUP_TRIGGERS + [rebuild_rollups],
+    # 5: filter indexes for the paginated /internships list
+    [
+        "CREATE INDEX IF NOT EXISTS idx_internships_category ON internships(category, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_internships_location ON internships(location, created_at)",
+    ],
+    # 6: full-text search
+    [create_search_index],
+    # 7: near-duplicate index of reported postings
+    [
+        _add_column("reports", "posting_text", "TEXT"),
+        "CREATE TABLE IF NOT EXISTS report_signatures (report_id INTEGER PRIMARY KEY, sig BLOB NOT NULL)",
+        """CREATE TABLE IF NOT EXISTS report_bands (
+            band_key INTEGER NOT NULL,
+            report_id INTEGER NOT NULL,
+            PRIMARY KEY (band_key, report_id)
+        ) WITHOUT ROWID""",
+        index_reported_postings,
+    ],
+    # 8: stored trust scores on internships
+    [
+        _add_column("internships", "trust_flag", "TEXT"),
+        _add_column("internships", "trust_prob", "REAL"),
+        _add_column("internships", "trust_reason", "TEXT"),
+        _add_column("internships", "trust_model_version", "TEXT"),
+        "CREATE INDEX IF NOT EXISTS idx_internships_trust_version ON internships(trust_model_version)",
+        # an edited description needs a new score
+        """CREATE TRIGGER IF NOT EXISTS trg_internships_rescore AFTER UPDATE OF description ON internships
+        WHEN OLD.description IS NOT NEW.description BEGIN
+            UPDATE internships SET trust_model_version = NULL WHERE id = NEW.id;
+        END""",
+    ],
+    # 9: data generation for the page cache
+    GENERATION_TRIGGERS,
+    # 10: owning company on applications, so a company's applications are
+    # one index range instead of a join through every internship it posted
+    [
+        _add_column("applications", "company_id", "INTEGER"),
+        """UPDATE applications SET company_id = (SELECT company_id FROM internships WHERE id = applications.internship_id)
+           WHERE company_id IS NULL""",
+        "CREATE INDEX IF NOT EXISTS idx_applications_company ON applications(company_id, applied_at)",
+        """CREATE TRIGGER IF NOT EXISTS trg_applications_company_ins AFTER INSERT ON applications
+        WHEN NEW.company_id IS NULL BEGIN
+            UPDATE applications SET company_id = (SELECT company_id FROM internships WHERE id = NEW.internship_id)
+            WHERE id = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_applications_company_upd AFTER UPDATE OF internship_id ON applications BEGIN
+            UPDATE applications SET company_id = (SELECT company_id FROM internships WHERE id = NEW.internship_id)
+            WHERE id = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_internships_company_apps AFTER UPDATE OF company_id ON internships
+        WHEN OLD.company_id IS NOT NEW.company_id BEGIN
+            UPDATE applications SET company_id = NEW.company_id WHERE internship_id = NEW.id;
+        END""",
+    ],
+    # 11: report clusters and per cluster/day/hour rollups for /admin/reports
+    [_add_column("reports", "cluster_key", "TEXT")] + REPORT_ROLLUP_TABLES
+    + [cluster_reports, rebuild_report_rollups] + REPORT_ROLLUP_TRIGGERS,
+    # 12: log of edited and deleted internships for the recommender
+    RECOMMENDER_CHANGE_TRIGGERS,
+    # 13: users generation, which expires session snapshots
+    USERS_GENERATION_TRIGGERS,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_is_current(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
+
+def migrate(conn):
+    # BEGIN IMMEDIATE takes the write lock before reading user_version, so
+    # workers booting together apply each migration exactly once
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for steps in MIGRATIONS[version:]:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+        if version < SCHEMA_VERSION:
+            conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return version
 
-# --- ensure tables exist (safe migration friendly) ---
 def ensure_tables():
-    os.makedirs(DB_DIR, exist_ok=True)
-    conn = get_db_conn()
-    cur = conn.cursor()
-    # users
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password TEXT,
-        role TEXT,
-        full_name TEXT,
-        email TEXT,
-        skills TEXT,
-        created_at TEXT
-    )""")
-    # internships
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS internships (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        company_id INTEGER,
-        title TEXT,
-        description TEXT,
-        location TEXT,
-        stipend TEXT,
-        skills_required TEXT,
-        category TEXT,
-        created_at TEXT
-    )""")
-    # applications
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS applications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        internship_id INTEGER,
-        student_id INTEGER,
-        resume_text TEXT,
-        status TEXT,
-        applied_at TEXT
-    )""")
-    # reports (note: user_feedback column name used)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        posting_id TEXT,
-        user_feedback TEXT,
-        reason TEXT,
-        reporter_id INTEGER,
-        created_at TEXT
-    )""")
-    conn.commit()
-    conn.close()
+    # dedicated connection: this runs at import time, possibly in a gunicorn
+    # master that forks workers afterwards
+    # the usual boot finds the schema current: one read, no write lock
+    conn = open_db_conn()
+    try:
+        if not schema_is_current(conn):
+            migrate(conn)
+    finally:
+        conn.close()
+
+def posting_ref_for(posting_id):
+    # reports.posting_id is free text; posting_ref is the integer internship id
+    posting_id = (posting_id or "").strip()
+    return int(posting_id) if posting_id.isdigit() else None
 
 ensure_tables()
 
 # --- Auth helpers ---
+# get_current_user() reads the users row at most once per request (kept on
+# g). Routes that only need the id or role use current_identity() instead,
+# which trusts a snapshot of SNAPSHOT_FIELDS kept in the signed session
+# cookie until it is USER_SNAPSHOT_TTL seconds old. Snapshots also carry the
+# users generation they were taken at, which triggers bump on every change
+# to a snapshotted column, so a renamed or demoted user is re-read on the
+# next request however the row was changed. That costs one counters lookup
+# per request instead of the users row.
+USER_SNAPSHOT_TTL = float(os.environ.get("USER_SNAPSHOT_TTL", "60"))
+SNAPSHOT_FIELDS = ("id", "username", "role", "full_name")
+
 def login_user(user_id):
     session['user_id'] = user_id
+    session.pop('user_snapshot', None)
+    g.pop('_current_user', None)
 
 def logout_user():
     session.pop('user_id', None)
+    session.pop('user_snapshot', None)
+    g.pop('_current_user', None)
+
+def users_generation():
+    # read once per request, like data_generation()
+    if "_users_generation" not in g:
+        row = query_one(USERS_GENERATION_SQL)
+        g._users_generation = row[0] if row else 0
+    return g._users_generation
+
+def _snapshot_fresh(snap, uid):
+    return (snap is not None and snap.get("id") == uid
+            and time.time() - snap.get("at", 0) < USER_SNAPSHOT_TTL
+            and snap.get("gen") == users_generation())
 
 def get_current_user():
+    if "_current_user" in g:
+        return g._current_user
+    uid = session.get('user_id')
+    user = None
+    if uid:
+        if USER_SNAPSHOT_TTL > 0:
+            users_generation()  # before the row, so a change in between expires the snapshot
+        row = query_one("SELECT * FROM users WHERE id = ?", (uid,))
+        user = dict(row) if row else None
+    g._current_user = user
+    if user is None:
+        session.pop('user_snapshot', None)
+    elif USER_SNAPSHOT_TTL > 0:
+        snap = session.get('user_snapshot')
+        # rewrite the cookie only when the snapshot is stale or differs
+        if not _snapshot_fresh(snap, uid) or any(snap.get(k) != user.get(k) for k in SNAPSHOT_FIELDS):
+            session['user_snapshot'] = dict({k: user.get(k) for k in SNAPSHOT_FIELDS}, at=time.time(),
+                                            gen=users_generation())
+    return user
+
+def current_identity():
+    """id, username, role and full_name of the logged-in user, or None;
+    usually answered from the session without touching the database."""
+    if "_current_user" in g:
+        return g._current_user
     uid = session.get('user_id')
     if not uid:
         return None
-    row = query_one("SELECT * FROM users WHERE id = ?", (uid,))
-    return dict(row) if row else None
+    snap = session.get('user_snapshot')
+    if USER_SNAPSHOT_TTL > 0 and _snapshot_fresh(snap, uid):
+        return snap
+    return get_current_user()
 
 @app.context_processor
 def inject_user():
-    return dict(user=get_current_user())
+    return dict(user=current_identity())
+
+# --- Recommender (model/recommender.py) ---
+# Built from the table on first use. After that, a call that finds
+# data_generation unchanged touches nothing else; otherwise it replays the
+# internship_changes log past the last entry it applied (edited postings are
+# re-added, deleted ones removed) and fetches postings with an id above the
+# index's high-water mark, so writes from any worker, or from outside the
+# app, are picked up without a rebuild. A worker that fell more than
+# RECOMMENDER_CHANGES_KEEP changes behind rebuilds instead.
+recommender_index = recommender.default_index()
+_recommender_lock = threading.Lock()
+_recommender_synced = {"generation": None, "seq": None}
+RECOMMENDER_ROWS_SQL = """SELECT i.id, i.title, i.description, i.skills_required, i.location, u.full_name AS company
+                          FROM internships i LEFT JOIN users u ON i.company_id = u.id
+                          WHERE i.id > ? ORDER BY i.id"""
+RECOMMENDER_ROW_SQL = """SELECT i.id, i.title, i.description, i.skills_required, i.location, u.full_name AS company
+                         FROM internships i LEFT JOIN users u ON i.company_id = u.id
+                         WHERE i.id = ?"""
+RECOMMENDER_CHANGES_SQL = "SELECT seq, internship_id FROM internship_changes WHERE seq > ? ORDER BY seq"
+RECOMMENDER_FIRST_CHANGE_SQL = "SELECT MIN(seq) FROM internship_changes"
+RECOMMENDER_LAST_CHANGE_SQL = "SELECT MAX(seq) FROM internship_changes"
+
+def _recommender_add(index, r):
+    index.add(r["id"], "%s %s" % (r["title"] or "", r["description"] or ""), r["skills_required"],
+                          {"id": r["id"], "title": r["title"], "company": r["company"], "location": r["location"]})
+
+def sync_recommender():
+    global recommender_index
+    # read here rather than through data_generation(), which a request may
+    # have cached before its own write
+    row = query_one(GENERATION_SQL)
+    generation = row[0] if row else 0
+    if generation == _recommender_synced["generation"]:
+        return
+    with _recommender_lock:
+        if generation == _recommender_synced["generation"]:
+            return
+        seq = _recommender_synced["seq"]
+        index = recommender_index
+        if seq is not None and (query_one(RECOMMENDER_FIRST_CHANGE_SQL)[0] or 0) > seq + 1:
+            # the entries we missed were pruned: build a new index, and swap
+            # it in (here and as recommender.default_index()) once it's full
+            index, seq = recommender.RecommenderIndex(), None
+        if seq is None:
+            # a fresh index reads every row below; changes up to now are in it
+            seq = query_one(RECOMMENDER_LAST_CHANGE_SQL)[0] or 0
+        for change in query_all(RECOMMENDER_CHANGES_SQL, (seq,)):
+            seq = change["seq"]
+            r = query_one(RECOMMENDER_ROW_SQL, (change["internship_id"],))
+            if r is None:
+                index.remove(change["internship_id"])
+            elif r["id"] <= index.max_id:
+                _recommender_add(index, r)
+        for r in query_all(RECOMMENDER_ROWS_SQL, (index.max_id,)):
+            _recommender_add(index, r)
+        if index is not recommender_index:
+            recommender_index = recommender.set_default_index(index)
+        _recommender_synced.update(generation=generation, seq=seq)
+
+def recommend_for_text(text, topn=7):
+    sync_recommender()
+    return recommender_index.recommend(text, topn)
 
-# --- Simple recommender placeholder (no external dependency needed) ---
-recommend_for_text = None
+# --- Heuristic red flags and model loader (works without model) ---
+# rules live in model/redflags.py; extra ones can be added in data/red_flags.json
 try:
-    # optional: if user added a real recommender module
-    from model.recommender import recommend_for_text as _r
-    recommend_for_text = _r
+    red_flag_engine = redflags.build_engine()
 except Exception:
-    recommend_for_text = None
-
-# --- Heuristic red flags and model loader (works without model) ---
-RED_FLAG_PATTERNS = {
-    "fee": [r"\b(pay|fee|paid|charge|payment|registration fee|processing fee|₹)\b"],
-    "whatsapp": [r"\b(whatsapp|telegram|snapchat)\b"],
-    "personal_contact": [r"\b(gmail\.com|yahoo\.com|hotmail\.com|outlook\.com)\b"],
-    "vague": [r"\b(urgent hiring|no experience required|any graduate|no qualification|max 2 days)\b"],
-    "high_pay": [r"\b(\d{3,} per month|\d+k|\bunrealistic pay\b|\binternship stipend:?\b)\b"]
-}
-
-_model = None
-_vectorizer = None
-def load_vectorizer_if_needed():
-    global _vectorizer
-    if _vectorizer is None:
+    # a broken rules file must not take the site down
+    traceback.print_exc()
+    red_flag_engine = redflags.RedFlagEngine(redflags.DEFAULT_RULES)
+
+# Model and vectorizer are loaded together and published as one tuple, so a
+# request always sees a matching pair. Importing the app loads them (in the
+# gunicorn master when started with --preload, so forked workers share the
+# pages), and a watcher swaps in retrained artifacts without a restart.
+# When the artifacts were exported as arrays (a scorer/ directory, see
+# model/fastscore.py) those are memory-mapped instead, and sklearn is never
+# imported; NUMPY_SCORER=0 forces the pickles.
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "1") != "0"
+NUMPY_SCORER = os.environ.get("NUMPY_SCORER", "1") != "0"
+ARTIFACT_CHECK_SECONDS = float(os.environ.get("ARTIFACT_CHECK_SECONDS", "2"))
+WARMUP_TEXT = "Software development intern at a product company. Stipend 10000 per month, Python and SQL."
+
+# (model, vectorizer, checksum, file stamp)
+_artifacts = (None, None, None, None)
+_artifacts_checked = None
+_artifacts_lock = threading.Lock()
+
+def artifact_paths():
+    return inference.artifact_paths(MODEL_DIR, NUMPY_SCORER)
+
+def _artifact_stamp():
+    paths = artifact_paths()
+    stamp = [paths]
+    for path in paths:
         try:
-            with open(VECT_PATH, "rb") as f:
-                _vectorizer = pickle.load(f)
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def _load_artifacts(stamp):
+    blobs = []
+    for path in stamp[0]:
+        try:
+            with open(path, "rb") as f:
+                blobs.append(f.read())
+        except OSError:
+            blobs.append(None)
+    checksum = hashlib.sha1(b"".join(b or b"-" for b in blobs)).hexdigest()[:16]
+    if _artifacts[2] == checksum:
+        # touched but unchanged: keep the loaded objects
+        return (_artifacts[0], _artifacts[1], checksum, stamp)
+    if stamp[0][0].endswith(fastscore.META_NAME):
+        # one object serves as both: transform() and predict_proba()
+        try:
+            model = vec = fastscore.load(os.path.dirname(stamp[0][0]))
         except Exception:
-            _vectorizer = None
-    return _vectorizer
+            traceback.print_exc()
+            model = vec = None
+        return (model, vec, checksum, stamp)
+    model, vec = [inference.unpickle(b) if b is not None else None for b in blobs]
+    if model is None or vec is None:
+        model = vec = None
+    return (model, vec, checksum, stamp)
+
+def refresh_artifacts(force=False):
+    """Reload the artifacts if their files changed; returns the current tuple.
+
+    Files are stat'ed at most every ARTIFACT_CHECK_SECONDS. The new pair is
+    loaded before the swap, so requests keep using the old one meanwhile,
+    and only one thread reloads at a time.
+    """
+    global _artifacts, _artifacts_checked
+    now = time.monotonic()
+    if not force and _artifacts_checked is not None and now - _artifacts_checked < ARTIFACT_CHECK_SECONDS:
+        return _artifacts
+    # wait for a load in progress only if there is nothing to serve yet
+    if not _artifacts_lock.acquire(blocking=force or _artifacts[3] is None):
+        return _artifacts
+    try:
+        _artifacts_checked = now
+        stamp = _artifact_stamp()
+        if force or stamp != _artifacts[3]:
+            _artifacts = _load_artifacts(stamp)
+    finally:
+        _artifacts_lock.release()
+    return _artifacts
+
+def get_model_and_vectorizer():
+    model, vec, _, _ = refresh_artifacts()
+    return model, vec
+
+def load_vectorizer_if_needed():
+    return get_model_and_vectorizer()[1]
 
 def load_model_if_needed():
-    global _model
-    if _model is None:
-        try:
-            with open(MODEL_PATH, "rb") as f:
-                _model = pickle.load(f)
-        except Exception:
-            _model = None
-    return _model
+    return get_model_and_vectorizer()[0]
 
 def heuristic_score_and_reasons(text):
-    txt = (text or "").lower()
-    found = []
-    rf_count = 0
-    for key, pats in RED_FLAG_PATTERNS.items():
-        for p in pats:
-            if re.search(p, txt):
-                found.append(key)
-                rf_count += 1
-                break
-    # basic scoring: each red flag reduces score
-    score = max(0.0, 1.0 - min(1.0, rf_count * 0.25))
-    reasons = []
-    if "fee" in found:
-        reasons.append("Mentions fees/payments (red flag).")
-    if "whatsapp" in found:
-        reasons.append("Contact via messaging apps detected (WhatsApp/Telegram).")
-    if "personal_contact" in found:
-        reasons.append("Personal email domains present instead of corporate.")
-    if "vague" in found:
-        reasons.append("Role description is vague or unrealistic.")
-    if "high_pay" in found:
-        reasons.append("Promised high pay or vague stipend phrase.")
-    if not reasons:
-        reasons.append("No obvious red flags detected; use judgment.")
+    score, reasons, _ = red_flag_engine.evaluate(text or "")
     return score, "; ".join(reasons)
 
+def red_flag_matches(text):
+    # matched spans, for explaining a score
+    text = text or ""
+    lowered = text.lower()
+    return [{"rule": name, "start": start, "end": end, "match": lowered[start:end]}
+            for name, start, end in red_flag_engine.scan(text)]
+
+def _flag_for(prob):
+    return inference.flag_for(prob)
+
+# --- inference pool ---
+# With INFERENCE_WORKERS > 0 each web worker scores through its own pool of
+# that many processes (model/inference.py) instead of in its own thread:
+# vectorize + predict_proba run outside this process's GIL, and texts from
+# concurrent requests are coalesced into batches of up to
+# INFERENCE_MAX_BATCH, waiting at most INFERENCE_MAX_WAIT_MS for company.
+# That pays off with threaded workers (WEB_THREADS in gunicorn.conf.py),
+# whose other threads keep serving while one waits on the pool. Pool
+# processes load the same artifacts as this process and follow its reloads
+# by checksum. A failed or slow (INFERENCE_TIMEOUT) call falls back to the
+# heuristics like any other model failure. The pool is started per process
+# on the first request, never in a gunicorn master that preloads the app.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "2"))
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "10"))
+INFERENCE_START_METHOD = os.environ.get("INFERENCE_START_METHOD", "spawn")
+
+metrics_registry.histogram("interncheck_inference_batch_size", "Texts per coalesced inference pool call.",
+                           (1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+_inference = {"pid": None, "pool": None}
+_inference_lock = threading.Lock()
+
+def _observe_inference_batch(texts, seconds):
+    metrics_registry.observe("interncheck_inference_batch_size", len(texts))
+
+def inference_pool():
+    if not INFERENCE_WORKERS:
+        return None
+    if _inference["pid"] != os.getpid():
+        with _inference_lock:
+            if _inference["pid"] != os.getpid():
+                _, _, checksum, stamp = refresh_artifacts()
+                pool = inference.InferencePool(INFERENCE_WORKERS, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS / 1000.0,
+                                               INFERENCE_TIMEOUT, INFERENCE_START_METHOD,
+                                               on_batch=_observe_inference_batch)
+                _inference["pool"] = pool.start(stamp[0], checksum)
+                _inference["pid"] = os.getpid()
+                atexit.register(pool.shutdown)
+    return _inference["pool"]
+
+@app.before_request
+def _ensure_inference_pool():
+    inference_pool()
+
+def _record_scoring(pool):
+    def record(kind, count, seconds):
+        metrics_registry.inc("interncheck_predictions_total", {"path": kind}, count)
+        if seconds is not None:
+            path = "pool" if kind == "model" and pool is not None else kind
+            metrics_registry.observe("interncheck_inference_seconds", seconds, {"path": path})
+    return record
+
+def _score_batch(texts, local=False):
+    """Score many descriptions at once, uncached; returns [(flag, prob, reason)].
+
+    See inference.score_batch: the model runs in the inference pool when
+    there is one (local=True scores in this process regardless), and
+    heuristic results given because the model failed are FallbackResult.
+    """
+    model, vec, checksum, stamp = refresh_artifacts()
+    pool = None if local else inference_pool()
+    probs_for = None
+    if pool is not None:
+        def probs_for(batch):
+            return pool.genuine_probs(stamp[0], checksum, batch)
+    return inference.score_batch(texts, model, vec, heuristic_score_and_reasons, probs_for, _record_scoring(pool))
+
+# --- prediction cache ---
+# Two levels in front of the scorer: an in-process LRU with a TTL, and the
+# prediction_cache table shared by every worker and kept across restarts.
+# Keys hash the normalized text together with the artifact version, so
+# retraining the model (or editing the rules file) invalidates old entries.
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "2048"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_DB_ROWS = int(os.environ.get("PREDICTION_CACHE_DB_ROWS", "100000"))
+MODEL_VERSION_CHECK_SECONDS = 2.0
+
+_pred_cache = OrderedDict()
+_pred_cache_lock = threading.Lock()
+_pred_cache_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0}
+_pred_cache_writes = 0
+_model_version = {"value": None, "checked": 0.0}
+
+def normalize_posting_text(text):
+    return inference.normalize_text(text)
+
+def _compute_model_version():
+    # checksum of the artifacts actually loaded, plus the rules file stamp
+    parts = [str(refresh_artifacts()[2])]
+    try:
+        st = os.stat(redflags.RULES_PATH)
+        parts.append("%d:%d" % (st.st_mtime_ns, st.st_size))
+    except OSError:
+        parts.append("-")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+def current_model_version():
+    now = time.monotonic()
+    if _model_version["value"] is None or now - _model_version["checked"] >= MODEL_VERSION_CHECK_SECONDS:
+        version = _compute_model_version()
+        _model_version["checked"] = now
+        if version != _model_version["value"]:
+            if _model_version["value"] is not None:
+                _invalidate_prediction_cache(version)
+            _model_version["value"] = version
+    return _model_version["value"]
+
+def _invalidate_prediction_cache(version):
+    with _pred_cache_lock:
+        _pred_cache.clear()
+        _pred_cache_stats["invalidations"] += 1
+    try:
+        execute("DELETE FROM prediction_cache WHERE model_version != ?", (version,))
+    except Exception:
+        traceback.print_exc()
+
+def _cache_key(version, normalized):
+    return hashlib.sha256((version + "\0" + normalized).encode("utf-8")).hexdigest()
+
+def _l1_get(key):
+    with _pred_cache_lock:
+        entry = _pred_cache.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires < time.monotonic():
+            del _pred_cache[key]
+            return None
+        _pred_cache.move_to_end(key)
+        return result
+
+def _l1_put(key, result):
+    with _pred_cache_lock:
+        _pred_cache[key] = (time.monotonic() + PREDICTION_CACHE_TTL, result)
+        _pred_cache.move_to_end(key)
+        while len(_pred_cache) > PREDICTION_CACHE_SIZE:
+            _pred_cache.popitem(last=False)
+
+def _l2_get_many(keys):
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        rows = query_all("SELECT key, flag, prob, reason FROM prediction_cache WHERE key IN (%s)"
+                         % ",".join("?" * len(chunk)), chunk)
+        for r in rows:
+            found[r["key"]] = (r["flag"], r["prob"], r["reason"])
+    return found
+
+def _l2_put_many(version, items):
+    global _pred_cache_writes
+    now = datetime.utcnow().isoformat()
+    execute_many("INSERT OR REPLACE INTO prediction_cache (key, model_version, flag, prob, reason, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                 [(key, version, flag, prob, reason, now) for key, (flag, prob, reason) in items])
+    _pred_cache_writes += len(items)
+    if _pred_cache_writes >= 1000:
+        # rowid grows with every write, so this keeps the newest rows
+        _pred_cache_writes = 0
+        execute("DELETE FROM prediction_cache WHERE rowid <= (SELECT max(rowid) FROM prediction_cache) - ?",
+                (PREDICTION_CACHE_DB_ROWS,))
+
+def prediction_cache_stats():
+    with _pred_cache_lock:
+        stats = dict(_pred_cache_stats, l1_size=len(_pred_cache))
+    lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["l1_hits"] + stats["l2_hits"]) / lookups if lookups else 0.0
+    stats["model_version"] = _model_version["value"]
+    return stats
+
+def predict_batch(texts):
+    """Score many descriptions at once; returns [(flag, prob, reason)] in order.
+
+    Texts are normalized (case and whitespace) and looked up in the cache
+    first; only the misses reach the model, as one batch.
+    """
+    started = time.perf_counter()
+    version = current_model_version()
+    normalized = [normalize_posting_text(t) for t in texts]
+    results = [None] * len(texts)
+    pending = {}  # key -> [indexes], so duplicates in a batch are scored once
+    for i, norm in enumerate(normalized):
+        if not norm:
+            results[i] = ("suspect", 0.0, "Empty text submitted.")
+            continue
+        key = _cache_key(version, norm)
+        hit = _l1_get(key)
+        if hit is not None:
+            results[i] = hit
+            _pred_cache_stats["l1_hits"] += 1
+            metrics_registry.inc("interncheck_prediction_cache_total", {"result": "l1_hit"})
+        else:
+            pending.setdefault(key, []).append(i)
+    if pending:
+        try:
+            stored = _l2_get_many(pending)
+        except Exception:
+            traceback.print_exc()
+            stored = {}
+        for key, result in stored.items():
+            _l1_put(key, result)
+            for i in pending.pop(key):
+                results[i] = result
+                _pred_cache_stats["l2_hits"] += 1
+                metrics_registry.inc("interncheck_prediction_cache_total", {"result": "l2_hit"})
+    if pending:
+        keys = list(pending)
+        scored = _score_batch([normalized[pending[k][0]] for k in keys])
+        # a fallback after a failed model call is answered but not cached,
+        # so the next request asks the model again
+        keep = [(key, result) for key, result in zip(keys, scored) if not isinstance(result, inference.FallbackResult)]
+        for key, result in zip(keys, scored):
+            for i in pending[key]:
+                results[i] = result
+                _pred_cache_stats["misses"] += 1
+                metrics_registry.inc("interncheck_prediction_cache_total", {"result": "miss"})
+        for key, result in keep:
+            _l1_put(key, result)
+        if keep:
+            try:
+                _l2_put_many(version, keep)
+            except Exception:
+                traceback.print_exc()
+    metrics_registry.observe("interncheck_predict_seconds", time.perf_counter() - started)
+    return results
+
 def predict_flag_and_prob(text):
-    text = (text or "").strip()
-    if not text:
-        return "suspect", 0.0, "Empty text submitted."
-    model = load_model_if_needed()
-    vec = load_vectorizer_if_needed()
-    if model is not None and vec is not None:
+    return predict_batch([text])[0]
+
+def preload_artifacts():
+    # load once and run one inference so lazy sklearn/numpy setup happens
+    # at boot rather than in the first request; the warm-up skips the cache
+    # so the master process never writes to the database
+    refresh_artifacts(force=True)
+    _score_batch([WARMUP_TEXT], local=True)
+
+if PRELOAD_MODEL:
+    preload_artifacts()
+
+def preload_templates():
+    # parse every template once (from the bytecode cache when it has them),
+    # before gunicorn forks, instead of on the first hit in each worker
+    for name in app.jinja_env.list_templates():
         try:
-            X = vec.transform([text])
-            if hasattr(model, "predict_proba"):
-                probs = model.predict_proba(X)[0]
-                # attempt to find 'genuine' class
-                if hasattr(model, "classes_"):
-                    classes = list(model.classes_)
-                    if "genuine" in classes:
-                        idx = classes.index("genuine")
-                    else:
-                        idx = int(__import__("numpy").argmax(probs))
-                    prob = float(probs[idx])
-                else:
-                    prob = float(max(probs))
-            else:
-                pred = model.predict(X)[0]
-                prob = 1.0 if pred else 0.0
-            flag = "genuine" if prob >= 0.70 else ("fake" if prob <= 0.40 else "suspect")
-            return flag, prob, "Model-based prediction"
+            app.jinja_env.get_template(name)
+        except Exception:
+            traceback.print_exc()
+
+if PRELOAD_TEMPLATES:
+    preload_templates()
+
+# --- background scoring of postings ---
+# Internships carry their own trust score so list pages never run the model.
+# A daemon thread per worker scores rows whose trust_model_version is missing
+# (new or edited postings) or differs from the loaded model (retrained
+# artifacts or rules), in batches. post_internship wakes it right away;
+# otherwise it checks every SCORING_INTERVAL seconds. A lease row in counters
+# lets only one worker at a time run the sweep, so a model change is
+# rescored once rather than once per worker.
+SCORING_WORKER = os.environ.get("SCORING_WORKER", "1") != "0"
+SCORING_BATCH = int(os.environ.get("SCORING_BATCH", "200"))
+SCORING_INTERVAL = float(os.environ.get("SCORING_INTERVAL", "30"))
+SCORING_LEASE_SECONDS = 120
+
+SCORING_STALE_SQL = """SELECT id, description FROM internships
+                       WHERE trust_model_version IS NULL OR trust_model_version < ? OR trust_model_version > ?
+                       LIMIT ?"""
+SCORING_UPDATE_SQL = """UPDATE internships SET trust_flag = ?, trust_prob = ?, trust_reason = ?, trust_model_version = ?
+                        WHERE id = ? AND description IS ?"""
+
+_scoring_wake = threading.Event()
+_scoring_thread = {"pid": None}
+_scoring_thread_lock = threading.Lock()
+
+def _set_scoring_lease(conn, expires, only_if_free=False):
+    now = int(time.time())
+    conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('scoring_lease', 0)")
+    sql = "UPDATE counters SET value = ? WHERE name = 'scoring_lease'"
+    cur = conn.execute(sql + " AND value < ?" if only_if_free else sql,
+                       (expires, now) if only_if_free else (expires,))
+    conn.commit()
+    return cur.rowcount == 1
+
+def score_stale_internships(limit=None):
+    """Score unscored or outdated internships; returns how many were updated,
+    or None if another worker holds the scoring lease."""
+    conn = get_db_conn()
+    if not _set_scoring_lease(conn, int(time.time()) + SCORING_LEASE_SECONDS, only_if_free=True):
+        return None
+    done = 0
+    try:
+        while limit is None or done < limit:
+            version = current_model_version()
+            batch = SCORING_BATCH if limit is None else min(SCORING_BATCH, limit - done)
+            rows = conn.execute(SCORING_STALE_SQL, (version, version, batch)).fetchall()
+            if not rows:
+                break
+            # straight to the scorer: a bulk rescore would only flush the
+            # prediction cache
+            scored = _score_batch([normalize_posting_text(r[1]) for r in rows])
+            # rows the model failed on keep their old score for the next pass
+            cur = conn.executemany(SCORING_UPDATE_SQL,
+                                   [tuple(result) + (version, r[0], r[1])
+                                    for r, result in zip(rows, scored)
+                                    if not isinstance(result, inference.FallbackResult)])
+            conn.commit()
+            done += max(cur.rowcount, 0)
+            if cur.rowcount <= 0 or any(isinstance(result, inference.FallbackResult) for result in scored):
+                break  # rows changed under us, or the model failed; the next pass picks them up
+            _set_scoring_lease(conn, int(time.time()) + SCORING_LEASE_SECONDS)
+    finally:
+        _set_scoring_lease(conn, 0)
+    return done
+
+def _scoring_loop():
+    busy = False
+    while True:
+        # while another worker holds the lease, poll briefly so rows posted
+        # here are not left for the next interval
+        _scoring_wake.wait(1.0 if busy else SCORING_INTERVAL)
+        _scoring_wake.clear()
+        try:
+            busy = score_stale_internships() is None
         except Exception:
             traceback.print_exc()
-    # fallback to heuristics
-    score, reason = heuristic_score_and_reasons(text)
-    flag = "genuine" if score >= 0.70 else ("fake" if score <= 0.40 else "suspect")
-    return flag, float(score), reason
+            busy = False
+
+def start_scoring_worker():
+    # per process: a gunicorn master that preloads the app must not own it
+    if not SCORING_WORKER or _scoring_thread["pid"] == os.getpid():
+        return
+    with _scoring_thread_lock:
+        if _scoring_thread["pid"] != os.getpid():
+            threading.Thread(target=_scoring_loop, name="internship-scoring", daemon=True).start()
+            _scoring_thread["pid"] = os.getpid()
+            _scoring_wake.set()  # catch up on anything posted while down
+
+def wake_scoring_worker():
+    start_scoring_worker()
+    _scoring_wake.set()
+
+@app.before_request
+def _ensure_scoring_worker():
+    start_scoring_worker()
+
+# --- report ingestion queue ---
+# /report only queues the row and answers; a writer thread per worker
+# inserts queued reports REPORT_BATCH_SIZE at a time with one executemany
+# and one commit, as soon as a batch fills or REPORT_FLUSH_SECONDS after the
+# oldest queued report. A burst of reports then costs a few write locks
+# instead of one per report, and other write routes stop queuing behind
+# them. Queued reports are flushed when the process exits; a killed worker
+# loses at most one interval's worth. A full queue (REPORT_QUEUE_MAX)
+# falls back to writing in the request; REPORT_QUEUE=0 always does.
+# A batch that fails REPORT_FLUSH_RETRIES times in a row (backing off
+# between attempts) is written one report at a time instead, and reports
+# that still fail are appended to REPORT_DEAD_LETTER_PATH as JSON lines, so
+# one bad row can neither wedge the queue nor take its batch down with it.
+REPORT_QUEUE = os.environ.get("REPORT_QUEUE", "1") != "0"
+REPORT_BATCH_SIZE = int(os.environ.get("REPORT_BATCH_SIZE", "200"))
+REPORT_FLUSH_SECONDS = float(os.environ.get("REPORT_FLUSH_SECONDS", "0.05"))
+REPORT_QUEUE_MAX = int(os.environ.get("REPORT_QUEUE_MAX", "10000"))
+REPORT_FLUSH_RETRIES = int(os.environ.get("REPORT_FLUSH_RETRIES", "5"))
+REPORT_DEAD_LETTER_PATH = os.environ.get("REPORT_DEAD_LETTER_PATH", DB_PATH + ".dead-letter.jsonl")
+REPORT_FIELDS = ("posting_id", "posting_ref", "posting_text", "user_feedback", "reason", "reporter_id", "created_at")
+REPORT_INSERT_SQL = """INSERT INTO reports (posting_id, posting_ref, posting_text, user_feedback, reason, reporter_id,
+                                            created_at, cluster_key)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+metrics_registry.counter("interncheck_reports_total", "Reports received, by path (queued or direct).")
+metrics_registry.gauge("interncheck_report_queue_depth", "Reports queued and not yet written.")
+metrics_registry.histogram("interncheck_report_flush_seconds", "Time to write one batch of queued reports.")
+metrics_registry.histogram("interncheck_report_flush_size", "Reports per written batch.",
+                           (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+metrics_registry.counter("interncheck_report_flush_errors_total", "Batches of reports that failed to write.")
+metrics_registry.counter("interncheck_report_dead_letters_total", "Reports that could not be written at all "
+                                                                  "and went to the dead-letter file.")
+
+_report_queue = deque()  # (monotonic time queued, row for REPORT_INSERT_SQL)
+_report_cond = threading.Condition()
+_report_writer = {"pid": None, "failures": 0}  # failures: attempts at the batch at the head of the queue
+
+def write_reports(rows):
+    """Insert report rows in one transaction, clustered, and index the scam ones."""
+    with transaction() as conn:
+        clustered, pending = [], []
+        for row in rows:
+            key = report_cluster_key(conn, row[0], row[1], row[2], pending)
+            sig = neardup.signature(row[2]) if row[1] is None else None
+            if sig is not None:
+                pending.append((key, sig))
+            clustered.append(tuple(row) + (key,))
+        conn.executemany(REPORT_INSERT_SQL, clustered)
+        # reports.id is AUTOINCREMENT and the write lock is held from the
+        # first insert, so the batch got consecutive ids ending here
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        for report_id, row in zip(range(last_id - len(rows) + 1, last_id + 1), rows):
+            posting_ref, posting_text, user_feedback = row[1], row[2], row[3]
+            if not is_scam_report(user_feedback):
+                continue
+            if posting_text is None and posting_ref is not None:
+                found = conn.execute("SELECT description FROM internships WHERE id = ?", (posting_ref,)).fetchone()
+                posting_text = found[0] if found else None
+            index_reported_posting(conn, report_id, posting_text)
+
+def _dead_letter(row):
+    try:
+        with open(REPORT_DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(zip(REPORT_FIELDS, row)), default=str) + "\n")
+    except OSError:
+        traceback.print_exc()
+        app.logger.error("report dropped: %r", row)
+    metrics_registry.inc("interncheck_report_dead_letters_total")
+
+def flush_reports():
+    """Write up to REPORT_BATCH_SIZE queued reports; returns how many were taken off the queue."""
+    with _report_cond:
+        batch = [_report_queue.popleft() for _ in range(min(len(_report_queue), REPORT_BATCH_SIZE))]
+    if not batch:
+        return 0
+    t0 = time.perf_counter()
+    try:
+        if _report_writer["failures"] >= REPORT_FLUSH_RETRIES:
+            # given up on the batch: find the rows that fail on their own
+            for _, row in batch:
+                try:
+                    write_reports([row])
+                except Exception:
+                    traceback.print_exc()
+                    _dead_letter(row)
+            _report_writer["failures"] = 0
+            return len(batch)
+        write_reports([row for _, row in batch])
+        _report_writer["failures"] = 0
+    except Exception:
+        traceback.print_exc()
+        metrics_registry.inc("interncheck_report_flush_errors_total")
+        _report_writer["failures"] += 1
+        with _report_cond:
+            _report_queue.extendleft(reversed(batch))  # keep them, in order, for the next attempt
+        return 0
+    finally:
+        metrics_registry.set("interncheck_report_queue_depth", len(_report_queue))
+    metrics_registry.observe("interncheck_report_flush_seconds", time.perf_counter() - t0)
+    metrics_registry.observe("interncheck_report_flush_size", len(batch))
+    return len(batch)
+
+def _report_writer_loop():
+    while True:
+        with _report_cond:
+            while not _report_queue:
+                _report_cond.wait()
+            deadline = _report_queue[0][0] + REPORT_FLUSH_SECONDS
+            while len(_report_queue) < REPORT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _report_cond.wait(remaining)
+        if not flush_reports():
+            # failed; don't spin on a locked database
+            time.sleep(REPORT_FLUSH_SECONDS * 2 ** min(_report_writer["failures"], 6))
+
+def _start_report_writer():
+    # per process, like the scoring worker
+    if _report_writer["pid"] == os.getpid():
+        return
+    with _report_cond:
+        if _report_writer["pid"] != os.getpid():
+            _report_queue.clear()  # a forked child must not write its parent's reports
+            threading.Thread(target=_report_writer_loop, name="report-writer", daemon=True).start()
+            _report_writer["pid"] = os.getpid()
+
+def submit_report(row):
+    """Queue a report row (or write it now if queuing is off or full)."""
+    if REPORT_QUEUE:
+        _start_report_writer()
+        with _report_cond:
+            if len(_report_queue) < REPORT_QUEUE_MAX:
+                _report_queue.append((time.monotonic(), row))
+                metrics_registry.set("interncheck_report_queue_depth", len(_report_queue))
+                _report_cond.notify()
+                metrics_registry.inc("interncheck_reports_total", {"path": "queued"})
+                return
+    write_reports([row])
+    metrics_registry.inc("interncheck_reports_total", {"path": "direct"})
+
+@atexit.register
+def _flush_reports_at_exit():
+    # registered after the metrics flush, so it runs first and the final
+    # queue depth (normally 0) is what gets written
+    if _report_writer["pid"] != os.getpid():
+        return
+    while _report_queue and (flush_reports() or _report_writer["failures"]):
+        pass
+
+# --- route queries ---
+# Kept in one place so `flask explain-queries` can check their plans.
+RECENT_INTERNSHIPS_SQL = "SELECT i.*, u.full_name as company_name FROM internships i LEFT JOIN users u ON i.company_id = u.id ORDER BY created_at DESC LIMIT 8"
+
+# list pages fetch one page at a time, newest first, continuing from a
+# (created_at, id) cursor, and project only what the templates show
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "20"))
+APPLICATION_STATUSES = ("applied", "shortlisted", "rejected", "accepted")
+DESCRIPTION_PREVIEW = 300
+
+INTERNSHIPS_PAGE_SQL = """SELECT i.id, i.title, substr(i.description, 1, %d) AS description,
+                             length(i.description) > %d AS description_truncated,
+                             i.location, i.stipend, i.category, i.created_at, i.trust_flag, i.trust_prob,
+                             u.full_name as company_name
+                             FROM internships i LEFT JOIN users u ON i.company_id = u.id
+                             {where}
+                             ORDER BY i.created_at DESC, i.id DESC LIMIT ?""" % (DESCRIPTION_PREVIEW, DESCRIPTION_PREVIEW)
+
+COMPANY_INTERNSHIPS_PAGE_SQL = """SELECT i.id, i.title, i.created_at FROM internships i
+                                   {where}
+                                   ORDER BY i.created_at DESC, i.id DESC LIMIT ?"""
+
+# companies and admins see the same columns; companies add a.company_id = ?
+APPLICATIONS_PAGE_SQL = """SELECT a.id, a.internship_id, a.student_id, a.status, a.applied_at AS created_at,
+                             i.title as internship_title, u.username as student_username, u.full_name as student_name
+                             FROM applications a
+                             LEFT JOIN internships i ON a.internship_id = i.id
+                             LEFT JOIN users u ON a.student_id = u.id
+                             {where}
+                             ORDER BY a.applied_at DESC, a.id DESC LIMIT ?"""
+
+ADMIN_INTERNSHIPS_PAGE_SQL = """SELECT i.id, i.title, i.created_at, u.full_name as company_name
+                                 FROM internships i LEFT JOIN users u ON i.company_id = u.id
+                                 {where}
+                                 ORDER BY i.created_at DESC, i.id DESC LIMIT ?"""
+
+STUDENT_APPLICATIONS_SQL = """SELECT a.*, i.title as internship_title, u.full_name as company_name
+                                FROM applications a
+                                LEFT JOIN internships i ON a.internship_id = i.id
+                                LEFT JOIN users u ON i.company_id = u.id
+                                WHERE a.student_id = ?
+                                ORDER BY a.applied_at DESC"""
+
+TOP_SKILLS_SQL = "SELECT skill, cnt FROM skill_counts WHERE cnt > 0 ORDER BY cnt DESC LIMIT 10"
+
+TOP_COMPANIES_SQL = """SELECT u.full_name, c.cnt
+                       FROM company_counts c LEFT JOIN users u ON c.company_id = u.id
+                       WHERE c.cnt > 0 ORDER BY c.cnt DESC LIMIT 10"""
+
+TOTAL_APPLICATIONS_SQL = "SELECT value AS cnt FROM counters WHERE name = 'applications'"
+
+# /admin/reports: the clusters with the most scam reports first, then the
+# day and hour buckets, all from report_rollups; one cluster's reports are
+# paged from idx_reports_cluster
+MOST_REPORTED_LIMIT = int(os.environ.get("MOST_REPORTED_LIMIT", "50"))
+REPORT_DAYS_SHOWN = 30
+REPORT_HOURS_SHOWN = 48
+REPORT_TOP_REASONS = 3
+
+MOST_REPORTED_SQL = """SELECT c.key, c.posting_ref, c.reports, c.scam_reports, c.reporters, c.first_seen, c.last_seen,
+                              i.title AS internship_title,
+                              (SELECT substr(r.posting_text, 1, 200) FROM reports r
+                               WHERE r.cluster_key = c.key AND r.posting_text IS NOT NULL
+                               ORDER BY r.created_at LIMIT 1) AS sample_text
+                       FROM report_rollups c
+                       LEFT JOIN internships i ON i.id = c.posting_ref
+                       WHERE c.scope = 'cluster'
+                       ORDER BY c.scam_reports DESC, c.last_seen DESC LIMIT ?"""
+
+REPORT_CLUSTER_SQL = """SELECT c.key, c.posting_ref, c.reports, c.scam_reports, c.reporters, c.first_seen, c.last_seen,
+                               i.title AS internship_title
+                        FROM report_rollups c
+                        LEFT JOIN internships i ON i.id = c.posting_ref
+                        WHERE c.scope = 'cluster' AND c.key = ?"""
+
+REPORT_BUCKETS_SQL = """SELECT key, reports, scam_reports, reporters, first_seen, last_seen
+                        FROM report_rollups WHERE scope = ? ORDER BY key DESC LIMIT ?"""
+
+REPORT_REASONS_SQL = "SELECT key, reason, cnt FROM report_rollup_reasons WHERE scope = ? AND key IN ({keys})"
+
+CLUSTER_REPORTS_PAGE_SQL = """SELECT r.id, r.posting_id, r.user_feedback AS feedback, r.reason, r.created_at,
+                                     u.username AS reporter_username, substr(r.posting_text, 1, 300) AS posting_text
+                              FROM reports r
+                              LEFT JOIN users u ON r.reporter_id = u.id
+                              {where}
+                              ORDER BY r.created_at DESC, r.id DESC LIMIT ?"""
+
+# exports stream every matching row in the order an index already provides;
+# companies get only their own rows and no reporter identities
+EXPORT_CHUNK_ROWS = 500
+EXPORT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+EXPORT_APPLICATIONS_SQL = """SELECT a.id, a.internship_id, i.title AS internship_title, a.student_id,
+                               u.username AS student_username, u.full_name AS student_name, u.email AS student_email,
+                               a.status, a.applied_at, a.resume_text
+                               FROM applications a
+                               LEFT JOIN internships i ON a.internship_id = i.id
+                               LEFT JOIN users u ON a.student_id = u.id
+                               {where}
+                               ORDER BY a.applied_at, a.id"""
+
+EXPORT_REPORTS_SQL = """SELECT r.id, r.posting_id, r.posting_ref, i.title AS internship_title, r.user_feedback,
+                          r.reason, r.reporter_id, u.username AS reporter_username, r.posting_text, r.created_at
+                          FROM reports r
+                          LEFT JOIN internships i ON r.posting_ref = i.id
+                          LEFT JOIN users u ON r.reporter_id = u.id
+                          {where}
+                          ORDER BY r.created_at, r.id"""
+
+# reports about a company's internships, walked internship by internship
+COMPANY_EXPORT_REPORTS_SQL = """SELECT r.id, r.posting_ref, i.title AS internship_title, r.user_feedback, r.reason,
+                                  r.created_at
+                                  FROM internships i
+                                  JOIN reports r ON r.posting_ref = i.id
+                                  {where}
+                                  ORDER BY i.created_at, i.id, r.id"""
+
+# (kind, role) -> (sql, column ?since= filters on)
+EXPORT_QUERIES = {
+    ("applications", "admin"): (EXPORT_APPLICATIONS_SQL, "a.applied_at"),
+    ("applications", "company"): (EXPORT_APPLICATIONS_SQL, "a.applied_at"),
+    ("reports", "admin"): (EXPORT_REPORTS_SQL, "r.created_at"),
+    ("reports", "company"): (COMPANY_EXPORT_REPORTS_SQL, "r.created_at"),
+}
+EXPORT_COMPANY_COLUMN = {"applications": "a.company_id", "reports": "i.company_id"}
+
+def encode_cursor(created_at, row_id):
+    raw = "%s|%d" % (created_at or "", row_id)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    # (created_at, id), or None for a missing or garbled cursor
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return created_at, int(row_id)
+    except Exception:
+        return None
+
+def page_query(sql, filters, cursor, order_cols, limit=PAGE_SIZE):
+    """Fill {where} in sql from [(sql condition, value)] filters and a cursor.
+
+    Asks for one row more than limit so fetch_page can tell whether another
+    page follows.
+    """
+    where = [cond for cond, _ in filters]
+    params = [value for _, value in filters]
+    if cursor:
+        where.append("(%s, %s) < (?, ?)" % order_cols)
+        params.extend(cursor)
+    sql = sql.format(where="WHERE " + " AND ".join(where) if where else "")
+    return sql, params + [limit + 1]
+
+def fetch_page(sql, params, limit=PAGE_SIZE):
+    rows = [dict(r) for r in query_all(sql, params)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+def internship_filters(args):
+    filters = []
+    if args.get("category"):
+        filters.append(("i.category = ?", args["category"]))
+    if args.get("location"):
+        filters.append(("i.location = ?", args["location"]))
+    if args.get("company", "").isdigit():
+        filters.append(("i.company_id = ?", int(args["company"])))
+    return filters
+
+SEARCH_SQL = """SELECT i.id, i.title, snippet(internships_fts, 1, '\x02', '\x03', '...', 24) AS description,
+                       0 AS description_truncated, i.location, i.stipend, i.category, i.created_at,
+                       i.trust_flag, i.trust_prob, u.full_name as company_name
+                FROM internships_fts f
+                JOIN internships i ON i.id = f.rowid
+                LEFT JOIN users u ON i.company_id = u.id
+                WHERE internships_fts MATCH ? AND f.rowid >= ? {filters}
+                ORDER BY f.rank
+                LIMIT ? OFFSET ?"""
+
+# matches below the rank window, newest first, after the ranked ones
+SEARCH_OLDER_SQL = """SELECT i.id, i.title, snippet(internships_fts, 1, '\x02', '\x03', '...', 24) AS description,
+                             0 AS description_truncated, i.location, i.stipend, i.category, i.created_at,
+                             i.trust_flag, i.trust_prob, u.full_name as company_name
+                      FROM internships_fts f
+                      JOIN internships i ON i.id = f.rowid
+                      LEFT JOIN users u ON i.company_id = u.id
+                      WHERE internships_fts MATCH ? AND f.rowid < ? {filters}
+                      ORDER BY f.rowid DESC
+                      LIMIT ? OFFSET ?"""
+
+SEARCH_LIKE_SQL = """SELECT i.id, i.title, substr(i.description, 1, %d) AS description,
+                            length(i.description) > %d AS description_truncated,
+                            i.location, i.stipend, i.category, i.created_at, i.trust_flag, i.trust_prob,
+                            u.full_name as company_name
+                     FROM internships i LEFT JOIN users u ON i.company_id = u.id
+                     WHERE (i.title LIKE ? OR i.description LIKE ? OR i.skills_required LIKE ?) {filters}
+                     ORDER BY i.created_at DESC, i.id DESC
+                     LIMIT ? OFFSET ?""" % (DESCRIPTION_PREVIEW, DESCRIPTION_PREVIEW)
+
+# bm25 has to score every match before sorting, so a broad term over a big
+# table gets slow; only the newest SEARCH_RANK_WINDOW matches (after the
+# filters) are ranked, and older matches follow them, newest first, for
+# up to SEARCH_OLDER_PAGES more pages.
+# FTS5 applies the rowid floor inside its index, so sorting cost stays
+# bounded (bm25 still reads each term's doclist once for its IDF).
+SEARCH_RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", "2000"))
+SEARCH_FLOOR_SQL = """SELECT f.rowid FROM internships_fts f
+                      JOIN internships i ON i.id = f.rowid
+                      WHERE internships_fts MATCH ? {filters}
+                      ORDER BY f.rowid DESC LIMIT 1 OFFSET ?"""
+SEARCH_OLDER_PAGES = int(os.environ.get("SEARCH_OLDER_PAGES", "50"))
+_search_available = []
+
+def search_max_pages():
+    # the last page index: every page of the ranked window, then the older tail
+    return -(-SEARCH_RANK_WINDOW // PAGE_SIZE) + SEARCH_OLDER_PAGES - 1
+
+def search_available():
+    if not _search_available:
+        row = query_one("SELECT 1 FROM sqlite_master WHERE name = 'internships_fts'")
+        _search_available.append(row is not None)
+    return _search_available[0]
+
+def fts_query(text):
+    # quote every word so user input can't be parsed as FTS5 syntax; no
+    # prefix matching, it merges whole doclists and triples query time on
+    # common words (the porter tokenizer already matches plurals etc.)
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join('"%s"' % w for w in words)
+
+def _highlight(snippet):
+    # escape the text, then turn snippet()'s marker bytes into <mark> tags
+    html = str(escape(snippet or ""))
+    return Markup(html.replace("\x02", "<mark>").replace("\x03", "</mark>"))
+
+def search_internships(text, filters, page=0, limit=PAGE_SIZE):
+    """One page of internships matching text, best match first.
+
+    Returns (rows, has_more). Uses FTS5 with bm25 ranking (over the newest
+    SEARCH_RANK_WINDOW matches, older ones after those) and highlighted
+    snippets when the index exists, else a LIKE scan.
+    """
+    where = "".join(" AND " + cond for cond, _ in filters)
+    params = [value for _, value in filters]
+    if search_available():
+        match = fts_query(text)
+        if match is None:
+            return [], False
+        floor = query_one(SEARCH_FLOOR_SQL.format(filters=where), [match] + params + [SEARCH_RANK_WINDOW - 1])
+        floor = floor[0] if floor else 0
+        offset = page * limit
+        rows = []
+        if offset < SEARCH_RANK_WINDOW or not floor:
+            rows = query_all(SEARCH_SQL.format(filters=where), [match, floor] + params + [limit + 1, offset])
+        if floor and len(rows) < limit + 1:
+            # exactly SEARCH_RANK_WINDOW matches are at or above the floor
+            rows += query_all(SEARCH_OLDER_SQL.format(filters=where),
+                              [match, floor] + params + [limit + 1 - len(rows), max(0, offset - SEARCH_RANK_WINDOW)])
+        rows = [dict(r, description=_highlight(r["description"])) for r in rows]
+    else:
+        like = "%%%s%%" % text
+        rows = query_all(SEARCH_LIKE_SQL.format(filters=where), [like, like, like] + params + [limit + 1, page * limit])
+        rows = [dict(r) for r in rows]
+    return rows[:limit], len(rows) > limit
+
+# route -> [(sql, sample params)]
+ROUTE_QUERIES = {
+    "/": [(RECENT_INTERNSHIPS_SQL, ())],
+    "/internships": [
+        page_query(INTERNSHIPS_PAGE_SQL, [], None, ("i.created_at", "i.id")),
+        page_query(INTERNSHIPS_PAGE_SQL, [], ("2025-01-01", 1), ("i.created_at", "i.id")),
+        page_query(INTERNSHIPS_PAGE_SQL, [("i.category = ?", "x")], None, ("i.created_at", "i.id")),
+        page_query(INTERNSHIPS_PAGE_SQL, [("i.location = ?", "x")], ("2025-01-01", 1), ("i.created_at", "i.id")),
+        page_query(INTERNSHIPS_PAGE_SQL, [("i.company_id = ?", 1)], None, ("i.created_at", "i.id")),
+    ],
+    "/internships?q=": [(SEARCH_FLOOR_SQL.format(filters=""), ('"python"', 1999)),
+                        (SEARCH_FLOOR_SQL.format(filters=" AND i.category = ?"), ('"python"', "x", 1999)),
+                        (SEARCH_SQL.format(filters=""), ('"python"', 0, 21, 0)),
+                        (SEARCH_OLDER_SQL.format(filters=""), ('"python"', 100, 21, 0))],
+    "/manage (company)": [
+        page_query(COMPANY_INTERNSHIPS_PAGE_SQL, [("i.company_id = ?", 1)], ("2025-01-01", 1), ("i.created_at", "i.id")),
+        page_query(APPLICATIONS_PAGE_SQL, [("a.company_id = ?", 1)], ("2025-01-01", 1),
+                   ("a.applied_at", "a.id")),
+    ],
+    "/manage (admin)": [
+        page_query(ADMIN_INTERNSHIPS_PAGE_SQL, [], ("2025-01-01", 1), ("i.created_at", "i.id")),
+        page_query(APPLICATIONS_PAGE_SQL, [], ("2025-01-01", 1), ("a.applied_at", "a.id")),
+    ],
+    "/manage (student)": [(STUDENT_APPLICATIONS_SQL, (1,))],
+    "/recommend": [(GENERATION_SQL, ()), (RECOMMENDER_FIRST_CHANGE_SQL, ()), (RECOMMENDER_LAST_CHANGE_SQL, ()),
+                   (RECOMMENDER_CHANGES_SQL, (0,)), (RECOMMENDER_ROW_SQL, (1,)), (RECOMMENDER_ROWS_SQL, (0,))],
+    "/reports": [(TOP_SKILLS_SQL, ()), (TOP_COMPANIES_SQL, ()), (TOTAL_APPLICATIONS_SQL, ())],
+    "/admin/reports": [(MOST_REPORTED_SQL, (MOST_REPORTED_LIMIT,)),
+                       (REPORT_BUCKETS_SQL, ("day", REPORT_DAYS_SHOWN)),
+                       (REPORT_REASONS_SQL.format(keys="?,?"), ("cluster", "posting:1", "posting:2"))],
+    "/admin/reports?cluster=": [(REPORT_CLUSTER_SQL, ("posting:1",)),
+                                page_query(CLUSTER_REPORTS_PAGE_SQL, [("r.cluster_key = ?", "posting:1")],
+                                           ("2024-01-01", 1), ("r.created_at", "r.id"))],
+    "/export (admin)": [(EXPORT_APPLICATIONS_SQL.format(where=""), ()), (EXPORT_REPORTS_SQL.format(where=""), ())],
+    "/export (company)": [(EXPORT_APPLICATIONS_SQL.format(where="WHERE a.company_id = ?"), (1,)),
+                          (COMPANY_EXPORT_REPORTS_SQL.format(where="WHERE i.company_id = ?"), (1,))],
+    "/predict": [(NEARDUP_CANDIDATES_SQL.format(keys="?,?"), (1, 2))],
+    "scoring worker": [(SCORING_STALE_SQL, ("v", "v", 1))],
+    "page cache": [(GENERATION_SQL, ())],
+    "session snapshot": [(USERS_GENERATION_SQL, ())],
+}
+
+def explain_route_queries(conn):
+    """Return [(route, sql, plan lines, problems)] for ROUTE_QUERIES.
+
+    A problem is a full table scan ("SCAN t" without an index) or a temp
+    b-tree built to sort the result.
+    """
+    out = []
+    for route, queries in ROUTE_QUERIES.items():
+        for sql, params in queries:
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            problems = [p for p in plan
+                        if (p.startswith("SCAN") and "INDEX" not in p) or "TEMP B-TREE" in p]
+            out.append((route, sql, plan, problems))
+    return out
+
+@app.cli.command("explain-queries")
+def explain_queries_command():
+    """Print EXPLAIN QUERY PLAN for every route query."""
+    bad = 0
+    for route, sql, plan, problems in explain_route_queries(get_db_conn()):
+        print("%s  [%s]" % (route, "FULL SCAN" if problems else "ok"))
+        print("    " + " ".join(sql.split()))
+        for line in plan:
+            print("      " + line)
+        bad += bool(problems)
+    print("%d of %d queries need a full scan or sort" % (bad, sum(len(q) for q in ROUTE_QUERIES.values())))
+
+@app.cli.command("score-internships")
+def score_internships_command():
+    """Score every internship that is unscored or scored by an older model."""
+    done = score_stale_internships()
+    if done is None:
+        print("another worker is scoring internships; try again later")
+    else:
+        print("scored %d internships" % done)
+
+@app.cli.command("precompile-templates")
+def precompile_templates_command():
+    """Compile every template into TEMPLATE_CACHE_DIR (run at build time)."""
+    if app.jinja_env.bytecode_cache is None:
+        print("no template cache directory (TEMPLATE_CACHE_DIR)")
+        return
+    app.jinja_env.bytecode_cache.clear()
+    app.jinja_env.cache.clear()
+    t0 = time.perf_counter()
+    preload_templates()
+    print("compiled %d templates into %s in %.2f s" % (len(app.jinja_env.list_templates()), TEMPLATE_CACHE_DIR,
+                                                     time.perf_counter() - t0))
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the /reports and /admin/reports rollup tables from the base tables."""
+    with transaction() as conn:
+        rebuild_rollups(conn)
+        rebuild_report_rollups(conn)
+    print("rollups rebuilt")
 
 # --- Routes ---
 
+def recent_internships_html():
+    def render():
+        recent_rows = query_all(RECENT_INTERNSHIPS_SQL)
+        recent = [dict(r) for r in recent_rows] if recent_rows else []
+        return render_template("_recent_internships.html", recent=recent)
+    return cached_fragment("recent", render)
+
 @app.route("/")
+@cached_page
 def index():
-    recent_rows = query_all("SELECT i.*, u.full_name as company_name FROM internships i LEFT JOIN users u ON i.company_id = u.id ORDER BY created_at DESC LIMIT 8")
-    recent = [dict(r) for r in recent_rows] if recent_rows else []
-    return render_template("index.html", recent=recent)
+    return render_template("index.html", recent_html=recent_internships_html())
 
 @app.route("/register", methods=["GET", "POST"])
 def register():
@@ -256,35 +2062,19 @@ def register():
 
 
 @app.route("/reports")
+@cached_page
 def reports():
-    # Internship / application statistics for dashboard-style reports page
+    # Internship / application statistics for dashboard-style reports page,
+    # read from the rollup tables (see "dashboard rollups")
 
     # Top skills
-    rows = query_all(
-        "SELECT skills_required FROM internships "
-        "WHERE skills_required IS NOT NULL AND trim(skills_required) != ''"
-    )
-    skills = {}
-    for r in rows:
-        txt = r["skills_required"] or ""
-        for s in re.split(r"[,\n;]+", txt):
-            s = s.strip().lower()
-            if not s:
-                continue
-            skills[s] = skills.get(s, 0) + 1
-    top_skills = sorted(skills.items(), key=lambda x: -x[1])[:10]
+    top_skills = [(r["skill"], r["cnt"]) for r in query_all(TOP_SKILLS_SQL)]
 
     # Top companies by number of internships
-    top_companies = query_all(
-        "SELECT u.full_name, COUNT(i.id) AS cnt "
-        "FROM internships i "
-        "LEFT JOIN users u ON i.company_id = u.id "
-        "GROUP BY i.company_id "
-        "ORDER BY cnt DESC LIMIT 10"
-    )
+    top_companies = query_all(TOP_COMPANIES_SQL)
 
     # Total number of applications
-    total_apps_row = query_one("SELECT COUNT(*) AS cnt FROM applications")
+    total_apps_row = query_one(TOTAL_APPLICATIONS_SQL)
     total_apps = total_apps_row["cnt"] if total_apps_row else 0
 
     return render_template(
@@ -296,6 +2086,7 @@ def reports():
 
 
 @app.route("/recommend", methods=["GET", "POST"])
+@admitted()
 def recommend():
     user = get_current_user()
     input_text = ""
@@ -310,8 +2101,7 @@ def recommend():
         input_text = request.form.get("resume_text", "").strip()
 
     try:
-        if recommend_for_text and input_text:
-            # your existing recommender function from model/recommender.py
+        if input_text:
             recs = recommend_for_text(input_text, topn=7)
         else:
             recs = []
@@ -341,17 +2131,16 @@ def report():
 
     user_feedback = request.form.get("user_feedback") or ""
     reason_text = request.form.get("reason") or ""
+    posting_text = (request.form.get("description") or "").strip() or None
 
     try:
         reporter_id = None
-        user = get_current_user()
+        user = current_identity()
         if user:
             reporter_id = user.get("id")
 
-        execute(
-            "INSERT INTO reports (posting_id, user_feedback, reason, reporter_id, created_at) VALUES (?, ?, ?, ?, ?)",
-            (posting_id, user_feedback, reason_text, reporter_id, datetime.utcnow().isoformat())
-        )
+        submit_report((posting_id, posting_ref_for(posting_id), posting_text, user_feedback, reason_text,
+                       reporter_id, datetime.utcnow().isoformat()))
 
         flash("Thank you — your report has been submitted.")
     except Exception:
@@ -384,7 +2173,7 @@ def logout():
 
 @app.route("/post_internship", methods=["GET","POST"])
 def post_internship():
-    user = get_current_user()
+    user = current_identity()
     if not user or user.get("role") != "company":
         flash("Only company users can post internships.")
         return redirect(url_for("login"))
@@ -395,29 +2184,56 @@ def post_internship():
         stipend = request.form.get("stipend","").strip()
         skills_required = request.form.get("skills_required","").strip()
         category = request.form.get("category","").strip()
-        execute("INSERT INTO internships (company_id, title, description, location, stipend, skills_required, category, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                (user["id"], title, description, location, stipend, skills_required, category, datetime.utcnow().isoformat()))
+        with transaction() as conn:
+            conn.execute("INSERT INTO internships (company_id, title, description, location, stipend, skills_required, category, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (user["id"], title, description, location, stipend, skills_required, category, datetime.utcnow().isoformat()))
+            bump_skill_counts(conn, skills_required)
+        wake_scoring_worker()
+        if recommender_index.max_id:
+            # index already built in this worker: append the new row now
+            sync_recommender()
         flash("Internship posted.")
         return redirect(url_for("manage"))
     return render_template("post_internship.html")
 
 @app.route("/internships")
+@cached_page
 def internships():
+    filters = internship_filters(request.args)
+    q = request.args.get("q", "").strip()
+    if q:
+        # ranked search pages by offset; relevance order has no stable cursor
+        max_pages = search_max_pages()
+        page = min(request.args.get("page", 0, type=int), max_pages)
+        try:
+            internships_list, more = search_internships(q, filters, max(page, 0))
+        except Exception:
+            traceback.print_exc()
+            flash("Search failed.")
+            internships_list, more = [], False
+        args = {k: v for k, v in request.args.items() if k != "page"}
+        next_url = url_for("internships", page=page + 1, **args) if more and page < max_pages else None
+        return render_template("internships.html", internships=internships_list, next_url=next_url,
+                               filters=request.args)
+    next_cursor = None
     try:
-        rows = query_all("""SELECT i.id, i.title, i.description, i.location, i.stipend, i.skills_required, i.category, i.created_at,
-                             u.full_name as company_name, u.username as company_username
-                             FROM internships i LEFT JOIN users u ON i.company_id = u.id
-                             ORDER BY i.created_at DESC""")
-        internships_list = [dict(r) for r in rows] if rows else []
+        sql, params = page_query(INTERNSHIPS_PAGE_SQL, filters, decode_cursor(request.args.get("after")),
+                                 ("i.created_at", "i.id"))
+        internships_list, next_cursor = fetch_page(sql, params)
     except Exception:
         traceback.print_exc()
         flash("Could not load internships.")
         internships_list = []
-    return render_template("internships.html", internships=internships_list)
+    next_url = None
+    if next_cursor:
+        args = {k: v for k, v in request.args.items() if k != "after"}
+        next_url = url_for("internships", after=next_cursor, **args)
+    return render_template("internships.html", internships=internships_list, next_url=next_url,
+                           filters=request.args)
 
 @app.route("/apply/<int:internship_id>", methods=["GET","POST"])
 def apply(internship_id):
-    user = get_current_user()
+    user = current_identity()
     if not user or user.get("role") != "student":
         flash("Please login as a student to apply.")
         return redirect(url_for("login"))
@@ -434,49 +2250,68 @@ def apply(internship_id):
         return redirect(url_for("manage"))
     return render_template("apply.html", internship=internship)
 
+# the query args that pick what /manage shows: both cursors, and the
+# internship_filters() an admin can narrow the list with
+MANAGE_VIEW_ARGS = ("after", "apps_after", "category", "location", "company")
+
+def _manage_view_args(args):
+    return {k: args[k] for k in MANAGE_VIEW_ARGS if args.get(k)}
+
+def _manage_lists(internships_sql, internships_where, applications_sql, applications_where):
+    # the two lists page independently: ?after= and ?apps_after=
+    sql, params = page_query(internships_sql, internships_where,
+                             decode_cursor(request.args.get("after")), ("i.created_at", "i.id"))
+    internships_list, next_internships = fetch_page(sql, params)
+    sql, params = page_query(applications_sql, applications_where,
+                             decode_cursor(request.args.get("apps_after")), ("a.applied_at", "a.id"))
+    applications, next_apps = fetch_page(sql, params)
+    args = {k: v for k, v in request.args.items() if k not in ("after", "apps_after")}
+    next_url = url_for("manage", after=next_internships, **args) if next_internships else None
+    next_apps_url = url_for("manage", apps_after=next_apps, **args) if next_apps else None
+    return render_template("manage.html", internships=internships_list, applications=applications,
+                           next_url=next_url, next_apps_url=next_apps_url, statuses=APPLICATION_STATUSES,
+                           view_args=_manage_view_args(request.args))
+
 @app.route("/manage")
 def manage():
-    user = get_current_user()
+    user = current_identity()
     if not user:
         flash("Please login.")
         return redirect(url_for("login"))
     if user.get("role") == "company":
-        rows = query_all("SELECT * FROM internships WHERE company_id = ? ORDER BY created_at DESC", (user["id"],))
-        internships_list = [dict(r) for r in rows] if rows else []
-        return render_template("manage.html", internships=internships_list, applications=[])
+        return _manage_lists(COMPANY_INTERNSHIPS_PAGE_SQL, [("i.company_id = ?", user["id"])],
+                             APPLICATIONS_PAGE_SQL, [("a.company_id = ?", user["id"])])
     elif user.get("role") == "admin":
-        internships_rows = query_all("SELECT i.*, u.full_name as company_name FROM internships i LEFT JOIN users u ON i.company_id = u.id ORDER BY i.created_at DESC")
-        internships_list = [dict(r) for r in internships_rows] if internships_rows else []
-        apps_rows = query_all("""SELECT a.id, a.internship_id, a.student_id, a.resume_text, a.status,
-                                 i.title as internship_title, u.username as student_username, u.full_name as student_name
-                                 FROM applications a
-                                 LEFT JOIN internships i ON a.internship_id = i.id
-                                 LEFT JOIN users u ON a.student_id = u.id
-                                 ORDER BY a.applied_at DESC""")
-        applications = [dict(r) for r in apps_rows] if apps_rows else []
-        return render_template("manage.html", internships=internships_list, applications=applications)
+        return _manage_lists(ADMIN_INTERNSHIPS_PAGE_SQL, internship_filters(request.args),
+                             APPLICATIONS_PAGE_SQL, [])
     else:
-        apps_rows = query_all("""SELECT a.*, i.title as internship_title, u.full_name as company_name
-                                FROM applications a
-                                LEFT JOIN internships i ON a.internship_id = i.id
-                                LEFT JOIN users u ON i.company_id = u.id
-                                WHERE a.student_id = ?
-                                ORDER BY a.applied_at DESC""", (user["id"],))
+        apps_rows = query_all(STUDENT_APPLICATIONS_SQL, (user["id"],))
         applications = [dict(r) for r in apps_rows] if apps_rows else []
         return render_template("manage.html", internships=[], applications=applications)
 
 @app.route("/update_application/<int:app_id>", methods=["POST"])
 def update_application(app_id):
-    user = get_current_user()
+    user = current_identity()
     if not user or user.get("role") not in ("company","admin"):
         flash("Not authorized.")
         return redirect(url_for("manage"))
     status = request.form.get("status","applied")
-    execute("UPDATE applications SET status = ? WHERE id = ?", (status, app_id))
-    flash("Application updated.")
-    return redirect(url_for("manage"))
+    if status not in APPLICATION_STATUSES:
+        flash("Unknown status.")
+        return redirect(url_for("manage"))
+    sql, params = "UPDATE applications SET status = ? WHERE id = ?", [status, app_id]
+    if user.get("role") == "company":
+        # only applications to this company's own internships
+        sql += " AND company_id = ?"
+        params.append(user["id"])
+    with transaction() as conn:
+        updated = conn.execute(sql, params).rowcount
+    flash("Application updated." if updated else "Application not found.")
+    # back to the page of /manage the form was on (the form passes its view args)
+    return redirect(url_for("manage", **_manage_view_args(request.args)))
 
 @app.route("/predict", methods=["POST"])
+@admitted()
 def predict():
     description = request.form.get("description", "").strip()
     if not description:
@@ -494,10 +2329,48 @@ def predict():
         except Exception:
             prob_pct = 0
 
-    recent_rows = query_all("SELECT i.*, u.full_name as company_name FROM internships i LEFT JOIN users u ON i.company_id = u.id ORDER BY created_at DESC LIMIT 8")
-    recent = [dict(r) for r in recent_rows] if recent_rows else []
-    return render_template("index.html", recent=recent, description=description, flag=flag, prob=prob_pct, prob_raw=prob_raw, reason=reason, posting_id=None)
-
+    try:
+        similar_reports = len(similar_reported_postings(description))
+    except Exception:
+        traceback.print_exc()
+        similar_reports = 0
+
+    return render_template("index.html", recent_html=recent_internships_html(), description=description, flag=flag, prob=prob_pct, prob_raw=prob_raw, reason=reason, similar_reports=similar_reports, posting_id=None)
+
+
+def _batch_cost():
+    # one token per description, so a batch costs what the singles would
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get("descriptions")
+    return max(1, len(payload)) if isinstance(payload, list) else 1
+
+@app.route("/api/predict/batch", methods=["POST"])
+@admitted(cost=_batch_cost)
+def api_predict_batch():
+    # body: a JSON list of descriptions, or {"descriptions": [...]};
+    # ?explain=1 adds the matched red-flag spans to each result
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get("descriptions")
+    if not isinstance(payload, list) or not all(d is None or isinstance(d, str) for d in payload):
+        return jsonify(error="Expected a JSON list of description strings."), 400
+    if len(payload) > PREDICT_BATCH_MAX:
+        return jsonify(error="Too many descriptions (max %d per request)." % PREDICT_BATCH_MAX), 413
+    results = [{"flag": flag, "probability": prob, "reason": reason}
+               for flag, prob, reason in predict_batch(payload)]
+    if request.args.get("explain"):
+        for item, text in zip(results, payload):
+            item["red_flags"] = red_flag_matches(text)
+    return jsonify(count=len(results), results=results)
+
+@app.route("/api/predict/cache")
+def api_prediction_cache_stats():
+    return jsonify(prediction_cache_stats())
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return app.response_class(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # @app.route("/reports")
@@ -538,20 +2411,95 @@ def predict():
 #         recs = []
 #     return render_template("recommend.html", recs=recs, input_text=input_text)
 
+def _stream_rows(sql, params, fmt):
+    # a connection of its own, iterated row by row: the SELECT reads one
+    # consistent snapshot and memory stays flat however many rows there are
+    conn = open_db_conn()
+    try:
+        cur = conn.execute(sql, params)
+        fields = [d[0] for d in cur.description]
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(fields)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buf.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    finally:
+        conn.close()
+
+@app.route("/export/<kind>.<fmt>")
+def export(kind, fmt):
+    # ?since=YYYY-MM-DD limits the export to rows created from that day on
+    user = current_identity()
+    if not user or user.get("role") not in ("company", "admin"):
+        flash("Company or admin login required.")
+        return redirect(url_for("login"))
+    queries = EXPORT_QUERIES.get((kind, user["role"]))
+    if queries is None or fmt not in EXPORT_TYPES:
+        return page_not_found(None)
+    sql, date_col = queries
+    where, params = [], []
+    if user["role"] == "company":
+        where.append("%s = ?" % EXPORT_COMPANY_COLUMN[kind])
+        params.append(user["id"])
+    if request.args.get("since"):
+        where.append("%s >= ?" % date_col)
+        params.append(request.args["since"])
+    sql = sql.format(where="WHERE " + " AND ".join(where) if where else "")
+    filename = "%s-%s.%s" % (kind, datetime.utcnow().strftime("%Y%m%d-%H%M%S"), fmt)
+    return app.response_class(_stream_rows(sql, params, fmt), mimetype=EXPORT_TYPES[fmt],
+                              headers={"Content-Disposition": 'attachment; filename="%s"' % filename})
+
+def top_report_reasons(scope, keys):
+    """{key: [(reason, count)]}, the REPORT_TOP_REASONS most common per key."""
+    if not keys:
+        return {}
+    rows = query_all(REPORT_REASONS_SQL.format(keys=",".join("?" * len(keys))), [scope] + list(keys))
+    reasons = {}
+    for r in sorted(rows, key=lambda r: (-r["cnt"], r["reason"])):
+        top = reasons.setdefault(r["key"], [])
+        if len(top) < REPORT_TOP_REASONS:
+            top.append((r["reason"], r["cnt"]))
+    return reasons
+
 @app.route("/admin/reports")
 def admin_reports():
-    user = get_current_user()
+    user = current_identity()
     if not user or user.get("role") != "admin":
         flash("Admin access required.")
         return redirect(url_for("login"))
-    rows = query_all("""SELECT r.id, r.posting_id, r.user_feedback AS feedback, r.reason, r.reporter_id, r.created_at,
-                               u.username as reporter_username, i.title as internship_title
-                        FROM reports r
-                        LEFT JOIN users u ON r.reporter_id = u.id
-                        LEFT JOIN internships i ON r.posting_id = i.id
-                        ORDER BY r.created_at DESC""")
-    reports = [dict(r) for r in rows] if rows else []
-    return render_template("admin_reports.html", reports=reports)
+    cluster_key = request.args.get("cluster")
+    if cluster_key:
+        cluster = query_one(REPORT_CLUSTER_SQL, (cluster_key,))
+        if cluster is None:
+            return page_not_found(None)
+        sql, params = page_query(CLUSTER_REPORTS_PAGE_SQL, [("r.cluster_key = ?", cluster_key)],
+                                 decode_cursor(request.args.get("after")), ("r.created_at", "r.id"))
+        reports, next_cursor = fetch_page(sql, params)
+        next_url = url_for("admin_reports", cluster=cluster_key, after=next_cursor) if next_cursor else None
+        return render_template("admin_reports.html", cluster=dict(cluster), reports=reports, next_url=next_url,
+                               reasons=top_report_reasons("cluster", [cluster_key]).get(cluster_key, []))
+    queue = [dict(r) for r in query_all(MOST_REPORTED_SQL, (MOST_REPORTED_LIMIT,))]
+    days = [dict(r) for r in query_all(REPORT_BUCKETS_SQL, ("day", REPORT_DAYS_SHOWN))]
+    hours = [dict(r) for r in query_all(REPORT_BUCKETS_SQL, ("hour", REPORT_HOURS_SHOWN))]
+    for scope, rows in (("cluster", queue), ("day", days), ("hour", hours)):
+        reasons = top_report_reasons(scope, [r["key"] for r in rows])
+        for r in rows:
+            r["top_reasons"] = reasons.get(r["key"], [])
+    return render_template("admin_reports.html", queue=queue, days=days, hours=hours)
 
 
 @app.route("/ping")
@@ -0,0 +1,110 @@
+"""Benchmark the recommender index at scale.
+
+    python bench/bench_recommender.py [--postings 100000] [--queries 200] [--memory]
+
+Indexes synthetic postings, then reports build time and memory, the cost of
+appending one posting, and query latency for the numpy path (if numpy is
+installed), the pure-Python heap top-k, and a full sort of the same scores.
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import recommender  # noqa: E402
+
+SKILLS = ("python java javascript react node.js sql excel html css flask django c++ c# kotlin swift "
+          "figma photoshop marketing seo content writing sales finance accounting tableau power-bi "
+          "machine-learning pandas numpy aws docker linux git communication research").split()
+ROLES = ["Software Developer", "Data Analyst", "Marketing Intern", "HR Intern", "Designer",
+         "Content Writer", "Business Analyst", "Web Developer", "ML Intern", "Sales Intern"]
+FILLER = ("join our team and learn on real projects with mentorship from senior engineers "
+          "flexible hours remote friendly certificate letter of recommendation stipend").split()
+
+
+def make_posting(rng, i):
+    skills = rng.sample(SKILLS, rng.randint(2, 5))
+    words = rng.sample(FILLER, 8) + rng.sample(SKILLS, 3)
+    return (i, "%s %s" % (rng.choice(ROLES), " ".join(words)), ", ".join(skills))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--postings", type=int, default=100000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--topn", type=int, default=7)
+    ap.add_argument("--memory", action="store_true", help="also measure index memory (slow)")
+    args = ap.parse_args()
+    rng = random.Random(7)
+
+    rows = [make_posting(rng, i) for i in range(1, args.postings + 1)]
+
+    def build_index():
+        index = recommender.RecommenderIndex()
+        for pid, text, skills in rows:
+            index.add(pid, text, skills, {"id": pid})
+        return index
+
+    t0 = time.perf_counter()
+    index = build_index()
+    build = time.perf_counter() - t0
+    mem = None
+    if args.memory:
+        # tracemalloc slows allocation a lot, so measure on a separate build
+        tracemalloc.start()
+        second = build_index()
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del second
+
+    extra = [make_posting(rng, args.postings + i) for i in range(1, 1001)]
+    t0 = time.perf_counter()
+    for pid, text, skills in extra:
+        index.add(pid, text, skills, {"id": pid})
+    add_us = (time.perf_counter() - t0) / len(extra) * 1e6
+
+    queries = [" ".join(rng.sample(SKILLS, rng.randint(2, 6))) for _ in range(args.queries)]
+
+    def time_queries():
+        ms = []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.recommend(q, args.topn)
+            ms.append((time.perf_counter() - t0) * 1e3)
+        return ms
+
+    timings = []
+    if recommender.np is not None:
+        timings.append(("numpy argpartition", time_queries()))
+    np, recommender.np = recommender.np, None
+    nlargest = heapq.nlargest
+    try:
+        timings.append(("python heap top-k", time_queries()))
+        # same scoring, but ranking by sorting every matching document
+        heapq.nlargest = lambda n, items, key: sorted(items, key=key, reverse=True)[:n]
+        timings.append(("python full sort", time_queries()))
+    finally:
+        recommender.np = np
+        heapq.nlargest = nlargest
+
+    print("postings indexed:   %d" % len(index))
+    print("build:              %.2f s (%.1f us/posting)" % (build, build / args.postings * 1e6))
+    if mem is not None:
+        print("index memory:       %.1f MB" % (mem / 1e6))
+    print("incremental add:    %.1f us/posting" % add_us)
+    for name, ms in timings:
+        print("query, %-19s p50 %6.2f ms  p95 %6.2f ms" % (name + ":", percentile(ms, 50), percentile(ms, 95)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark: compiled red-flag engine vs the old per-pattern loop.
+
+    python bench/bench_redflags.py [--words 3000] [--docs 200] [--repeat 5]
+
+Builds long synthetic descriptions (some clean, some with red flags planted
+at random positions), checks both implementations find the same categories
+and prints the time per description for each.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import redflags  # noqa: E402
+
+# the scorer as it was before model/redflags.py, kept here for comparison
+LEGACY_PATTERNS = {
+    "fee": [r"\b(pay|fee|paid|charge|payment|registration fee|processing fee|₹)\b"],
+    "whatsapp": [r"\b(whatsapp|telegram|snapchat)\b"],
+    "personal_contact": [r"\b(gmail\.com|yahoo\.com|hotmail\.com|outlook\.com)\b"],
+    "vague": [r"\b(urgent hiring|no experience required|any graduate|no qualification|max 2 days)\b"],
+    "high_pay": [r"\b(\d{3,} per month|\d+k|\bunrealistic pay\b|\binternship stipend:?\b)\b"]
+}
+
+
+def legacy_categories(text):
+    txt = (text or "").lower()
+    found = []
+    for key, pats in LEGACY_PATTERNS.items():
+        for p in pats:
+            if re.search(p, txt):
+                found.append(key)
+                break
+    return found
+
+
+FILLER = ("we are hiring interns for our software team to work on python sql excel dashboards "
+          "communication skills remote work mentorship project delivery stipend certificate "
+          "duration three months flexible hours learning opportunity data analysis").split()
+FLAGS = ["pay the registration fee", "message us on WhatsApp", "send cv to hr.jobs@gmail.com",
+         "urgent hiring", "no experience required", "earn 40000 per month", "50k stipend",
+         "processing fee of rs 999", "Telegram group",
+         # terms of one rule starting inside another's match
+         "unrealistic pay offered", "internship stipend: 5000 per month"]
+
+
+def make_docs(n, words, seed=42):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        tokens = [rng.choice(FILLER) for _ in range(words)]
+        if i % 2:
+            for flag in rng.sample(FLAGS, rng.randint(1, 3)):
+                tokens.insert(rng.randrange(len(tokens)), flag)
+        docs.append(" ".join(tokens))
+    return docs
+
+
+def best_of(fn, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for d in docs:
+            fn(d)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(docs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--words", type=int, default=3000, help="words per description")
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    docs = make_docs(args.docs, args.words)
+    engine = redflags.RedFlagEngine(redflags.DEFAULT_RULES)
+
+    def compiled_categories(text):
+        return sorted({name for name, _, _ in engine.scan(text)})
+
+    mismatches = sum(sorted(legacy_categories(d)) != compiled_categories(d) for d in docs)
+    legacy = best_of(legacy_categories, docs, args.repeat)
+    compiled = best_of(compiled_categories, docs, args.repeat)
+    print("descriptions: %d x ~%d words" % (args.docs, args.words))
+    print("legacy loop:     %8.1f us/description" % (legacy * 1e6))
+    print("compiled engine: %8.1f us/description" % (compiled * 1e6))
+    print("speedup:         %8.2fx" % (legacy / compiled))
+    print("category mismatches: %d" % mismatches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark /internships?q= search: FTS5 vs a LIKE '%...%' scan.
+
+    python bench/bench_search.py [--rows 1000000] [--queries 30] [--db /tmp/search.db]
+
+Loads synthetic internships into a scratch database through the app's own
+migrations and triggers (so the FTS index is maintained exactly as in
+production), then times search_internships() on the FTS path and on the
+LIKE fallback for the same queries. The scratch file is reused when it
+already holds enough rows, so repeat runs skip the load.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROLES = ["Software Developer", "Data Analyst", "Marketing", "HR", "Graphic Designer", "Content Writer",
+         "Business Analyst", "Web Developer", "Machine Learning", "Sales", "Finance", "Operations"]
+SKILLS = ("python java javascript react node sql excel html css flask django kotlin swift figma "
+          "photoshop seo writing tableau pandas numpy aws docker linux git research accounting").split()
+WORDS = ("join our team and learn on real projects with mentorship from senior engineers flexible hours "
+         "remote friendly certificate letter of recommendation stipend paid monthly duration weeks "
+         "months students graduates apply today growth culture product customers analytics reports").split()
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Hyderabad", "Chennai", "Kolkata", "Remote"]
+QUERIES = ["python", "react developer", "machine learning", "figma", "tableau analyst", "pune",
+           "kotlin", "seo writing", "docker aws", "python django"]
+
+
+def load(app, rows, batch=20000):
+    have = app.query_one("SELECT COUNT(*) FROM internships")[0]
+    if have >= rows:
+        return have, 0.0
+    rng = random.Random(11)
+    app.execute("INSERT OR IGNORE INTO users (id, username, role, full_name) VALUES (1, 'bench-co', 'company', 'Bench Co')")
+    t0 = time.perf_counter()
+    for start in range(have, rows, batch):
+        chunk = []
+        for i in range(start, min(rows, start + batch)):
+            role = rng.choice(ROLES)
+            skills = rng.sample(SKILLS, 3)
+            desc = "%s intern. %s. Skills: %s." % (role, " ".join(rng.sample(WORDS, 25)), ", ".join(skills))
+            chunk.append((1, role + " Intern", desc, rng.choice(CITIES), ", ".join(skills),
+                          "2025-%02d-%02dT00:00:%02d" % (rng.randint(1, 12), rng.randint(1, 28), i % 60)))
+        app.execute_many("INSERT INTO internships (company_id, title, description, location, skills_required, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", chunk)
+        print("  loaded %d rows" % min(rows, start + batch), end="\r", flush=True)
+    print()
+    # a bulk load leaves many small FTS segments that automerge would fold
+    # together over time in production; merge them now so timings reflect
+    # a settled index
+    app.execute("INSERT INTO internships_fts (internships_fts) VALUES ('optimize')")
+    return rows, time.perf_counter() - t0
+
+
+def time_search(app, queries, repeat):
+    out = []
+    for q in queries:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            app.search_internships(q, [])
+            best = min(best, time.perf_counter() - t0)
+        out.append(best * 1e3)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1000000)
+    ap.add_argument("--queries", type=int, default=len(QUERIES), help="how many of the sample queries to run")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "interncheck-bench-search.db"))
+    args = ap.parse_args()
+
+    os.environ["INTERNCHECK_DB"] = args.db
+    os.environ.setdefault("PRELOAD_MODEL", "0")
+    import app  # noqa: E402  (reads INTERNCHECK_DB at import)
+
+    rows, load_s = load(app, args.rows)
+    if load_s:
+        print("loaded %d rows in %.1f s (FTS index maintained by triggers)" % (rows, load_s))
+    queries = (QUERIES * (args.queries // len(QUERIES) + 1))[:args.queries]
+
+    if not app.search_available():
+        sys.exit("this sqlite build has no FTS5")
+    fts = time_search(app, queries, args.repeat)
+    app._search_available[:] = [False]
+    like = time_search(app, queries, 1)
+
+    print("%-20s %12s %12s" % ("query", "fts5 ms", "LIKE ms"))
+    for q, f, l in zip(queries, fts, like):
+        print("%-20s %12.2f %12.1f" % (q, f, l))
+    fts.sort()
+    like.sort()
+    print("median over %d rows: fts5 %.2f ms, LIKE %.1f ms" % (rows, fts[len(fts) // 2], like[len(like) // 2]))
+
+
+if __name__ == "__main__":
+    main()
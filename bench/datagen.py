@@ -0,0 +1,198 @@
+"""Generate a synthetic InternCheck database for benchmarks.
+
+    python bench/datagen.py --scale 100k [--db /tmp/interncheck-bench.db] [--score]
+
+Fills a scratch SQLite file with companies, students, an admin, internships
+(about one in seven written like a scam), applications and reports, at
+presets from 1k to 1m internships; --internships, --students etc. override
+single sizes. Rows go through the app's own migrations and triggers, so the
+FTS index and rollups are maintained as in production; skill counts and the
+near-duplicate report index are rebuilt at the end. A database that already
+holds enough internships is left alone, so repeat runs skip the load.
+
+Every generated user has the password "bench": bench-admin, company<N> and
+student<N>.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "interncheck-bench.db")
+PASSWORD = "bench"
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+
+ROLES = ["Software Developer", "Data Analyst", "Marketing", "HR", "Graphic Designer", "Content Writer",
+         "Business Analyst", "Web Developer", "Machine Learning", "Sales", "Finance", "Operations"]
+CATEGORIES = ["Engineering", "Data", "Marketing", "HR", "Design", "Content", "Business", "Finance"]
+SKILLS = ("python java javascript react node sql excel html css flask django kotlin swift figma "
+          "photoshop seo writing tableau pandas numpy aws docker linux git research accounting").split()
+COMPANIES = ["Infosys", "TCS", "Wipro", "Zoho", "Flipkart", "Swiggy", "Razorpay", "Freshworks", "Reliance",
+             "StartUpX", "CloudNine Labs", "PixelForge", "DataMint", "GreenLeaf", "Nimbus Tech"]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Hyderabad", "Chennai", "Kolkata", "Remote"]
+WORDS = ("join our team and learn on real projects with mentorship from senior engineers flexible hours "
+         "remote friendly certificate letter of recommendation stipend paid monthly duration weeks "
+         "months students graduates apply today growth culture product customers analytics reports").split()
+SCAM_PHRASES = ["pay a registration fee of Rs 999", "processing fee of 1500 required", "contact us on WhatsApp",
+                "message our Telegram group", "send your CV to hr.jobs@gmail.com", "urgent hiring",
+                "no experience required", "earn 40000 per month from home", "any graduate can apply",
+                "limited seats, max 2 days to join"]
+STATUSES = ["applied", "applied", "applied", "shortlisted", "rejected", "accepted"]
+
+
+def sizes_for(scale, **overrides):
+    n = SCALES[scale]
+    sizes = {"internships": n, "companies": max(10, n // 200), "students": max(50, n // 10),
+             "applications": 2 * n, "reports": max(20, n // 20)}
+    sizes.update({k: v for k, v in overrides.items() if v is not None})
+    return sizes
+
+
+def posting(rng, scam):
+    role = rng.choice(ROLES)
+    skills = rng.sample(SKILLS, rng.randint(2, 5))
+    words = rng.sample(WORDS, rng.randint(18, 30))
+    if scam:
+        for phrase in rng.sample(SCAM_PHRASES, rng.randint(2, 4)):
+            words.insert(rng.randrange(len(words)), phrase)
+        stipend = "%d per month" % rng.choice([30000, 40000, 50000, 75000])
+    else:
+        stipend = "%d per month" % rng.choice([0, 5000, 8000, 10000, 15000, 20000])
+    desc = "%s intern at %s. %s. Skills: %s." % (role, rng.choice(COMPANIES), " ".join(words), ", ".join(skills))
+    return role, desc, stipend, ", ".join(skills)
+
+
+def _batches(rows, size=20000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(app, sizes, seed=15, log=print):
+    """Insert the synthetic rows; returns seconds spent per table."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    timings = {}
+
+    def timed(name, sql, rows):
+        t0 = time.perf_counter()
+        done = 0
+        for batch in _batches(rows):
+            app.execute_many(sql, batch)
+            done += len(batch)
+            log("  %-13s %d" % (name, done), end="\r", flush=True)
+        log()
+        timings[name] = round(time.perf_counter() - t0, 2)
+
+    user_sql = ("INSERT OR IGNORE INTO users (username, password, role, full_name, email, skills, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)")
+    users = [("bench-admin", PASSWORD, "admin", "Bench Admin", "admin@example.com", "", start.isoformat())]
+    users += [("company%d" % i, PASSWORD, "company", "%s %d" % (rng.choice(COMPANIES), i),
+               "hr%d@example.com" % i, "", start.isoformat()) for i in range(sizes["companies"])]
+    users += [("student%d" % i, PASSWORD, "student", "Student %d" % i, "s%d@example.com" % i,
+               ", ".join(rng.sample(SKILLS, 4)), start.isoformat()) for i in range(sizes["students"])]
+    timed("users", user_sql, users)
+    ids = {r["username"]: r["id"] for r in app.query_all("SELECT id, username FROM users")}
+    company_ids = [ids["company%d" % i] for i in range(sizes["companies"])]
+    student_ids = [ids["student%d" % i] for i in range(sizes["students"])]
+
+    base_id = app.query_one("SELECT coalesce(max(id), 0) FROM internships")[0]
+    n = sizes["internships"]
+    step = 2 * 365 * 86400 / max(n, 1)  # spread postings over two years, in id order
+
+    def internships():
+        for i in range(n):
+            role, desc, stipend, skills = posting(rng, rng.random() < 0.15)
+            yield (rng.choice(company_ids), role + " Intern", desc, rng.choice(CITIES), stipend, skills,
+                   rng.choice(CATEGORIES), (start + timedelta(seconds=i * step)).isoformat())
+
+    timed("internships", "INSERT INTO internships (company_id, title, description, location, stipend, "
+                         "skills_required, category, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", internships())
+    internship_ids = (base_id + 1, base_id + n)
+
+    def applications():
+        for i in range(sizes["applications"]):
+            when = start + timedelta(seconds=rng.randrange(2 * 365 * 86400))
+            yield (rng.randint(*internship_ids), rng.choice(student_ids), "Resume of a bench student",
+                   rng.choice(STATUSES), when.isoformat())
+
+    timed("applications", "INSERT INTO applications (internship_id, student_id, resume_text, status, applied_at) "
+                          "VALUES (?, ?, ?, ?, ?)", applications())
+
+    def reports():
+        for i in range(sizes["reports"]):
+            when = start + timedelta(seconds=rng.randrange(2 * 365 * 86400))
+            if rng.random() < 0.3:
+                # pasted into /predict, so only the text is known
+                yield ("", None, posting(rng, True)[1], "fake", "fees", rng.choice(student_ids), when.isoformat())
+            else:
+                ref = rng.randint(*internship_ids)
+                feedback = "fake" if rng.random() < 0.8 else "genuine"
+                yield (str(ref), ref, None, feedback, rng.choice(["fees", "whatsapp", "fake company", ""]),
+                       rng.choice(student_ids), when.isoformat())
+
+    timed("reports", "INSERT INTO reports (posting_id, posting_ref, posting_text, user_feedback, reason, "
+                     "reporter_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", reports())
+
+    t0 = time.perf_counter()
+    with app.transaction() as conn:
+        app.rebuild_rollups(conn)
+        app.index_reported_postings(conn)
+    timings["rollups+neardup"] = round(time.perf_counter() - t0, 2)
+    return timings
+
+
+def open_app(db_path):
+    """Import the app against db_path (creating and migrating it)."""
+    os.environ["INTERNCHECK_DB"] = db_path
+    os.environ.setdefault("SCORING_WORKER", "0")  # benchmarks score explicitly, if at all
+    os.environ.setdefault("ADMISSION_CONTROL", "0")  # one client hammering /predict is the point here
+    import app  # noqa: E402  (reads INTERNCHECK_DB at import)
+    return app
+
+
+def ensure_data(app, sizes, score=False, log=print):
+    have = app.query_one("SELECT COUNT(*) FROM internships")[0]
+    if have >= sizes["internships"]:
+        log("database already holds %d internships; skipping the load" % have)
+        return None
+    timings = generate(app, sizes, log=log)
+    if score:
+        t0 = time.perf_counter()
+        done = app.score_stale_internships()
+        timings["scoring"] = round(time.perf_counter() - t0, 2)
+        log("scored %s internships" % done)
+    return timings
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale", choices=sorted(SCALES, key=SCALES.get), default="10k")
+    ap.add_argument("--db", default=DEFAULT_DB)
+    for name in ("internships", "companies", "students", "applications", "reports"):
+        ap.add_argument("--" + name, type=int)
+    ap.add_argument("--score", action="store_true", help="also store trust scores on every internship")
+    args = ap.parse_args()
+
+    sizes = sizes_for(args.scale, internships=args.internships, companies=args.companies,
+                      students=args.students, applications=args.applications, reports=args.reports)
+    app = open_app(args.db)
+    timings = ensure_data(app, sizes, args.score)
+    if timings:
+        print("generated %s into %s" % (sizes, args.db))
+        print("seconds: %s" % timings)
+
+
+if __name__ == "__main__":
+    main()
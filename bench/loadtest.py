@@ -0,0 +1,232 @@
+"""Load-test the main routes and record latency percentiles to JSON.
+
+    python bench/loadtest.py [--scale 10k] [--requests 200] [--concurrency 8]
+                             [--url http://127.0.0.1:8000] [--out run.json] [--baseline old.json]
+
+Makes sure a synthetic database of the requested scale exists (see
+datagen.py), then drives each route in ROUTES twice:
+
+- testclient: sequential requests through Flask's test client, in process.
+  This is the cost of the route itself, without any server.
+- http: --concurrency threads with keep-alive connections against --url
+  (e.g. gunicorn started on the same database with INTERNCHECK_DB), or,
+  without --url, against a threaded werkzeug server started in process.
+
+Each route gets p50/p95/p99/mean latency in ms, errors and requests/s. The
+JSON written to --out also records the sizes and settings, so runs can be
+compared; --baseline prints the p95 change against an earlier file.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+import datagen
+
+# (name, method, path, form data, user to log in as)
+ROUTES = [
+    ("/", "GET", "/", None, None),
+    ("/internships", "GET", "/internships", None, None),
+    ("/internships?q=", "GET", "/internships?q=python+developer", None, None),
+    ("/predict", "POST", "/predict", "description", None),
+    ("/reports", "GET", "/reports", None, None),
+    ("/manage (company)", "GET", "/manage", None, "company0"),
+    ("/manage (student)", "GET", "/manage", None, "student0"),
+    ("/manage (admin)", "GET", "/manage", None, "bench-admin"),
+    ("/admin/reports", "GET", "/admin/reports", None, "bench-admin"),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def summarize(latencies, errors, wall):
+    ms = [x * 1e3 for x in latencies]
+    if not ms:
+        return {"n": 0, "errors": errors}
+    return {"n": len(ms), "errors": errors,
+            "p50_ms": round(percentile(ms, 50), 2), "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2), "mean_ms": round(sum(ms) / len(ms), 2),
+            "rps": round(len(ms) / wall, 1) if wall else None}
+
+
+def predict_texts(n, seed=99):
+    # fresh text per request, so /predict misses the prediction cache
+    rng = random.Random(seed)
+    return [datagen.posting(rng, rng.random() < 0.3)[1] for _ in range(n)]
+
+
+def run_testclient(app, requests, texts):
+    results = {}
+    clients = {}
+    for name, method, path, form, user in ROUTES:
+        client = clients.get(user)
+        if client is None:
+            client = clients[user] = app.app.test_client()
+            if user:
+                client.post("/login", data={"username": user, "password": datagen.PASSWORD})
+        latencies, errors = [], 0
+        for i in range(requests + 3):
+            data = {form: texts[i % len(texts)]} if form else None
+            t0 = time.perf_counter()
+            resp = client.open(path, method=method, data=data)
+            elapsed = time.perf_counter() - t0
+            if i < 3:
+                continue  # warm-up
+            if resp.status_code >= 400 or (user and resp.status_code == 302):
+                errors += 1
+            latencies.append(elapsed)
+        results[name] = summarize(latencies, errors, sum(latencies))
+        print("  testclient %-20s %s" % (name, results[name]))
+    return results
+
+
+class HttpUser:
+    """One keep-alive connection with its own session cookie."""
+
+    def __init__(self, base, user=None):
+        parts = urlsplit(base)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.cookie = None
+        if user:
+            status = self.request("POST", "/login", {"username": user, "password": datagen.PASSWORD})
+            if status != 302:
+                raise RuntimeError("login as %s failed (%s)" % (user, status))
+
+    def request(self, method, path, form=None):
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # the dev server closes after each response; reconnect once
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        resp.read()
+        cookie = resp.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return resp.status
+
+
+def run_http(base, requests, concurrency, texts):
+    results = {}
+    for name, method, path, form, user in ROUTES:
+        users = [HttpUser(base, user) for _ in range(concurrency)]
+        latencies, errors = [], [0]
+        counter = iter(range(requests))
+        lock = threading.Lock()
+
+        def worker(u):
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                data = {form: texts[i % len(texts)]} if form else None
+                t0 = time.perf_counter()
+                try:
+                    status = u.request(method, path, data)
+                except Exception:
+                    status = 599
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    latencies.append(elapsed)
+                    if status >= 400 or (user and status == 302):
+                        errors[0] += 1
+
+        for u in users:  # warm-up, one request per connection
+            u.request(method, path, {form: texts[0]} if form else None)
+        threads = [threading.Thread(target=worker, args=(u,)) for u in users]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results[name] = summarize(latencies, errors[0], time.perf_counter() - t0)
+        print("  http       %-20s %s" % (name, results[name]))
+    return results
+
+
+def start_local_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_port
+
+
+def print_comparison(baseline, current):
+    print("p95 vs baseline (ms):")
+    for mode, routes in current["results"].items():
+        for name, stats in routes.items():
+            old = baseline.get("results", {}).get(mode, {}).get(name, {}).get("p95_ms")
+            new = stats.get("p95_ms")
+            if old and new:
+                print("  %-10s %-20s %9.2f -> %9.2f  (%+.0f%%)" % (mode, name, old, new, (new - old) / old * 100))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale", choices=sorted(datagen.SCALES, key=datagen.SCALES.get), default="10k")
+    ap.add_argument("--db", default=None, help="scratch database (default: one per scale in the temp dir)")
+    ap.add_argument("--requests", type=int, default=200, help="measured requests per route and mode")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--mode", choices=["testclient", "http", "both"], default="both")
+    ap.add_argument("--url", help="server to load instead of an in-process one")
+    ap.add_argument("--out", default="loadtest-%s.json" % datetime.now().strftime("%Y%m%d-%H%M%S"))
+    ap.add_argument("--baseline", help="earlier --out file to compare p95 against")
+    args = ap.parse_args()
+
+    db = args.db or datagen.DEFAULT_DB.replace(".db", "-%s.db" % args.scale)
+    sizes = datagen.sizes_for(args.scale)
+    app = datagen.open_app(db)
+    load = datagen.ensure_data(app, sizes)
+    texts = predict_texts(max(args.requests, 50) * 2)
+
+    results = {}
+    if args.mode in ("testclient", "both"):
+        results["testclient"] = run_testclient(app, args.requests, texts)
+    if args.mode in ("http", "both"):
+        server, base = (None, args.url) if args.url else start_local_server(app)
+        try:
+            results["http"] = run_http(base, args.requests, args.concurrency, texts)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "db": db, "scale": args.scale, "sizes": sizes, "load_seconds": load,
+        "requests_per_route": args.requests, "concurrency": args.concurrency,
+        "server": args.url or "werkzeug (in process)",
+        "python": platform.python_version(), "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("wrote %s" % args.out)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Measure cold start: import time, time to first response, slowest imports.
+
+    python bench/startup.py [--runs 5] [--scale 1k] [--env NAME=VALUE ...] [--gunicorn]
+                            [--out startup.json] [--baseline old.json]
+
+Every run is a fresh interpreter, started with -X importtime, that imports
+the app and sends the first request to each of FIRST_REQUESTS through the
+test client. Nothing is warm except the OS page cache and whatever the app
+keeps on disk between processes (the template bytecode cache; pass
+--env TEMPLATE_CACHE_DIR= to measure without it). Each run records:
+
+- interpreter_ms: spawn until the probe's first line runs
+- import_ms: `import app`, including the schema check and model/template preload
+- first_ms: the first response of each route
+- total_ms: spawn until the last first response, timed by this script
+
+The summary holds the median of each number over the runs and the imports
+with the largest cumulative time in the first run. --gunicorn also starts
+`gunicorn app:app` with one worker (gunicorn.conf.py applies) and times
+spawn to the first 200 from / over HTTP.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import datagen
+
+ROOT = datagen.ROOT
+FIRST_REQUESTS = [
+    ("GET", "/", None),
+    ("GET", "/internships", None),
+    ("POST", "/predict", {"description": "Data analyst intern, Excel and SQL. Stipend 8000 per month, Pune."}),
+]
+
+PROBE = """
+import json, sys, time
+started = time.time()
+t0 = time.perf_counter()
+sys.path.insert(0, %(root)r)
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+first = {}
+for method, path, data in %(requests)r:
+    t = time.perf_counter()
+    status = client.open(path, method=method, data=data).status_code
+    first[path] = [round((time.perf_counter() - t) * 1e3, 2), status]
+print("PROBE " + json.dumps({"started": started, "import_ms": round((imported - t0) * 1e3, 2), "first": first}))
+"""
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def top_imports(stderr, n):
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((int(m.group(2)), int(m.group(1)), m.group(4)))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(cum / 1e3, 1), "self_ms": round(own / 1e3, 1)}
+            for cum, own, name in rows[:n]]
+
+
+def probe_once(env):
+    spawned = time.time()
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           PROBE % {"root": ROOT, "requests": FIRST_REQUESTS}],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    total = time.perf_counter() - t0
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("PROBE ")), None)
+    if proc.returncode or line is None:
+        raise SystemExit("probe failed:\n" + proc.stderr[-3000:])
+    data = json.loads(line[len("PROBE "):])
+    run = {"interpreter_ms": round((data["started"] - spawned) * 1e3, 2), "import_ms": data["import_ms"],
+           "first_ms": {path: ms for path, (ms, status) in data["first"].items()},
+           "status": {path: status for path, (ms, status) in data["first"].items()},
+           "total_ms": round(total * 1e3, 2)}
+    return run, proc.stderr
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def gunicorn_once(env, timeout=60.0):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(["gunicorn", "app:app", "-w", "1", "-b", "127.0.0.1:%d" % port],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise SystemExit("gunicorn exited with %s" % proc.returncode)
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                conn.request("GET", "/")
+                status = conn.getresponse().status
+                conn.close()
+                if status == 200:
+                    return round((time.perf_counter() - t0) * 1e3, 2)
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit("gunicorn did not answer within %.0f s" % timeout)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def median_of(runs):
+    summary = {key: round(statistics.median(r[key] for r in runs), 2)
+               for key in ("interpreter_ms", "import_ms", "total_ms")}
+    summary["first_ms"] = {path: round(statistics.median(r["first_ms"][path] for r in runs), 2)
+                           for path in runs[0]["first_ms"]}
+    return summary
+
+
+def print_comparison(baseline, current):
+    old, new = baseline.get("median", {}), current["median"]
+    print("median vs baseline (ms):")
+    pairs = [(k, old.get(k), new.get(k)) for k in ("import_ms", "total_ms", "gunicorn_first_200_ms")]
+    pairs += [("first " + p, old.get("first_ms", {}).get(p), ms) for p, ms in new.get("first_ms", {}).items()]
+    for name, a, b in pairs:
+        if a and b:
+            print("  %-24s %9.2f -> %9.2f  (%+.0f%%)" % (name, a, b, (b - a) / a * 100))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--scale", choices=sorted(datagen.SCALES, key=datagen.SCALES.get), default="1k")
+    ap.add_argument("--db", default=None, help="database to start against (default: a bench database per scale)")
+    ap.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="extra environment for the app")
+    ap.add_argument("--gunicorn", action="store_true", help="also time gunicorn spawn to the first 200")
+    ap.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    ap.add_argument("--out", default="startup-%s.json" % datetime.now().strftime("%Y%m%d-%H%M%S"))
+    ap.add_argument("--baseline", help="earlier --out file to compare medians against")
+    args = ap.parse_args()
+
+    db = args.db or datagen.DEFAULT_DB.replace(".db", "-%s.db" % args.scale)
+    if not os.path.exists(db):
+        # in a subprocess, so this one never imports the app
+        subprocess.run([sys.executable, os.path.join(ROOT, "bench", "datagen.py"), "--scale", args.scale,
+                        "--db", db], check=True)
+    env = dict(os.environ, INTERNCHECK_DB=db, SCORING_WORKER="0")
+    env.update(item.split("=", 1) for item in args.env)
+
+    runs, first_stderr = [], None
+    for i in range(args.runs):
+        run, stderr = probe_once(env)
+        first_stderr = first_stderr or stderr
+        runs.append(run)
+        print("  run %d: import %.0f ms, first / %.0f ms, total %.0f ms"
+              % (i + 1, run["import_ms"], run["first_ms"]["/"], run["total_ms"]))
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"), "db": db, "env": args.env,
+        "python": platform.python_version(), "cpus": os.cpu_count(),
+        "runs": runs, "median": median_of(runs), "top_imports": top_imports(first_stderr, args.top),
+    }
+    if args.gunicorn:
+        times = [gunicorn_once(env) for _ in range(args.runs)]
+        report["gunicorn_first_200_ms"] = times
+        report["median"]["gunicorn_first_200_ms"] = round(statistics.median(times), 2)
+
+    print("median: %s" % json.dumps(report["median"]))
+    print("slowest imports (cumulative ms):")
+    for item in report["top_imports"]:
+        print("  %8.1f  %s" % (item["cumulative_ms"], item["module"]))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("wrote %s" % args.out)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# Picked up automatically by `gunicorn app:app` run from the repo root.
+import gc
+import os
+import shutil
+import tempfile
+
+import metrics
+
+# import the app (and with it the model artifacts) once in the master;
+# workers get them through fork instead of unpickling their own copy
+preload_app = True
+
+# threads per worker (gthread when > 1); with INFERENCE_WORKERS set, the
+# other threads keep serving while one waits on the inference pool
+threads = int(os.environ.get("WEB_THREADS", "1"))
+
+# workers write their /metrics values here so any of them can report the sum;
+# one directory per server, emptied at start
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "interncheck-metrics-%d" % os.getpid()))
+# SCORING_CONCURRENCY is a budget for the whole server: workers take their
+# slots as locks on files here
+os.environ.setdefault("SCORING_SLOTS_DIR", os.path.join(tempfile.gettempdir(), "interncheck-slots-%d" % os.getpid()))
+
+
+def on_starting(server):
+    metrics.clear_directory(os.environ["METRICS_DIR"])
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    shutil.rmtree(os.environ["SCORING_SLOTS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    # move everything loaded so far out of the GC's reach, so collections in
+    # the workers don't write to (and un-share) those pages
+    gc.freeze()
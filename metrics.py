@@ -0,0 +1,178 @@
+"""Counters, gauges and histograms rendered in the Prometheus text format.
+
+A small stand-in for prometheus_client (not a dependency here). Each process
+keeps its own values in memory and, when directory is set, writes them to
+<directory>/metrics-<pid>.json at most every flush_interval seconds. render()
+merges those files with the live values of the calling process, so any
+gunicorn worker can answer /metrics for all of them. Files of workers that
+have exited stay in the sum, which keeps counters monotonic; clear the
+directory when the server starts (gunicorn.conf.py does). Gauges are summed
+across workers too, so they suit per-process amounts such as queue depths;
+a worker flushes its final values when it exits.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def clear_directory(directory):
+    for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class Registry:
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._meta = {}  # name -> (type, help, buckets)
+        self._lock = threading.Lock()
+        self._reset()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}  # (name, labels) -> value
+        self._gauges = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._flushed = 0.0
+
+    def counter(self, name, help_text):
+        self._meta[name] = ("counter", help_text, None)
+
+    def gauge(self, name, help_text):
+        self._meta[name] = ("gauge", help_text, None)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._meta[name] = ("histogram", help_text, tuple(buckets))
+
+    def _check_fork(self):
+        # a forked worker starts from zero instead of repeating the parent's counts
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels=None, amount=1.0):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._check_fork()
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def set(self, name, value, labels=None):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._check_fork()
+            self._gauges[key] = float(value)
+
+    def observe(self, name, value, labels=None):
+        buckets = self._meta[name][2]
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._check_fork()
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(buckets) + 2)
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {"counters": [[n, list(map(list, l)), v] for (n, l), v in self._counters.items()],
+                    "gauges": [[n, list(map(list, l)), v] for (n, l), v in self._gauges.items()],
+                    "histograms": [[n, list(map(list, l)), list(h)] for (n, l), h in self._histograms.items()]}
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        # a missing directory means the server is shutting down
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        self._flushed = time.monotonic()
+        path = os.path.join(self.directory, "metrics-%d.json" % os.getpid())
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp, path)
+
+    def _merged(self):
+        snapshots = [self._snapshot()]
+        if self.directory:
+            own = os.path.join(self.directory, "metrics-%d.json" % os.getpid())
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # a worker mid-write or gone; next scrape catches up
+        counters, histograms = {}, {}
+        for snap in snapshots:
+            # gauges sum like counters; render() keeps them apart by type
+            for name, labels, value in snap.get("counters", []) + snap.get("gauges", []):
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, values in snap.get("histograms", ()):
+                key = (name, tuple(map(tuple, labels)))
+                h = histograms.get(key)
+                if h is None:
+                    histograms[key] = list(values)
+                elif len(h) == len(values):
+                    histograms[key] = [a + b for a, b in zip(h, values)]
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self._merged()
+        lines = []
+        for name, (kind, help_text, buckets) in sorted(self._meta.items()):
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, kind))
+            if kind in ("counter", "gauge"):
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append("%s%s %s" % (name, _format_labels(labels), _format_value(value)))
+                continue
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), h[:-2] + [h[-1] - sum(h[:-2])]):
+                    cumulative += count
+                    lines.append("%s_bucket%s %d" % (name, _format_labels(labels + (("le", _format_value(bound)),)),
+                                                     cumulative))
+                lines.append("%s_sum%s %s" % (name, _format_labels(labels), repr(float(h[-2]))))
+                lines.append("%s_count%s %d" % (name, _format_labels(labels), h[-1]))
+        return "\n".join(lines) + "\n"
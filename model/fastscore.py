@@ -0,0 +1,238 @@
+"""The scam classifier as plain numpy arrays, so serving needs no sklearn.
+
+export() turns a fitted TfidfVectorizer or HashingVectorizer plus a
+MultinomialNB into a directory of .npy files and a meta.json:
+
+    meta.json              classes, class log priors, analyzer settings, stop words
+    feature_log_prob.npy   (n_features, n_classes) float64, rows read per token
+    idf.npy                tfidf only
+    term_hashes.npy        tfidf only: sorted 64-bit hashes of the vocabulary
+    term_columns.npy       tfidf only: feature column of each hash
+
+load() memory-maps the arrays read-only, so every worker on a host shares
+one copy of the pages and the vocabulary costs no Python objects at all:
+a term is found by binary search over its hash. Scorer.transform() and
+Scorer.predict_proba() repeat what sklearn does (same token pattern, stop
+words, n-grams, tf-idf or murmurhash3 hashing, l2 norm, naive Bayes joint
+log-likelihood), so probabilities match sklearn's up to float rounding.
+Scorer also has classes_, so the app can use it in place of both
+unpickled objects.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import struct
+from collections import namedtuple
+
+# numpy is optional (without it the app unpickles sklearn objects) and is
+# imported by load()/export(), so importing this module stays cheap
+np = None
+
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+# the nonzero cells of a batch of texts, like a COO sparse matrix
+SparseRows = namedtuple("SparseRows", "n_rows rows cols values")
+
+
+def available():
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def murmurhash3_32(data, seed=0):
+    """Signed MurmurHash3 (x86, 32-bit) of bytes, as HashingVectorizer uses it."""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xFFFFFFFF
+    h = seed
+    nblocks = len(data) // 4
+    for k in struct.unpack_from("<%dI" % nblocks, data):
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    tail = data[nblocks * 4:]
+    if tail:
+        k = 0
+        for i, byte in enumerate(tail):
+            k |= byte << (8 * i)
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+# --- export (runs next to sklearn, in model/train_model.py) ---
+
+def _analyzer_meta(vectorizer):
+    params = vectorizer.get_params()
+    if params.get("analyzer") != "word" or callable(params.get("tokenizer")) or callable(params.get("preprocessor")):
+        raise ValueError("only the built-in word analyzer can be exported")
+    if params.get("strip_accents"):
+        raise ValueError("strip_accents is not supported")
+    stop_words = vectorizer.get_stop_words()
+    return {
+        "lowercase": bool(params.get("lowercase", True)),
+        "token_pattern": params["token_pattern"],
+        "ngram_range": list(params.get("ngram_range", (1, 1))),
+        "stop_words": sorted(stop_words) if stop_words else [],
+        "binary": bool(params.get("binary", False)),
+        "norm": params.get("norm"),
+    }
+
+
+def export(model, vectorizer, directory):
+    """Write model and vectorizer as arrays under directory (created)."""
+    _import_numpy()
+    if type(model).__name__ != "MultinomialNB":
+        raise ValueError("only MultinomialNB can be exported, not %s" % type(model).__name__)
+    meta = _analyzer_meta(vectorizer)
+    meta.update(format=FORMAT_VERSION, classes=[str(c) for c in model.classes_],
+                class_log_prior=[float(p) for p in model.class_log_prior_])
+    arrays = {"feature_log_prob": np.ascontiguousarray(model.feature_log_prob_.T, dtype=np.float64)}
+    kind = type(vectorizer).__name__
+    if kind == "HashingVectorizer":
+        meta.update(kind="hashing", n_features=int(vectorizer.n_features),
+                    alternate_sign=bool(vectorizer.alternate_sign))
+    elif kind == "TfidfVectorizer":
+        if vectorizer.sublinear_tf:
+            raise ValueError("sublinear_tf is not supported")
+        terms = sorted(vectorizer.vocabulary_.items(), key=lambda item: term_hash(item[0]))
+        hashes = np.array([term_hash(t) for t, _ in terms], dtype=np.uint64)
+        if len(hashes) > 1 and (hashes[1:] == hashes[:-1]).any():
+            raise ValueError("vocabulary hash collision; cannot export")
+        arrays["term_hashes"] = hashes
+        arrays["term_columns"] = np.array([col for _, col in terms], dtype=np.int32)
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None
+        meta.update(kind="tfidf")
+    else:
+        raise ValueError("only TfidfVectorizer and HashingVectorizer can be exported, not %s" % kind)
+    os.makedirs(directory, exist_ok=True)
+    checksums = {}
+    for name, arr in arrays.items():
+        if arr is None:
+            continue
+        path = os.path.join(directory, name + ".npy")
+        np.save(path, arr)
+        with open(path, "rb") as f:
+            checksums[name] = hashlib.sha1(f.read()).hexdigest()
+    # meta.json goes last and names every array: a reader that sees it sees
+    # complete files, and its checksums change whenever any array does
+    meta["arrays"] = checksums
+    with open(os.path.join(directory, META_NAME), "w") as f:
+        json.dump(meta, f, indent=1)
+    return directory
+
+
+# --- serving ---
+
+class Scorer:
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_NAME)) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError("unknown scorer format %r" % meta.get("format"))
+        self.meta = meta
+        arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r") for name in meta["arrays"]}
+        self.classes_ = np.array(meta["classes"])
+        self.class_log_prior = np.array(meta["class_log_prior"], dtype=np.float64)
+        self.feature_log_prob = arrays["feature_log_prob"]
+        self.kind = meta["kind"]
+        self.term_hashes = arrays.get("term_hashes")
+        self.term_columns = arrays.get("term_columns")
+        self.idf = arrays.get("idf")
+        self.token_re = re.compile(meta["token_pattern"])
+        self.stop_words = frozenset(meta["stop_words"])
+        self.min_n, self.max_n = meta["ngram_range"]
+
+    def analyze(self, text):
+        if self.meta["lowercase"]:
+            text = text.lower()
+        tokens = self.token_re.findall(text)
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+        grams = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _columns(self, terms):
+        # (term positions, columns, signs) of the terms that map to a feature
+        if self.kind == "hashing":
+            n = self.meta["n_features"]
+            hashes = np.array([murmurhash3_32(t.encode("utf-8")) for t in terms], dtype=np.int64)
+            cols = np.abs(hashes) % n
+            cols[hashes == -2147483648] = (2147483647 - (n - 1)) % n
+            signs = np.where(hashes < 0, -1.0, 1.0) if self.meta["alternate_sign"] else np.ones(len(terms))
+            return np.arange(len(terms)), cols, signs
+        hashes = np.array([term_hash(t) for t in terms], dtype=np.uint64)
+        pos = np.searchsorted(self.term_hashes, hashes)
+        pos[pos == len(self.term_hashes)] = 0
+        found = np.flatnonzero(self.term_hashes[pos] == hashes)
+        return found, self.term_columns[pos[found]].astype(np.int64), np.ones(len(found))
+
+    def transform(self, texts):
+        terms, term_rows = [], []
+        for r, text in enumerate(texts):
+            grams = self.analyze(text)
+            terms.extend(grams)
+            term_rows.extend([r] * len(grams))
+        n_rows = len(texts)
+        if not terms:
+            return SparseRows(n_rows, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+        found, cols, signs = self._columns(terms)
+        rows = np.array(term_rows, dtype=np.int64)[found]
+        # sum repeated (row, column) pairs, as sklearn's sparse matrices do
+        width = int(self.feature_log_prob.shape[0])
+        cells, inverse = np.unique(rows * width + cols, return_inverse=True)
+        values = np.bincount(inverse, weights=signs)
+        rows, cols = cells // width, cells % width
+        if self.meta["binary"]:
+            values = np.where(values != 0, 1.0, 0.0)
+        if self.idf is not None:
+            values = values * self.idf[cols]
+        norm = self.meta["norm"]
+        if norm in ("l1", "l2"):
+            totals = np.bincount(rows, weights=values * values if norm == "l2" else np.abs(values), minlength=n_rows)
+            if norm == "l2":
+                totals = np.sqrt(totals)
+            totals[totals == 0] = 1.0
+            values = values / totals[rows]
+        return SparseRows(n_rows, rows, cols, values)
+
+    def predict_proba(self, X):
+        jll = np.tile(self.class_log_prior, (X.n_rows, 1))
+        if len(X.cols):
+            contrib = self.feature_log_prob[X.cols] * X.values[:, None]
+            for k in range(jll.shape[1]):
+                jll[:, k] += np.bincount(X.rows, weights=contrib[:, k], minlength=X.n_rows)
+        top = jll.max(axis=1, keepdims=True)
+        log_norm = top + np.log(np.exp(jll - top).sum(axis=1, keepdims=True))
+        return np.exp(jll - log_norm)
+
+
+def load(directory):
+    if not available():
+        raise RuntimeError("numpy is required for the exported scorer")
+    _import_numpy()
+    return Scorer(directory)
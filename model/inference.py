@@ -0,0 +1,301 @@
+"""Run the classifier in a pool of worker processes, micro-batched.
+
+    pool = InferencePool(workers=2)
+    probs = pool.genuine_probs(paths, checksum, ["text one", "text two"])
+
+Each worker loads the artifacts named by paths (an exported scorer's
+meta.json, or the model and vectorizer pickles) the first time it sees a
+checksum, and keeps them until the checksum changes, so a retrained model
+reaches the workers with the next call. Inference then runs outside the
+calling process's GIL.
+
+genuine_probs() queues every text and waits. One batcher thread per pool
+takes what has queued, up to max_batch texts, once the oldest has waited
+max_wait seconds or the batch is full, and sends it to a worker as one
+vectorized call. At most `workers` batches are in flight; while they are,
+texts keep queuing and the next batch simply gets bigger, so concurrent
+single predictions from many request threads cost a few large calls.
+A call that fails or takes longer than timeout raises in the caller, which
+is expected to fall back to something cheaper.
+
+score_batch() is that caller for the app and for model/score_file.py: it
+scores a batch with the model (here, in the pool, or however the caller
+says) and falls back to the red-flag heuristics for what the model can't
+score.
+"""
+import io
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from model import fastscore
+
+
+def unpickle(data):
+    try:
+        return pickle.loads(data)
+    except Exception:
+        pass
+    # model/train_model.py saves with joblib, whose files plain pickle can't read
+    try:
+        import joblib
+        return joblib.load(io.BytesIO(data))
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def artifact_paths(model_dir, numpy_scorer=True):
+    """The artifact files to load from model_dir, newest version first.
+
+    model/train_model.py writes versions to model_dir/versions/<name>/ and
+    flips model_dir/CURRENT to the newest; without it the pickles in
+    model_dir are used. An exported scorer next to the pickles wins unless
+    numpy_scorer is false (or numpy is missing).
+    """
+    try:
+        with open(os.path.join(model_dir, "CURRENT")) as f:
+            name = f.read().strip()
+    except OSError:
+        name = ""
+    base = os.path.join(model_dir, "versions", name) if name else model_dir
+    paths = os.path.join(base, "internship_model.pkl"), os.path.join(base, "vectorizer.pkl")
+    if numpy_scorer and fastscore.available():
+        # the exported scorer's meta.json names and checksums every array
+        meta = os.path.join(base, "scorer", fastscore.META_NAME)
+        if os.path.exists(meta):
+            return (meta,)
+    return paths
+
+
+def load_artifacts(paths):
+    """(model, vectorizer) from artifact paths, or (None, None)."""
+    if paths[0].endswith(fastscore.META_NAME):
+        # one object serves as both: transform() and predict_proba()
+        model = fastscore.load(os.path.dirname(paths[0]))
+        return model, model
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    model, vec = [unpickle(b) for b in blobs]
+    if model is None or vec is None:
+        return None, None
+    return model, vec
+
+
+def normalize_text(text):
+    return " ".join((text or "").lower().split())
+
+
+class FallbackResult(tuple):
+    """A heuristic (flag, prob, reason) given because the model call failed.
+
+    Reads like any other result, but it is not what this model version says
+    about the text, so it must not be cached or stored under that version.
+    """
+
+
+def score_batch(texts, model, vec, heuristic, probs_for=None, on_scored=None):
+    """Score many descriptions at once; returns [(flag, prob, reason)].
+
+    Non-empty texts are scored with one call, probs_for(texts) when given
+    (e.g. an InferencePool), else one predict_proba in this process. Texts
+    the model could not score fall back to heuristic(text) -> (score,
+    reason); when a model was loaded but the call failed those come back as
+    FallbackResult. on_scored(kind, count, seconds) is told about each part:
+    kind is "empty" (seconds None), "model" or "heuristic".
+    """
+    texts = [(t or "").strip() for t in texts]
+    results = [None] * len(texts)
+    todo = []
+    for i, text in enumerate(texts):
+        if text:
+            todo.append(i)
+        else:
+            results[i] = ("suspect", 0.0, "Empty text submitted.")
+    if on_scored is not None and len(todo) < len(texts):
+        on_scored("empty", len(texts) - len(todo), None)
+    model_failed = False
+    if todo and model is not None and vec is not None:
+        try:
+            t0 = time.perf_counter()
+            batch = [texts[i] for i in todo]
+            probs = probs_for(batch) if probs_for is not None else genuine_probs(model, vec.transform(batch))
+            for i, prob in zip(todo, probs):
+                results[i] = (flag_for(prob), prob, "Model-based prediction")
+            if on_scored is not None:
+                on_scored("model", len(todo), time.perf_counter() - t0)
+        except Exception:
+            traceback.print_exc()
+            model_failed = True
+    fallback = [i for i in todo if results[i] is None]
+    if fallback:
+        t0 = time.perf_counter()
+        for i in fallback:
+            score, reason = heuristic(texts[i])
+            results[i] = (flag_for(score), float(score), reason)
+            if model_failed:
+                results[i] = FallbackResult(results[i])
+        if on_scored is not None:
+            on_scored("heuristic", len(fallback), time.perf_counter() - t0)
+    return results
+
+
+def flag_for(prob):
+    return "genuine" if prob >= 0.70 else ("fake" if prob <= 0.40 else "suspect")
+
+
+def genuine_probs(model, X):
+    # probability of the 'genuine' class for every row of X
+    if hasattr(model, "predict_proba"):
+        probs = model.predict_proba(X)
+        if hasattr(model, "classes_"):
+            classes = list(model.classes_)
+            if "genuine" in classes:
+                return [float(p) for p in probs[:, classes.index("genuine")]]
+        return [float(max(row)) for row in probs]
+    return [1.0 if pred else 0.0 for pred in model.predict(X)]
+
+
+# --- in the worker processes ---
+
+_loaded = {"checksum": None, "model": None, "vec": None}
+
+
+def _ensure_loaded(paths, checksum):
+    if _loaded["checksum"] != checksum:
+        model, vec = load_artifacts(paths)
+        _loaded.update(checksum=checksum, model=model, vec=vec)
+    if _loaded["model"] is None:
+        raise RuntimeError("no model could be loaded from %s" % (paths,))
+    return _loaded["model"], _loaded["vec"]
+
+
+def _init_worker(paths, checksum):
+    try:
+        _ensure_loaded(paths, checksum)
+    except Exception:
+        traceback.print_exc()  # the first call retries and reports it
+
+
+def _score(paths, checksum, texts):
+    model, vec = _ensure_loaded(paths, checksum)
+    return genuine_probs(model, vec.transform(texts))
+
+
+def _ping():
+    return os.getpid()
+
+
+# --- in the web process ---
+
+class InferencePool:
+    def __init__(self, workers=2, max_batch=64, max_wait=0.002, timeout=10.0, start_method="spawn",
+                 on_batch=None):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.start_method = start_method
+        self.on_batch = on_batch  # called with (texts, seconds) after each batch
+        self._queue = deque()  # (queued at, (paths, checksum), text, future)
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = None
+        self._init_args = None
+        self._thread = None
+        self._closed = False
+
+    def start(self, paths, checksum):
+        """Start the worker processes, loading paths, and the batcher thread."""
+        self._init_args = (tuple(paths), checksum)
+        self._executor = self._new_executor()
+        # submitted back to back, so each one starts its own process now
+        # instead of on the first requests
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context(self.start_method),
+                                   initializer=_init_worker, initargs=self._init_args)
+
+    def genuine_probs(self, paths, checksum, texts):
+        if self._closed:
+            raise RuntimeError("inference pool is shut down")
+        now = time.monotonic()
+        key = (tuple(paths), checksum)
+        futures = [Future() for _ in texts]
+        with self._cond:
+            self._queue.extend((now, key, text, f) for text, f in zip(texts, futures))
+            self._cond.notify()
+        deadline = now + self.timeout
+        return [f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures]
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # wait for company until the oldest item has waited max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = self._queue[0][0] + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            key = self._queue[0][1]
+            batch = []
+            while self._queue and len(batch) < self.max_batch and self._queue[0][1] == key:
+                batch.append(self._queue.popleft())
+        return key, batch
+
+    def _run(self):
+        while True:
+            key, batch = self._next_batch()
+            self._slots.acquire()  # at most `workers` batches in flight
+            try:
+                self._submit(key, batch)
+            except Exception as exc:
+                self._slots.release()
+                for item in batch:
+                    item[3].set_exception(exc)
+
+    def _submit(self, key, batch):
+        texts = [item[2] for item in batch]
+        t0 = time.perf_counter()
+        try:
+            done = self._executor.submit(_score, key[0], key[1], texts)
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory); replace the pool once
+            traceback.print_exc()
+            self._executor = self._new_executor()
+            done = self._executor.submit(_score, key[0], key[1], texts)
+
+        def finish(done):
+            self._slots.release()
+            try:
+                probs = done.result()
+            except BaseException as exc:
+                for item in batch:
+                    item[3].set_exception(exc)
+                return
+            if self.on_batch is not None:
+                self.on_batch(texts, time.perf_counter() - t0)
+            for item, prob in zip(batch, probs):
+                item[3].set_result(prob)
+
+        done.add_done_callback(finish)
+
+    def shutdown(self):
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
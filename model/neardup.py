@@ -0,0 +1,93 @@
+"""MinHash signatures and LSH band keys for near-duplicate postings.
+
+Scam postings get reposted with small edits, so /predict compares new text
+against reported postings by the Jaccard similarity of their word 3-gram
+shingles, estimated from MinHash signatures.
+
+Signatures use one-permutation hashing: each shingle is hashed once and
+lands in one of NUM_BINS bins, keeping the minimum per bin (empty bins
+borrow from the next filled one). That costs one hash per shingle instead of
+one per shingle per permutation, so it stays fast in pure Python.
+
+LSH splits the signature into BANDS bands of ROWS values; two postings are
+candidates when any band matches exactly. With 16 x 4 the candidate
+threshold sits near Jaccard 0.5. band_keys() turns each band into a signed
+64-bit integer so the buckets can live in an indexed SQLite table.
+"""
+import re
+import struct
+import zlib
+from array import array
+
+NUM_BINS = 64
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+SHINGLE_SIZE = 3
+
+_BIN_SHIFT = 64 - 6  # top 6 bits of the 64-bit hash pick one of 64 bins
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_EMPTY = _VALUE_MASK + 1
+TOKEN_RE = re.compile(r"\w+")
+
+
+def shingles(text):
+    words = TOKEN_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _hash64(shingle):
+    # crc32 is deterministic across processes (unlike hash()); the multiply
+    # spreads it over 64 bits
+    data = shingle.encode("utf-8")
+    h = zlib.crc32(data) | (zlib.crc32(data, 0x5BD1E995) << 32)
+    return (h * _MIX) & _MASK64
+
+
+def signature(text):
+    """Return the MinHash signature of text as a tuple, or None if it has no words."""
+    sh = shingles(text)
+    if not sh:
+        return None
+    bins = [_EMPTY] * NUM_BINS
+    for s in sh:
+        h = _hash64(s)
+        b = h >> _BIN_SHIFT
+        v = h & _VALUE_MASK
+        if v < bins[b]:
+            bins[b] = v
+    # densify: an empty bin takes the next filled bin's value (wrapping),
+    # offset by the distance so different gaps don't look identical
+    for b in range(NUM_BINS):
+        if bins[b] == _EMPTY:
+            for step in range(1, NUM_BINS):
+                v = bins[(b + step) % NUM_BINS]
+                if v != _EMPTY:
+                    bins[b] = (v + step * 0x9E3779B1) & _VALUE_MASK
+                    break
+    return tuple(bins)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / float(NUM_BINS)
+
+
+def band_keys(sig):
+    keys = []
+    for band in range(BANDS):
+        chunk = struct.pack("<B%dQ" % ROWS, band, *sig[band * ROWS:(band + 1) * ROWS])
+        h = zlib.crc32(chunk) | (zlib.crc32(chunk, 0x1B873593) << 32)
+        keys.append(h - (1 << 64) if h >= (1 << 63) else h)  # sqlite INTEGER is signed
+    return keys
+
+
+def pack(sig):
+    return array("Q", sig).tobytes()
+
+
+def unpack(blob):
+    return tuple(array("Q", blob))
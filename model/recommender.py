@@ -0,0 +1,190 @@
+"""Skill/keyword recommender over internship postings.
+
+An inverted TF-IDF index kept in memory: each term maps to two compact
+arrays (document slots and weights), so 100k postings fit in tens of MB
+instead of a dict per posting. Documents store log-scaled term frequencies
+normalised by their own length; IDF is applied at query time, which keeps
+the stored weights valid as the collection grows and lets new postings be
+appended without rebuilding anything. A replaced or removed posting's
+weights are zeroed in place, in the lists of its own terms only.
+
+recommend() scores only documents sharing a term with the query (sparse dot
+product) and picks the best few with a partial selection (numpy argpartition
+when numpy is installed, a heap otherwise) instead of sorting every score.
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+np = None  # numpy, imported by the first query (see _numpy); False if missing
+
+
+def _numpy():
+    # optional, and imported late so loading the app doesn't pay for it;
+    # without numpy queries use a pure-Python accumulator
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            np = False
+        else:
+            np = numpy
+    return np or None
+
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our the to
+we will with you your this that who are all can per work working looking
+intern interns internship internships opportunity months month weeks week
+""".split())
+SKILL_BOOST = 2  # skills_required terms count this many times over the description
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOP_WORDS and len(t) > 1]
+
+
+def posting_terms(description, skills_required):
+    tf = Counter(tokenize(description))
+    for s in re.split(r"[,\n;]+", skills_required or ""):
+        for t in tokenize(s):
+            tf[t] += SKILL_BOOST
+    return tf
+
+
+class RecommenderIndex:
+    def __init__(self):
+        self._postings = {}  # term -> (array of slots, array of weights)
+        self._df = Counter()
+        self._slot_ids = []  # slot -> posting id
+        self._slot_meta = []  # slot -> dict returned to callers
+        self._slot_terms = []  # slot -> its terms, so retiring it touches only those lists
+        self._slot_of = {}  # posting id -> live slot
+        self._dead = set()  # slots replaced by a newer version of the posting, or removed
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def add(self, posting_id, description, skills_required, meta=None):
+        """Index one posting; adding an id again replaces the old version."""
+        old = self._slot_of.get(posting_id)
+        if old is not None:
+            self._retire(old)
+        tf = posting_terms(description, skills_required)
+        slot = len(self._slot_ids)
+        self._slot_ids.append(posting_id)
+        self._slot_meta.append(meta or {"id": posting_id})
+        self._slot_terms.append(tuple(tf))
+        self._slot_of[posting_id] = slot
+        self.max_id = max(self.max_id, posting_id)
+        if not tf:
+            return
+        weights = {t: 1.0 + math.log(c) for t, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        for term, w in weights.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = (array("q"), array("f"))
+            entry[0].append(slot)
+            entry[1].append(w / norm)
+            self._df[term] += 1
+        self._maybe_compact()
+
+    def remove(self, posting_id):
+        """Drop a posting from the index; unknown ids are ignored."""
+        slot = self._slot_of.pop(posting_id, None)
+        if slot is not None:
+            self._retire(slot)
+            self._maybe_compact()
+
+    def _retire(self, slot):
+        # zero the old version's weights so it can never score; slots are
+        # appended in increasing order, so each postings list is sorted
+        self._dead.add(slot)
+        for term in self._slot_terms[slot]:
+            slots, weights = self._postings[term]
+            i = bisect_left(slots, slot)
+            if i < len(slots) and slots[i] == slot and weights[i]:
+                weights[i] = 0.0
+                self._df[term] -= 1
+        self._slot_terms[slot] = ()
+
+    def _maybe_compact(self):
+        if len(self._dead) > 1000 and len(self._dead) > len(self._slot_of):
+            self._compact()
+
+    def _compact(self):
+        live = sorted(self._slot_of.values())
+        remap = {old: new for new, old in enumerate(live)}
+        postings, self._postings = self._postings, {}
+        for term, (slots, weights) in postings.items():
+            keep = [(remap[s], w) for s, w in zip(slots, weights) if s in remap]
+            if keep:
+                self._postings[term] = (array("q", [s for s, _ in keep]), array("f", [w for _, w in keep]))
+        self._slot_ids = [self._slot_ids[s] for s in live]
+        self._slot_meta = [self._slot_meta[s] for s in live]
+        self._slot_terms = [self._slot_terms[s] for s in live]
+        self._slot_of = {pid: i for i, pid in enumerate(self._slot_ids)}
+        self._dead = set()
+
+    def recommend(self, text, topn=7):
+        """Return up to topn posting metas best matching text, best first."""
+        tf = Counter(tokenize(text))
+        n = len(self._slot_of)
+        if not tf or not n:
+            return []
+        terms = []
+        for term, count in tf.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            idf = math.log((1.0 + n) / (1.0 + self._df[term])) + 1.0
+            terms.append(((1.0 + math.log(count)) * idf * idf, entry))
+        if not terms:
+            return []
+        if _numpy() is not None:
+            best = self._top_numpy(terms, topn)
+        else:
+            scores = {}
+            get = scores.get
+            for qw, (slots, weights) in terms:
+                for slot, w in zip(slots, weights):
+                    scores[slot] = get(slot, 0.0) + qw * w
+            best = heapq.nlargest(topn, scores.items(), key=lambda kv: kv[1])
+        # replaced postings only ever score 0
+        return [dict(self._slot_meta[slot], score=round(float(score), 4)) for slot, score in best if score > 0]
+
+    def _top_numpy(self, terms, topn):
+        # the arrays expose their buffers, so numpy reads them without copying
+        scores = np.zeros(len(self._slot_ids), dtype=np.float32)
+        for qw, (slots, weights) in terms:
+            # a slot appears at most once per term, so plain fancy-index add is safe
+            scores[np.frombuffer(slots, dtype=np.int64)] += np.float32(qw) * np.frombuffer(weights, dtype=np.float32)
+        k = min(topn, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(slot), scores[slot]) for slot in top]
+
+
+_default_index = RecommenderIndex()
+
+
+def default_index():
+    return _default_index
+
+
+def set_default_index(index):
+    """Make index the default (e.g. a rebuilt one); returns it."""
+    global _default_index
+    _default_index = index
+    return index
+
+
+def recommend_for_text(text, topn=7):
+    return _default_index.recommend(text, topn)
@@ -0,0 +1,139 @@
+"""Single-pass red-flag matcher behind the heuristic scorer.
+
+Every rule is a list of terms (regex fragments matched as whole words against
+the lowercased text). All rules are compiled into one alternation with a named
+group per rule, so a description is scanned once however many rules exist.
+The alternation consumes what it matches, which would hide another rule's
+term starting inside that match ("unrealistic pay" hiding "pay"), so each
+match's span is rechecked against the other rules: every rule still matches
+independently, as if it had been searched on its own.
+
+Extra rules can be added without code changes by dropping a JSON file at
+data/red_flags.json (or the path in RED_FLAG_RULES_PATH):
+
+    [
+      {"name": "crypto", "terms": ["usdt", "crypto wallet"], "weight": 0.5,
+       "reason": "Asks for payment in crypto (red flag)."},
+      {"name": "fee", "terms": ["security deposit"]}
+    ]
+
+An entry whose name matches an existing rule adds its terms to that rule and
+overrides weight/reason when given; any other entry becomes a new rule.
+"""
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.environ.get("RED_FLAG_RULES_PATH", os.path.join(ROOT, "data", "red_flags.json"))
+
+DEFAULT_WEIGHT = 0.25
+NO_FLAGS_REASON = "No obvious red flags detected; use judgment."
+
+DEFAULT_RULES = [
+    {"name": "fee",
+     "terms": ["pay", "fee", "paid", "charge", "payment", "registration fee", "processing fee", "₹"],
+     "reason": "Mentions fees/payments (red flag)."},
+    {"name": "whatsapp",
+     "terms": ["whatsapp", "telegram", "snapchat"],
+     "reason": "Contact via messaging apps detected (WhatsApp/Telegram)."},
+    {"name": "personal_contact",
+     "terms": [r"gmail\.com", r"yahoo\.com", r"hotmail\.com", r"outlook\.com"],
+     "reason": "Personal email domains present instead of corporate."},
+    {"name": "vague",
+     "terms": ["urgent hiring", "no experience required", "any graduate", "no qualification", "max 2 days"],
+     "reason": "Role description is vague or unrealistic."},
+    {"name": "high_pay",
+     "terms": [r"\d{3,} per month", r"\d+k", r"\bunrealistic pay\b", r"\binternship stipend:?\b"],
+     "reason": "Promised high pay or vague stipend phrase."},
+]
+
+
+def merge_rules(base, extra):
+    """Return base with the entries of extra folded in (see module docstring)."""
+    rules = [dict(r, terms=list(r["terms"])) for r in base]
+    by_name = {r["name"]: r for r in rules}
+    for entry in extra:
+        name = entry["name"]
+        if name in by_name:
+            rule = by_name[name]
+            rule["terms"].extend(entry.get("terms", []))
+            for key in ("weight", "reason"):
+                if key in entry:
+                    rule[key] = entry[key]
+        else:
+            rule = dict(entry, terms=list(entry.get("terms", [])))
+            rules.append(rule)
+            by_name[name] = rule
+    return rules
+
+
+def load_rules(path=None):
+    """DEFAULT_RULES plus the rules file at path, if it exists."""
+    path = path or RULES_PATH
+    if not os.path.exists(path):
+        return merge_rules(DEFAULT_RULES, [])
+    with open(path, encoding="utf-8") as f:
+        return merge_rules(DEFAULT_RULES, json.load(f))
+
+
+class RedFlagEngine:
+    def __init__(self, rules):
+        self.rules = [r for r in rules if r["terms"]]
+        self.weights = {r["name"]: float(r.get("weight", DEFAULT_WEIGHT)) for r in self.rules}
+        self.reasons = {r["name"]: r.get("reason") or "Matched red flag rule '%s'." % r["name"] for r in self.rules}
+        self._group_rule = {}
+        parts = []
+        for i, rule in enumerate(self.rules):
+            group = "r%d" % i
+            self._group_rule[group] = rule["name"]
+            parts.append("(?P<%s>%s)" % (group, "|".join(rule["terms"])))
+        self._rule_regexes = [(r["name"], re.compile(r"\b(?:%s)\b" % "|".join(r["terms"]))) for r in self.rules]
+        # lowercasing up front and matching case-sensitively is much faster
+        # than re.IGNORECASE, and the leading \b lets the scan skip mid-word
+        # positions before trying any alternative
+        self._regex = re.compile(r"\b(?:%s)\b" % "|".join(parts)) if parts else None
+
+    def scan(self, text):
+        """Return [(rule name, start, end)] for every match, in text order.
+
+        Offsets index into text.lower(), which has the same length as text
+        for everything except a handful of special characters.
+        """
+        if self._regex is None or not text:
+            return []
+        lowered = text.lower()
+        matches = []
+        for m in self._regex.finditer(lowered):
+            name = self._group_rule[m.lastgroup]
+            matches.append((name, m.start(), m.end()))
+            # anything the scan skipped starts inside this span; matches
+            # starting after it are found by the scan itself
+            for other, regex in self._rule_regexes:
+                if other == name:
+                    continue
+                for pos in range(m.start(), m.end()):
+                    hit = regex.match(lowered, pos)
+                    if hit:
+                        matches.append((other, pos, hit.end()))
+                        break
+        if len(matches) > 1:
+            matches.sort(key=lambda m: (m[1], m[2]))
+        return matches
+
+    def evaluate(self, text):
+        """Return (score, reasons, matches) for text.
+
+        Each rule counts once; its weight is taken off a starting score of 1.
+        Reasons follow rule order.
+        """
+        matches = self.scan(text)
+        found = {name for name, _, _ in matches}
+        penalty = sum(self.weights[name] for name in found)
+        score = max(0.0, 1.0 - min(1.0, penalty))
+        reasons = [self.reasons[r["name"]] for r in self.rules if r["name"] in found]
+        return score, reasons or [NO_FLAGS_REASON], matches
+
+
+def build_engine(path=None):
+    return RedFlagEngine(load_rules(path))
@@ -0,0 +1,207 @@
+"""Score a large CSV or JSONL dump of postings offline.
+
+    python model/score_file.py INPUT OUTPUT [--workers N] [--chunk 1000] [--column description]
+
+INPUT is a CSV shaped like data/internships.csv or a JSONL file with one
+object per line ('-' reads CSV/JSONL from stdin, see --format). OUTPUT gets
+every input field plus flag, probability and reason, as CSV or JSONL by its
+extension ('-' writes to stdout).
+
+Rows are read in chunks and scored across a process pool. Each worker
+loads the current artifacts (model/inference.py) and the red-flag rules
+once, and scores a chunk with the app's scorer, inference.score_batch: one
+vectorized call for the chunk, the heuristics for texts the model can't
+score or when the model call fails. The app itself is never imported, so
+scoring a dump doesn't open or migrate its database or start its
+background threads. At most 2 x workers chunks are in flight, so
+memory stays bounded however large the input is, and results are written
+in input order as chunks finish.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model import inference, redflags  # noqa: E402
+
+MODEL_DIR = os.path.join(ROOT, "model")
+NUMPY_SCORER = os.environ.get("NUMPY_SCORER", "1") != "0"
+RESULT_FIELDS = ["flag", "probability", "reason"]
+
+# (model, vectorizer, red-flag engine), loaded once per process
+_loaded = None
+
+
+def _load():
+    global _loaded
+    if _loaded is None:
+        paths = inference.artifact_paths(MODEL_DIR, NUMPY_SCORER)
+        try:
+            model, vec = inference.load_artifacts(paths)
+        except Exception:
+            traceback.print_exc()
+            model = vec = None
+        if model is None:
+            print("no model could be loaded from %s; scoring with the red-flag rules only" % (paths,),
+                  file=sys.stderr)
+        _loaded = (model, vec, redflags.build_engine())
+    return _loaded
+
+
+def _init_worker():
+    _load()
+
+
+def _heuristic(engine):
+    def score(text):
+        score, reasons, _ = engine.evaluate(text)
+        return score, "; ".join(reasons)
+    return score
+
+
+def score_texts(texts):
+    """[(flag, prob, reason)] for texts, as the app's batched scorer gives them."""
+    model, vec, engine = _load()
+    return inference.score_batch([inference.normalize_text(t) for t in texts], model, vec, _heuristic(engine))
+
+
+def score_chunk(texts):
+    t0 = time.perf_counter()
+    results = score_texts(texts)
+    return results, time.perf_counter() - t0
+
+
+def file_format(path, given):
+    if given:
+        return given
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext == ".csv" or path == "-":
+        return "csv"
+    sys.exit("can't tell the format of %s; pass --format" % path)
+
+
+def read_rows(fh, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+    else:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def chunked(rows, size, timings):
+    chunk = []
+    t0 = time.perf_counter()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            timings["read"] += time.perf_counter() - t0
+            yield chunk
+            chunk = []
+            t0 = time.perf_counter()
+    timings["read"] += time.perf_counter() - t0
+    if chunk:
+        yield chunk
+
+
+class Writer:
+    def __init__(self, fh, fmt):
+        self.fh = fh
+        self.fmt = fmt
+        self.csv = None
+
+    def write(self, rows, results):
+        for row, (flag, prob, reason) in zip(rows, results):
+            row = dict(row, flag=flag, probability=round(float(prob), 4), reason=reason)
+            if self.fmt == "jsonl":
+                self.fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                continue
+            if self.csv is None:
+                fields = [k for k in row if k not in RESULT_FIELDS] + RESULT_FIELDS
+                self.csv = csv.DictWriter(self.fh, fieldnames=fields, extrasaction="ignore")
+                self.csv.writeheader()
+            self.csv.writerow(row)
+
+
+def open_arg(path, mode):
+    if path == "-":
+        # a context that leaves stdin/stdout open
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    return open(path, mode, newline="" if path.endswith(".csv") else None, encoding="utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 scores in this process")
+    ap.add_argument("--chunk", type=int, default=1000, help="rows per scoring batch")
+    ap.add_argument("--column", default="description", help="field holding the posting text")
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: by extension)")
+    ap.add_argument("--output-format", choices=["csv", "jsonl"], help="output format (default: by extension)")
+    args = ap.parse_args()
+
+    in_fmt = file_format(args.input, args.format)
+    out_fmt = file_format(args.output, args.output_format or (in_fmt if args.output == "-" else None))
+    timings = {"read": 0.0, "score": 0.0, "wait": 0.0, "write": 0.0}
+    rows_done = 0
+    start = time.perf_counter()
+
+    with open_arg(args.input, "r") as src, open_arg(args.output, "w") as dst:
+        writer = Writer(dst, out_fmt)
+        chunks = chunked(read_rows(src, in_fmt), args.chunk, timings)
+
+        def texts_of(chunk):
+            return [str(row.get(args.column) or "") for row in chunk]
+
+        def emit(chunk, results, score_s):
+            nonlocal rows_done
+            timings["score"] += score_s
+            t0 = time.perf_counter()
+            writer.write(chunk, results)
+            timings["write"] += time.perf_counter() - t0
+            rows_done += len(chunk)
+
+        if args.workers <= 0:
+            for chunk in chunks:
+                emit(chunk, *score_chunk(texts_of(chunk)))
+        else:
+            with ProcessPoolExecutor(args.workers, initializer=_init_worker) as pool:
+                window = deque()
+                for chunk in chunks:
+                    window.append((chunk, pool.submit(score_chunk, texts_of(chunk))))
+                    if len(window) >= 2 * args.workers:
+                        chunk, fut = window.popleft()
+                        t0 = time.perf_counter()
+                        result = fut.result()
+                        timings["wait"] += time.perf_counter() - t0
+                        emit(chunk, *result)
+                while window:
+                    chunk, fut = window.popleft()
+                    t0 = time.perf_counter()
+                    result = fut.result()
+                    timings["wait"] += time.perf_counter() - t0
+                    emit(chunk, *result)
+
+    total = time.perf_counter() - start
+    print("scored %d rows in %.2f s (%.0f rows/s, %d workers)"
+          % (rows_done, total, rows_done / total if total else 0.0, max(args.workers, 0)), file=sys.stderr)
+    # waiting includes worker start-up (loading the model)
+    print("  read %.2f s, score %.2f s (summed over workers), waiting on workers %.2f s, write %.2f s"
+          % (timings["read"], timings["score"], timings["wait"], timings["write"]), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,326 @@
+"""Train the scam classifier.
+
+    python model/train_model.py                      # full TF-IDF fit (default)
+    python model/train_model.py --mode stream        # out-of-core: hashing + partial_fit
+    python model/train_model.py --mode update        # fold new labelled reports into the current model
+    python model/train_model.py --mode export        # (re)write scorer/ for the current model
+
+Every run writes a new version directory under model/versions/ holding the
+model, the vectorizer, a scorer/ directory and metrics.json (rows,
+throughput, held-out accuracy), then points model/CURRENT at it with an
+atomic rename. The app reloads from CURRENT, so it never sees half a pair.
+
+scorer/ is the same model as numpy arrays (model/fastscore.py); the app
+serves from it without importing sklearn. Before it is kept, its
+probabilities are compared with sklearn's on the first rows of the CSV.
+export writes it for the current version (or the unversioned pickles in
+model/) without training.
+
+stream reads the CSV in chunks, so memory does not grow with the data.
+Every HOLDOUT_EVERY-th row is held out and scored in a second pass; the
+split is positional, so versions are compared on the same rows. update
+starts from the current stream/update version and trains only on reports
+marked fake or genuine since that version; the CSV is read again only to
+score the held-out rows.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
 from pathlib import Path
+
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 
 # Resolve paths so it works no matter where you run it from
 ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from model import fastscore  # noqa: E402
+
 DATA_PATH = ROOT / "data" / "internships.csv"
 MODEL_DIR = ROOT / "model"
+VERSIONS_DIR = MODEL_DIR / "versions"
+CURRENT_PATH = MODEL_DIR / "CURRENT"
+DB_PATH = Path(os.environ.get("INTERNCHECK_DB", ROOT / "db" / "companies.db"))
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
-# 1) Load dataset
-df = pd.read_csv(DATA_PATH)
+CLASSES = ["fake", "genuine"]
+HOLDOUT_EVERY = 5
+SCORER_CHECK_ROWS = 1000
+SCORER_TOLERANCE = 1e-9
+
+
+def make_hashing_vectorizer(n_features):
+    # stateless, so chunks can be transformed without a vocabulary pass;
+    # MultinomialNB needs non-negative features, hence alternate_sign=False
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2",
+                             stop_words="english", ngram_range=(1, 2))
+
+
+# --- versions ---
+
+def current_version():
+    try:
+        name = CURRENT_PATH.read_text().strip()
+    except OSError:
+        return None
+    return name or None
+
+
+def read_metrics(version):
+    return json.loads((VERSIONS_DIR / version / "metrics.json").read_text())
+
+
+def next_version_name():
+    taken = [int(p.name[1:]) for p in VERSIONS_DIR.glob("v[0-9]*") if p.name[1:].isdigit()]
+    return "v%04d" % (max(taken, default=0) + 1)
+
+
+def export_scorer(model, vectorizer, directory, texts):
+    """Write the numpy scorer to directory and check it against sklearn on
+    texts; returns the largest probability difference, or None (and no
+    directory) if the model can't be exported or doesn't match."""
+    try:
+        fastscore.export(model, vectorizer, str(directory))
+    except ValueError as e:
+        print("  no numpy scorer: %s" % e)
+        shutil.rmtree(directory, ignore_errors=True)
+        return None
+    diff = 0.0
+    if texts:
+        scorer = fastscore.load(str(directory))
+        expected = model.predict_proba(vectorizer.transform(texts))
+        diff = float(abs(expected - scorer.predict_proba(scorer.transform(texts))).max())
+    if diff > SCORER_TOLERANCE:
+        print("  no numpy scorer: probabilities differ from sklearn by %g" % diff)
+        shutil.rmtree(directory, ignore_errors=True)
+        return None
+    return diff
+
+
+def save_version(model, vectorizer, metrics, check_texts=()):
+    """Write a new version directory and make it current; returns its name."""
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=VERSIONS_DIR))
+    try:
+        joblib.dump(model, tmp / "internship_model.pkl")
+        joblib.dump(vectorizer, tmp / "vectorizer.pkl")
+        diff = export_scorer(model, vectorizer, tmp / "scorer", check_texts)
+        metrics = dict(metrics, scorer=diff is not None, scorer_max_abs_diff=diff)
+        version = next_version_name()
+        metrics = dict(metrics, version=version, parent=current_version(),
+                       trained_at=datetime.utcnow().isoformat())
+        (tmp / "metrics.json").write_text(json.dumps(metrics, indent=2))
+        tmp.chmod(0o755)  # mkdtemp makes it private to this user
+        tmp.rename(VERSIONS_DIR / version)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    # the pointer flips in one rename, after the directory is complete
+    pointer = CURRENT_PATH.with_name(".CURRENT.tmp")
+    pointer.write_text(version + "\n")
+    os.replace(pointer, CURRENT_PATH)
+    return version
+
+
+# --- data ---
+
+def stream_chunks(path, chunk_rows):
+    """Yield (train_texts, train_labels, holdout_texts, holdout_labels) per chunk."""
+    offset = 0
+    for df in pd.read_csv(path, usecols=["description", "label"], chunksize=chunk_rows):
+        df = df.dropna()
+        holdout = (pd.RangeIndex(offset, offset + len(df)) % HOLDOUT_EVERY) == 0
+        offset += len(df)
+        texts = df["description"].astype(str).to_numpy()
+        labels = df["label"].astype(str).str.strip().str.lower().to_numpy()
+        yield texts[~holdout], labels[~holdout], texts[holdout], labels[holdout]
+
+
+def sample_texts(path, rows=SCORER_CHECK_ROWS):
+    if not os.path.exists(path):
+        return []
+    df = pd.read_csv(path, usecols=["description"], nrows=rows).dropna()
+    return df["description"].astype(str).tolist()
+
+
+def labelled_reports(after_id):
+    """Reports marked fake/genuine with id > after_id: [(id, text, label)]."""
+    if not DB_PATH.exists():
+        return []
+    conn = sqlite3.connect(str(DB_PATH))
+    try:
+        # a database the app hasn't migrated yet lacks posting_text and
+        # posting_ref; its free-text posting_id is then the only link
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(reports)")}
+        text = "coalesce(r.posting_text, i.description)" if "posting_text" in cols else "i.description"
+        if "posting_ref" in cols:
+            ref = "r.posting_ref"
+        else:
+            ref = ("CASE WHEN trim(r.posting_id) GLOB '[0-9]*' AND trim(r.posting_id) NOT GLOB '*[^0-9]*' "
+                   "THEN CAST(trim(r.posting_id) AS INTEGER) END")
+        rows = conn.execute(
+            "SELECT r.id, %s, lower(trim(r.user_feedback)) FROM reports r "
+            "LEFT JOIN internships i ON i.id = %s "
+            "WHERE r.id > ? AND lower(trim(r.user_feedback)) IN ('fake', 'genuine') ORDER BY r.id" % (text, ref),
+            (after_id,)).fetchall()
+    finally:
+        conn.close()
+    return [(rid, t, label) for rid, t, label in rows if t and t.strip()]
+
+
+def holdout_accuracy(model, vectorizer, path, chunk_rows):
+    correct = total = 0
+    for _, _, texts, labels in stream_chunks(path, chunk_rows):
+        if len(texts):
+            correct += int((model.predict(vectorizer.transform(texts)) == labels).sum())
+            total += len(texts)
+    return (correct / total if total else None), total
+
+
+# --- modes ---
+
+def train_full(args):
+    # 1) Load dataset
+    df = pd.read_csv(args.data)
+
+    # 2) Features/labels
+    X = df["description"].astype(str)
+    y = df["label"].astype(str)
+
+    # 3) Vectorize
+    t0 = time.perf_counter()
+    vectorizer = TfidfVectorizer(stop_words="english")
+    X_vec = vectorizer.fit_transform(X)
+
+    # 4) Split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_vec, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    # 5) Train model
+    model = MultinomialNB()
+    model.fit(X_train, y_train)
+    seconds = time.perf_counter() - t0
+
+    # 6) Evaluate
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print("Accuracy:", round(accuracy, 4))
+    print(classification_report(y_test, y_pred))
+    return model, vectorizer, {
+        "mode": "full", "vectorizer": "tfidf", "rows": X_train.shape[0], "report_rows": 0,
+        "seconds": round(seconds, 3), "rows_per_sec": round(X_train.shape[0] / seconds, 1),
+        "holdout_rows": X_test.shape[0], "holdout_accuracy": round(accuracy, 4),
+        "reports_through": 0,
+    }
+
+
+def train_stream(args):
+    vectorizer = make_hashing_vectorizer(args.n_features)
+    model = MultinomialNB(alpha=args.alpha)
+    rows = 0
+    t0 = time.perf_counter()
+    for texts, labels, _, _ in stream_chunks(args.data, args.chunk_rows):
+        if len(texts):
+            model.partial_fit(vectorizer.transform(texts), labels, classes=CLASSES)
+            rows += len(texts)
+            print("  trained on %d rows" % rows, end="\r", flush=True)
+    print()
+    report_rows, through = 0, 0
+    if args.with_reports:
+        report_rows, through = fold_reports(model, vectorizer, 0, args.report_weight)
+    seconds = time.perf_counter() - t0
+    return model, vectorizer, {
+        "mode": "stream", "vectorizer": "hashing", "n_features": args.n_features,
+        "rows": rows, "report_rows": report_rows, "seconds": round(seconds, 3),
+        "rows_per_sec": round((rows + report_rows) / seconds, 1) if seconds else None,
+        "reports_through": through,
+    }
+
+
+def train_update(args):
+    base = current_version()
+    if base is None or read_metrics(base).get("vectorizer") != "hashing":
+        raise SystemExit("update needs a current stream/update version; run --mode stream first")
+    base_dir = VERSIONS_DIR / base
+    model = joblib.load(base_dir / "internship_model.pkl")
+    vectorizer = joblib.load(base_dir / "vectorizer.pkl")
+    base_metrics = read_metrics(base)
+    t0 = time.perf_counter()
+    report_rows, through = fold_reports(model, vectorizer, base_metrics.get("reports_through", 0),
+                                        args.report_weight)
+    seconds = time.perf_counter() - t0
+    if not report_rows:
+        raise SystemExit("no new labelled reports since %s" % base)
+    return model, vectorizer, {
+        "mode": "update", "vectorizer": "hashing", "n_features": base_metrics.get("n_features"),
+        "rows": base_metrics.get("rows", 0), "report_rows": base_metrics.get("report_rows", 0) + report_rows,
+        "seconds": round(seconds, 3), "rows_per_sec": round(report_rows / seconds, 1) if seconds else None,
+        "reports_through": through,
+    }
+
+
+def fold_reports(model, vectorizer, after_id, weight):
+    """partial_fit on new labelled reports; returns (rows used, last report id)."""
+    reports = labelled_reports(after_id)
+    if not reports:
+        return 0, after_id
+    X = vectorizer.transform([t for _, t, _ in reports])
+    model.partial_fit(X, [label for _, _, label in reports], classes=CLASSES,
+                      sample_weight=[weight] * len(reports))
+    return len(reports), reports[-1][0]
+
+
+def export_current(args):
+    version = current_version()
+    directory = VERSIONS_DIR / version if version else MODEL_DIR
+    model = joblib.load(directory / "internship_model.pkl")
+    vectorizer = joblib.load(directory / "vectorizer.pkl")
+    tmp = Path(tempfile.mkdtemp(prefix=".scorer-", dir=directory))
+    diff = export_scorer(model, vectorizer, tmp, sample_texts(args.data))
+    if diff is None:
+        raise SystemExit("export failed; the app keeps serving the pickles")
+    tmp.chmod(0o755)  # mkdtemp makes it private to this user
+    shutil.rmtree(directory / "scorer", ignore_errors=True)
+    tmp.rename(directory / "scorer")
+    print("✅ Saved: %s (max difference from sklearn %g)" % ((directory / "scorer").relative_to(ROOT), diff))
 
-# 2) Features/labels
-X = df["description"].astype(str)
-y = df["label"].astype(str)
 
-# 3) Vectorize
-vectorizer = TfidfVectorizer(stop_words="english")
-X_vec = vectorizer.fit_transform(X)
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mode", choices=["full", "stream", "update", "export"], default="full")
+    ap.add_argument("--data", default=str(DATA_PATH), help="CSV with description,label columns")
+    ap.add_argument("--chunk-rows", type=int, default=50000)
+    ap.add_argument("--n-features", type=int, default=2 ** 18, help="hashing vectorizer width")
+    ap.add_argument("--alpha", type=float, default=0.1, help="MultinomialNB smoothing for stream mode")
+    ap.add_argument("--with-reports", action="store_true", help="stream: also train on labelled reports")
+    ap.add_argument("--report-weight", type=float, default=1.0, help="sample weight of a user report")
+    args = ap.parse_args()
 
-# 4) Split
-X_train, X_test, y_train, y_test = train_test_split(
-    X_vec, y, test_size=0.2, random_state=42, stratify=y
-)
+    if args.mode == "export":
+        export_current(args)
+        return
+    trainer = {"full": train_full, "stream": train_stream, "update": train_update}[args.mode]
+    model, vectorizer, metrics = trainer(args)
+    if "holdout_accuracy" not in metrics and os.path.exists(args.data):
+        accuracy, n = holdout_accuracy(model, vectorizer, args.data, args.chunk_rows)
+        metrics.update(holdout_rows=n, holdout_accuracy=round(accuracy, 4) if accuracy is not None else None)
 
-# 5) Train model
-model = MultinomialNB()
-model.fit(X_train, y_train)
+    # 7) Save artifacts
+    version = save_version(model, vectorizer, metrics, sample_texts(args.data))
+    print("✅ Saved: model/versions/%s (now current)" % version)
+    print(json.dumps(read_metrics(version), indent=2))
 
-# 6) Evaluate
-y_pred = model.predict(X_test)
-print("Accuracy:", round(accuracy_score(y_test, y_pred), 4))
-print(classification_report(y_test, y_pred))
 
-# 7) Save artifacts
-joblib.dump(model, MODEL_DIR / "internship_model.pkl")
-joblib.dump(vectorizer, MODEL_DIR / "vectorizer.pkl")
-print("✅ Saved: model/internship_model.pkl and model/vectorizer.pkl")
+if __name__ == "__main__":
+    main()
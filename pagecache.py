@@ -0,0 +1,112 @@
+"""Backends for the rendered page and fragment cache.
+
+    open_cache("memory")                 # per process LRU (default)
+    open_cache("sqlite", path=...)       # one file shared by every worker
+    open_cache("off")
+
+The app builds keys that include the data generation, so entries are never
+updated in place: a write bumps the generation and old keys simply stop being
+asked for. Backends only have to get, set and forget the oldest entries.
+Values are JSON-serializable (str or dict). A backend that fails answers as
+a miss; a broken cache must not break the page.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+
+class NullCache:
+    enabled = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+class MemoryCache:
+    enabled = True
+
+    def __init__(self, size=512):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """A table in its own SQLite file, so cache writes never wait on the
+    application database. INSERT OR REPLACE gives every write a new rowid,
+    which makes "keep the newest max_rows" a single range delete."""
+
+    enabled = True
+    PRUNE_EVERY = 200
+
+    def __init__(self, path, max_rows=5000, timeout=0.5):
+        self.path = path
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS page_cache "
+                         "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    def _conn(self):
+        # one connection per thread and process; never reuse one across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # losing the cache on a crash is fine
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._conn().execute("SELECT value FROM page_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            traceback.print_exc()
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO page_cache (key, value, created_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), time.time()))
+            self._writes += 1
+            if self._writes >= self.PRUNE_EVERY:
+                self._writes = 0
+                conn.execute("DELETE FROM page_cache WHERE rowid <= (SELECT max(rowid) FROM page_cache) - ?",
+                             (self.max_rows,))
+        except sqlite3.Error:
+            traceback.print_exc()
+
+
+def open_cache(kind, path=None, size=512):
+    if kind == "memory":
+        return MemoryCache(size)
+    if kind == "sqlite":
+        return SQLiteCache(path, max_rows=size)
+    if kind in ("off", "none", ""):
+        return NullCache()
+    raise ValueError("unknown page cache backend %r (memory, sqlite or off)" % kind)
@@ -0,0 +1,124 @@
+"""Token buckets and a concurrency cap for admission control.
+
+    buckets = TokenBuckets(capacity=30, per_seconds=60)
+    wait = buckets.take("ip:10.0.0.1")       # 0.0 if admitted, else seconds to wait
+
+    cap = ConcurrencyCap(limit=8, slots_dir="/tmp/slots")
+    if cap.acquire(reserve=2):               # False when full; never queues
+        try: ...
+        finally: cap.release()
+
+Buckets keep their state in the calling process only, so with several
+gunicorn workers each one enforces its own budget; a client that lands on
+every worker gets up to workers x capacity. They are an LRU of at most
+max_keys entries: a key evicted while idle simply starts again full, which
+is what an idle bucket would have refilled to anyway.
+
+A cap given a slots_dir is shared by every process using that directory:
+slot N is an exclusive flock on slots_dir/slot-N, so a sync worker serving
+one request at a time still counts against the others, and the kernel
+frees a dead worker's slots with its files. Without one (or without
+fcntl) the cap counts in-process threads only.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+
+def parse_rate(text):
+    """"30/60" -> (30.0, 60.0): 30 requests per 60 seconds."""
+    count, _, seconds = str(text).partition("/")
+    count, seconds = float(count), float(seconds or 1)
+    if count <= 0 or seconds <= 0:
+        raise ValueError("rate must be N/SECONDS with both positive, not %r" % text)
+    return count, seconds
+
+
+class TokenBuckets:
+    def __init__(self, capacity, per_seconds, max_keys=10000):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / float(per_seconds)  # tokens per second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, monotonic time of last update]
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1.0, scale=1.0):
+        """Take cost tokens from key's bucket; 0.0 if they were there, else
+        the seconds until they will be. scale multiplies capacity and rate."""
+        capacity, rate = self.capacity * scale, self.rate * scale
+        cost = min(float(cost), capacity)  # an oversized request waits for a full bucket, not forever
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+
+class ConcurrencyCap:
+    def __init__(self, limit, slots_dir=None):
+        self.limit = limit
+        self.slots_dir = slots_dir if fcntl is not None else None
+        self.in_flight = 0  # in this process
+        self._lock = threading.Lock()
+        self._local = threading.local()  # .slot: the one this thread holds
+        self._files = {}  # slot -> file opened by this process
+        self._held = set()  # slots held by this process's threads
+        self._pid = None
+        if self.slots_dir:
+            os.makedirs(self.slots_dir, exist_ok=True)
+
+    def acquire(self, reserve=0):
+        """Take a slot unless fewer than reserve + 1 are free; never blocks.
+
+        With a slots_dir, callers passing reserve only try the first
+        limit - reserve slots, and everyone tries from the top down, so
+        reserve slots stay free for callers passing 0.
+        """
+        with self._lock:
+            if not self.slots_dir:
+                if self.in_flight + reserve >= self.limit:
+                    return False
+                self.in_flight += 1
+                return True
+            if self._pid != os.getpid():
+                # a flock is shared with every fork of the file that holds it:
+                # each process opens its own
+                self._files, self._held, self._pid = {}, set(), os.getpid()
+            for slot in reversed(range(self.limit - reserve)):
+                if slot in self._held:  # our own flock wouldn't stop us
+                    continue
+                f = self._files.get(slot)
+                if f is None:
+                    f = self._files[slot] = open(os.path.join(self.slots_dir, "slot-%d" % slot), "a+b")
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                self._held.add(slot)
+                self._local.slot = slot
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            if self.slots_dir:
+                fcntl.flock(self._files[self._local.slot], fcntl.LOCK_UN)
+                self._held.discard(self._local.slot)
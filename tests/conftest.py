@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# the app reads its settings at import: point it at a scratch database and
+# keep background threads, caches and preloading out of the way
+_tmp = tempfile.mkdtemp(prefix="interncheck-tests-")
+os.environ.update(
+    INTERNCHECK_DB=os.path.join(_tmp, "test.db"),
+    SCORING_WORKER="0",
+    REPORT_QUEUE="0",
+    PRELOAD_MODEL="0",
+    PRELOAD_TEMPLATES="0",
+    TEMPLATE_CACHE_DIR="",
+    PAGE_CACHE_BACKEND="off",
+)
+os.environ.pop("METRICS_DIR", None)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    app.app.config["TESTING"] = True
+    return app
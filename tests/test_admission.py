@@ -0,0 +1,70 @@
+import multiprocessing
+
+import pytest
+
+import ratelimit
+
+
+def _hold_slots(slots_dir, limit, ready, done):
+    cap = ratelimit.ConcurrencyCap(limit, slots_dir)
+    for _ in range(limit):
+        assert cap.acquire()
+    ready.set()
+    done.wait(10)
+
+
+@pytest.mark.skipif(ratelimit.fcntl is None, reason="needs fcntl")
+def test_cap_is_shared_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Event(), ctx.Event()
+    other = ctx.Process(target=_hold_slots, args=(str(tmp_path), 3, ready, done))
+    other.start()
+    try:
+        assert ready.wait(10)
+        cap = ratelimit.ConcurrencyCap(3, str(tmp_path))
+        assert not cap.acquire()
+    finally:
+        done.set()
+        other.join(10)
+    # the other process's slots went with it
+    assert cap.acquire()
+
+
+@pytest.mark.skipif(ratelimit.fcntl is None, reason="needs fcntl")
+def test_reserved_slots_stay_free_for_callers_without_a_reserve(tmp_path):
+    cap = ratelimit.ConcurrencyCap(4, str(tmp_path))
+    assert cap.acquire(reserve=2)
+    assert cap.acquire(reserve=2)
+    assert not cap.acquire(reserve=2)
+    assert cap.acquire()
+    assert cap.acquire()
+    assert not cap.acquire()
+    assert cap.in_flight == 4
+
+
+@pytest.mark.skipif(ratelimit.fcntl is None, reason="needs fcntl")
+def test_predict_answers_429_when_every_worker_slot_is_taken(app_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(app_module, "SCORING_RESERVED_FOR_USERS", 0)
+    monkeypatch.setattr(app_module, "scoring_cap", ratelimit.ConcurrencyCap(2, str(tmp_path)))
+    other_worker = ratelimit.ConcurrencyCap(2, str(tmp_path))
+    assert other_worker.acquire() and other_worker.acquire()
+
+    client = app_module.app.test_client()
+    response = client.post("/predict", data={"description": "Data entry internship, stipend 5000."})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    other_worker.release()
+    response = client.post("/predict", data={"description": "Data entry internship, stipend 5000."})
+    assert response.status_code == 200
+
+
+def test_api_answers_429_over_the_rate_limit(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMISSION_ENABLED", True)
+    monkeypatch.setitem(app_module.rate_limiters, "api_predict_batch", ratelimit.TokenBuckets(3, 60))
+    client = app_module.app.test_client()
+    assert client.post("/api/predict/batch", json=["one", "two"]).status_code == 200
+    response = client.post("/api/predict/batch", json=["three", "four"])
+    assert response.status_code == 429
+    assert response.get_json()["retry_after"] == int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,43 @@
+def test_updating_an_application_returns_to_the_same_manage_page(app_module):
+    with app_module.transaction() as conn:
+        admin = conn.execute("INSERT INTO users (username, password, role, full_name) VALUES (?, ?, ?, ?)",
+                             ("manage-admin", "x", "admin", "Admin")).lastrowid
+        application = conn.execute("INSERT INTO applications (internship_id, student_id, status, applied_at) "
+                                   "VALUES (?, ?, ?, ?)", (None, None, "applied", "2026-01-01T00:00:00")).lastrowid
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin
+
+    page = client.get("/manage?apps_after=abc&category=Finance&sort=x").get_data(as_text=True)
+    action = "/update_application/%d?apps_after=abc&amp;category=Finance" % application
+    assert action in page
+
+    response = client.post(action.replace("&amp;", "&"), data={"status": "shortlisted"},
+                           headers={"Referer": "https://example.com/"})
+    assert response.status_code == 302
+    assert response.headers["Location"] == "/manage?apps_after=abc&category=Finance"
+    row = app_module.query_one("SELECT status FROM applications WHERE id = ?", (application,))
+    assert row["status"] == "shortlisted"
+
+
+def test_a_demoted_user_loses_access_on_the_next_request(app_module):
+    with app_module.transaction() as conn:
+        admin = conn.execute("INSERT INTO users (username, password, role, full_name) VALUES (?, ?, ?, ?)",
+                             ("demoted-admin", "x", "admin", "Admin")).lastrowid
+        application = conn.execute("INSERT INTO applications (internship_id, student_id, status, applied_at) "
+                                   "VALUES (?, ?, ?, ?)", (None, None, "applied", "2026-01-02T00:00:00")).lastrowid
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin
+
+    client.post("/update_application/%d" % application, data={"status": "shortlisted"})
+    with client.session_transaction() as sess:
+        assert sess["user_snapshot"]["role"] == "admin"
+
+    with app_module.transaction() as conn:
+        conn.execute("UPDATE users SET role = 'student' WHERE id = ?", (admin,))
+    client.post("/update_application/%d" % application, data={"status": "rejected"})
+    row = app_module.query_one("SELECT status FROM applications WHERE id = ?", (application,))
+    assert row["status"] == "shortlisted"
+    with client.session_transaction() as sess:
+        assert sess["user_snapshot"]["role"] == "student"
@@ -0,0 +1,46 @@
+from concurrent.futures import TimeoutError
+
+import pytest
+
+
+class FailingPool:
+    def genuine_probs(self, paths, checksum, texts):
+        raise TimeoutError()
+
+
+def test_fallback_after_a_model_failure_is_not_cached(app_module, monkeypatch):
+    app_module.refresh_artifacts(force=True)
+    model, vec, _, _ = app_module.refresh_artifacts()
+    if model is None:
+        pytest.skip("no model artifacts to fail")
+    text = "Remote marketing internship, pay the registration fee on whatsapp before joining."
+    key = app_module._cache_key(app_module.current_model_version(), app_module.normalize_posting_text(text))
+
+    monkeypatch.setattr(app_module, "inference_pool", lambda: FailingPool())
+    flag, prob, reason = app_module.predict_flag_and_prob(text)
+    assert reason != "Model-based prediction"
+    assert app_module._l1_get(key) is None
+    assert app_module._l2_get_many([key]) == {}
+
+    monkeypatch.undo()
+    assert app_module.predict_flag_and_prob(text)[2] == "Model-based prediction"
+    assert app_module._l1_get(key) is not None
+
+
+def test_scoring_worker_leaves_rows_for_the_next_pass_when_the_model_fails(app_module, monkeypatch):
+    if app_module.refresh_artifacts()[0] is None:
+        pytest.skip("no model artifacts to fail")
+    with app_module.transaction() as conn:
+        posting = conn.execute("INSERT INTO internships (title, description, created_at) VALUES (?, ?, ?)",
+                               ("Sales intern", "Door to door sales, pay a joining fee.",
+                                "2026-02-01T00:00:00")).lastrowid
+    monkeypatch.setattr(app_module, "inference_pool", lambda: FailingPool())
+    app_module.score_stale_internships()
+    row = app_module.query_one("SELECT trust_model_version FROM internships WHERE id = ?", (posting,))
+    assert row["trust_model_version"] is None
+
+    monkeypatch.undo()
+    app_module.score_stale_internships()
+    row = app_module.query_one("SELECT trust_reason, trust_model_version FROM internships WHERE id = ?", (posting,))
+    assert row["trust_model_version"] == app_module.current_model_version()
+    assert row["trust_reason"] == "Model-based prediction"
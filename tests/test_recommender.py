@@ -0,0 +1,58 @@
+from model import recommender
+
+
+def test_replacing_and_removing_postings_retires_their_terms():
+    index = recommender.RecommenderIndex()
+    index.add(1, "python django backend", "python")
+    index.add(2, "python data analysis", "pandas")
+    index.add(1, "rust embedded firmware", "rust")
+    assert [r["id"] for r in index.recommend("django")] == []
+    assert [r["id"] for r in index.recommend("python")] == [2]
+    assert [r["id"] for r in index.recommend("firmware")] == [1]
+    assert index._df["python"] == 1 and index._df["django"] == 0
+
+    index.remove(2)
+    index.remove(99)
+    assert index.recommend("python") == []
+    assert len(index) == 1
+
+
+def _recommended(app_module, text):
+    return [r["id"] for r in app_module.recommend_for_text(text)]
+
+
+def test_edits_and_deletes_reach_the_recommender(app_module):
+    with app_module.transaction() as conn:
+        posting = conn.execute("INSERT INTO internships (title, description, skills_required, created_at) "
+                               "VALUES (?, ?, ?, ?)", ("Quokkalang intern", "Write quokkalang services.",
+                                                       "quokkalang", "2026-03-01T00:00:00")).lastrowid
+    assert _recommended(app_module, "quokkalang") == [posting]
+
+    with app_module.transaction() as conn:
+        conn.execute("UPDATE internships SET title = ?, description = ?, skills_required = ? WHERE id = ?",
+                     ("Wombatscript intern", "Write wombatscript tools.", "wombatscript", posting))
+    assert _recommended(app_module, "quokkalang") == []
+    assert _recommended(app_module, "wombatscript") == [posting]
+
+    with app_module.transaction() as conn:
+        conn.execute("DELETE FROM internships WHERE id = ?", (posting,))
+    assert _recommended(app_module, "wombatscript") == []
+
+
+def test_a_rebuild_after_pruned_changes_replaces_the_default_index(app_module):
+    with app_module.transaction() as conn:
+        posting = conn.execute("INSERT INTO internships (title, description, created_at) VALUES (?, ?, ?)",
+                               ("Numbatdb intern", "Tune numbatdb.", "2026-03-02T00:00:00")).lastrowid
+    assert _recommended(app_module, "numbatdb") == [posting]
+    before = app_module.recommender_index
+
+    with app_module.transaction() as conn:
+        conn.execute("UPDATE internships SET description = 'Tune bilbydb.' WHERE id = ?", (posting,))
+        conn.execute("UPDATE internships SET title = 'Bilbydb intern' WHERE id = ?", (posting,))
+        # as if the log had been pruned up to the first of the two
+        conn.execute("DELETE FROM internship_changes WHERE seq <= (SELECT MIN(seq) FROM internship_changes "
+                     "WHERE internship_id = ?)", (posting,))
+    assert _recommended(app_module, "bilbydb") == [posting]
+    assert app_module.recommender_index is not before
+    assert recommender.default_index() is app_module.recommender_index
+    assert [r["id"] for r in recommender.recommend_for_text("bilbydb")] == [posting]
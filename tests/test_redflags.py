@@ -0,0 +1,68 @@
+import itertools
+import random
+import re
+
+import pytest
+
+from model import redflags
+
+# the scorer as it was before the compiled engine, kept as the reference
+LEGACY_PATTERNS = {
+    "fee": [r"\b(pay|fee|paid|charge|payment|registration fee|processing fee|₹)\b"],
+    "whatsapp": [r"\b(whatsapp|telegram|snapchat)\b"],
+    "personal_contact": [r"\b(gmail\.com|yahoo\.com|hotmail\.com|outlook\.com)\b"],
+    "vague": [r"\b(urgent hiring|no experience required|any graduate|no qualification|max 2 days)\b"],
+    "high_pay": [r"\b(\d{3,} per month|\d+k|\bunrealistic pay\b|\binternship stipend:?\b)\b"],
+}
+LEGACY_REASONS = [r["reason"] for r in redflags.DEFAULT_RULES]
+
+
+def legacy_score_and_reasons(text):
+    txt = (text or "").lower()
+    found = [key for key, pats in LEGACY_PATTERNS.items() if any(re.search(p, txt) for p in pats)]
+    score = max(0.0, 1.0 - min(1.0, len(found) * 0.25))
+    reasons = [reason for key, reason in zip(LEGACY_PATTERNS, LEGACY_REASONS) if key in found]
+    return score, reasons or [redflags.NO_FLAGS_REASON]
+
+
+OVERLAPPING = [
+    "unrealistic pay offered",
+    "Internship stipend: 5000 per month, pay on joining",
+    "registration fee paid via whatsapp",
+    "we offer 15000 per month and 20k bonus, pay 500 fee",
+    "urgent hiring any graduate no experience required max 2 days",
+    "mail hr@gmail.com or telegram, processing fee ₹ 999",
+    "Unrealistic Pay! 12000 per month. Internship stipend",
+]
+
+FRAGMENTS = ["unrealistic pay", "pay", "fee", "registration fee", "internship stipend:", "5000 per month",
+             "20k", "whatsapp", "gmail.com", "urgent hiring", "any graduate", "a python role", "in pune"]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return redflags.RedFlagEngine(redflags.DEFAULT_RULES)
+
+
+@pytest.mark.parametrize("text", OVERLAPPING)
+def test_matches_legacy_on_overlapping_terms(engine, text):
+    score, reasons, _ = engine.evaluate(text)
+    assert (score, reasons) == legacy_score_and_reasons(text)
+
+
+def test_matches_legacy_on_random_combinations(engine):
+    rng = random.Random(7)
+    for n in range(1, 5):
+        for combo in itertools.islice(itertools.permutations(FRAGMENTS, n), 400):
+            text = " ".join(combo) if rng.random() < 0.5 else "".join(f + " " for f in combo)
+            score, reasons, _ = engine.evaluate(text)
+            assert (score, reasons) == legacy_score_and_reasons(text), text
+
+
+def test_added_rule_fires_when_an_existing_term_starts_inside_it():
+    rules = redflags.merge_rules(redflags.DEFAULT_RULES, [
+        {"name": "crypto", "terms": ["pay in usdt", "crypto wallet"], "weight": 0.5,
+         "reason": "Asks for payment in crypto (red flag)."}])
+    engine = redflags.RedFlagEngine(rules)
+    found = {name for name, _, _ in engine.scan("Selected interns pay in USDT to confirm")}
+    assert found == {"fee", "crypto"}
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from model import neardup
+
+BASE = ("Work from home data entry job for students. Pay a registration fee of Rs 500 on whatsapp "
+        "to start and earn 30000 weekly, guaranteed. No interview, joining kit sent after payment, "
+        "limited seats so reply today with your aadhaar and bank details.")
+
+
+def _report(text):
+    return ("", None, text, "fake", "fees", None, datetime.utcnow().isoformat())
+
+
+def test_near_duplicates_in_one_batch_share_a_cluster(app_module):
+    variant = BASE.replace("limited seats", "only few seats")
+    score = neardup.similarity(neardup.signature(BASE), neardup.signature(variant))
+    assert app_module.NEARDUP_THRESHOLD <= score < 1.0
+
+    app_module.write_reports([_report(BASE), _report(variant)])
+
+    keys = [r["cluster_key"] for r in
+            app_module.query_all("SELECT cluster_key FROM reports ORDER BY id DESC LIMIT 2")]
+    assert keys[0] == keys[1]
+    assert keys[0].startswith("text:")
+
+
+def test_a_batch_that_keeps_failing_is_written_row_by_row(app_module, monkeypatch, tmp_path):
+    dead_letters = tmp_path / "dead.jsonl"
+    monkeypatch.setattr(app_module, "REPORT_DEAD_LETTER_PATH", str(dead_letters))
+    monkeypatch.setattr(app_module, "REPORT_FLUSH_RETRIES", 2)
+    write_reports = app_module.write_reports
+
+    def fail_on_bad_rows(rows):
+        if any(row[4] == "poison" for row in rows):
+            raise ValueError("bad row")
+        write_reports(rows)
+
+    monkeypatch.setattr(app_module, "write_reports", fail_on_bad_rows)
+    good = [_report("Retry test posting %d, pay a fee to join." % i) for i in range(2)]
+    bad = good[0][:4] + ("poison",) + good[0][5:]
+    app_module._report_queue.extend((0.0, row) for row in (good[0], bad, good[1]))
+
+    assert app_module.flush_reports() == 0
+    assert app_module.flush_reports() == 0
+    assert len(app_module._report_queue) == 3
+    assert app_module.flush_reports() == 3
+    assert not app_module._report_queue
+
+    written = app_module.query_all("SELECT reason FROM reports WHERE posting_text LIKE 'Retry test posting %'")
+    assert [r["reason"] for r in written] == ["fees", "fees"]
+    lines = dead_letters.read_text().splitlines()
+    assert len(lines) == 1 and '"reason": "poison"' in lines[0]
@@ -0,0 +1,62 @@
+import csv
+import io
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+TEXTS = [
+    "Software development intern at a product company. Stipend 10000 per month, Python and SQL.",
+    "Pay a registration fee of 2000 on whatsapp to confirm your work from home internship.",
+    "",
+]
+
+
+def test_cli_scores_like_the_app_without_opening_its_database(app_module, tmp_path):
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    with open(src, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "description"])
+        writer.writeheader()
+        writer.writerows({"id": i, "description": t} for i, t in enumerate(TEXTS))
+    db = tmp_path / "app.db"
+    env = dict(os.environ, INTERNCHECK_DB=str(db))
+    subprocess.run([sys.executable, os.path.join(ROOT, "model", "score_file.py"), str(src), str(dst),
+                    "--workers", "1", "--chunk", "2"], env=env, check=True, capture_output=True)
+    assert not db.exists()
+
+    with open(dst, newline="") as f:
+        rows = list(csv.DictReader(f))
+    expected = app_module._score_batch([app_module.normalize_posting_text(t) for t in TEXTS], local=True)
+    assert [(r["flag"], round(float(r["probability"]), 4), r["reason"]) for r in rows] == \
+        [(flag, round(float(prob), 4), reason) for flag, prob, reason in expected]
+
+
+class BrokenVectorizer:
+    def transform(self, texts):
+        raise MemoryError("vectorizer blew up")
+
+
+def _score_file_module():
+    sys.path.insert(0, os.path.join(ROOT, "model"))
+    import score_file
+    return score_file
+
+
+def test_a_failing_model_falls_back_to_the_heuristics(monkeypatch):
+    score_file = _score_file_module()
+    engine = score_file._load()[2]
+    monkeypatch.setattr(score_file, "_loaded", (object(), BrokenVectorizer(), engine))
+    results = score_file.score_texts(TEXTS)
+    assert [r[2] for r in results[:2]] != ["Model-based prediction"] * 2
+    assert results[2] == ("suspect", 0.0, "Empty text submitted.")
+
+
+def test_stdin_and_stdout_stay_open(monkeypatch, capsys):
+    score_file = _score_file_module()
+    stdin = io.StringIO('id,description\n1,"%s"\n' % TEXTS[0])
+    monkeypatch.setattr(sys, "stdin", stdin)
+    monkeypatch.setattr(sys, "argv", ["score_file.py", "-", "-", "--workers", "0"])
+    score_file.main()
+    assert not stdin.closed and not sys.stdout.closed
+    assert capsys.readouterr().out.startswith("id,description,flag,probability,reason")
@@ -0,0 +1,55 @@
+import pytest
+
+TERM = "zephyrscript"
+
+
+@pytest.fixture(scope="module")
+def postings(app_module):
+    if not app_module.search_available():
+        pytest.skip("sqlite built without FTS5")
+    ids = []
+    with app_module.transaction() as conn:
+        # three older Finance matches, then eight newer Engineering ones
+        for n, category in enumerate(["Finance"] * 3 + ["Engineering"] * 8):
+            cur = conn.execute("INSERT INTO internships (title, description, category, created_at) VALUES (?, ?, ?, ?)",
+                               ("%s intern %d" % (TERM, n), "Work with %s daily." % TERM, category,
+                                "2026-01-%02dT00:00:00" % (n + 1)))
+            ids.append(cur.lastrowid)
+    return ids
+
+
+def test_filters_apply_before_the_rank_window(app_module, postings, monkeypatch):
+    monkeypatch.setattr(app_module, "SEARCH_RANK_WINDOW", 5)
+    rows, has_more = app_module.search_internships(TERM, [("i.category = ?", "Finance")])
+    assert sorted(r["id"] for r in rows) == sorted(postings[:3])
+    assert not has_more
+
+
+def test_matches_below_the_rank_window_are_still_returned(app_module, postings, monkeypatch):
+    monkeypatch.setattr(app_module, "SEARCH_RANK_WINDOW", 5)
+    seen, page = [], 0
+    while True:
+        rows, has_more = app_module.search_internships(TERM, [], page=page, limit=4)
+        seen += [r["id"] for r in rows]
+        if not has_more:
+            break
+        page += 1
+    assert sorted(seen) == sorted(postings)
+    # the ranked window comes first, then older matches newest first
+    assert seen[5:] == sorted(postings[:6], reverse=True)
+
+
+def test_the_route_pages_past_the_rank_window(app_module):
+    if not app_module.search_available():
+        pytest.skip("sqlite built without FTS5")
+    term, window = "quetzalquery", app_module.SEARCH_RANK_WINDOW
+    with app_module.transaction() as conn:
+        conn.executemany("INSERT INTO internships (title, description, created_at) VALUES (?, ?, ?)",
+                         [("%s intern %d" % (term, n), "Write %s." % term, "2026-02-01T00:00:00")
+                          for n in range(window + 5)])
+    client = app_module.app.test_client()
+    last_window_page = window // app_module.PAGE_SIZE - 1
+    page = client.get("/internships?q=%s&page=%d" % (term, last_window_page)).get_data(as_text=True)
+    assert "page=%d" % (last_window_page + 1) in page
+    page = client.get("/internships?q=%s&page=%d" % (term, last_window_page + 1)).get_data(as_text=True)
+    assert page.count("%s intern " % term) == 5
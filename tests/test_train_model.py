@@ -0,0 +1,28 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip("sklearn")
+pytest.importorskip("pandas")
+from model import train_model  # noqa: E402
+
+
+def test_labelled_reports_reads_a_database_the_app_never_migrated(monkeypatch, tmp_path):
+    db = tmp_path / "old.db"
+    shutil.copy(os.path.join(ROOT, "db", "companies.db"), db)
+    conn = sqlite3.connect(str(db))
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    posting = conn.execute("INSERT INTO internships (title, description) VALUES (?, ?)",
+                           ("Old schema intern", "Pay a deposit to reserve your seat.")).lastrowid
+    report = conn.execute("INSERT INTO reports (posting_id, user_feedback, reason) VALUES (?, ?, ?)",
+                          (" %d " % posting, "Fake", "fees")).lastrowid
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(train_model, "DB_PATH", db)
+
+    rows = train_model.labelled_reports(report - 1)
+    assert rows == [(report, "Pay a deposit to reserve your seat.", "fake")]